@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+CryptoBot client throughput: a new httpx.AsyncClient per call (the former
+behaviour) vs the shared keep-alive client, against a local fake CryptoBot.
+
+Usage:
+    python benchmarks/cryptobot_benchmark.py --calls 2000 --concurrency 20 --fail-rate 0.02
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_cryptobot import FakeCryptoBot
+
+async def per_call_client(api, invoice_id):
+    """The old pattern: connect, call, close"""
+    import httpx
+    async with httpx.AsyncClient() as client:
+        response = await client.get(
+            f"{api.base_url}/getInvoice",
+            headers={"Crypto-Pay-API-Token": api.api_token},
+            params={"invoice_id": invoice_id},
+            timeout=30.0
+        )
+        response.raise_for_status()
+        return response.json().get('ok', False)
+
+async def shared_client(api, invoice_id):
+    return (await api.get_invoice(str(invoice_id)))['success']
+
+async def measure(name, call, api, invoice_id, args, fake):
+    semaphore = asyncio.Semaphore(args.concurrency)
+    fake.connections.clear()
+    fake.failures = 0
+    
+    async def one():
+        async with semaphore:
+            return await call(api, invoice_id)
+    
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(args.calls)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    ok = sum(1 for result in results if result is True)
+    print(f"{name:18} {args.calls / elapsed:8,.0f} calls/s   ok {ok}/{args.calls}   "
+          f"connections {len(fake.connections)}   injected 503s {fake.failures}")
+
+async def run(args):
+    import logging
+    import config
+    logging.getLogger('payment.cryptobot_api').setLevel(logging.ERROR)
+    config.CRYPTOBOT_BACKOFF_BASE = 0.01
+    fake = FakeCryptoBot(latency=args.latency, fail_rate=args.fail_rate)
+    config.CRYPTOBOT_API_URL = fake.base_url
+    
+    from payment import CryptoBotAPI, close_http_client
+    await fake.start()
+    try:
+        invoice_id = fake.add_invoice()['invoice_id']
+        api = CryptoBotAPI(api_token='benchmark')
+        await measure('new client/call', per_call_client, api, invoice_id, args, fake)
+        await measure('shared client', shared_client, api, invoice_id, args, fake)
+    finally:
+        await close_http_client()
+        await fake.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--latency', type=float, default=0.0, help='simulated API latency (s)')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='share of requests answered with 503')
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Dispatch cost: the former regex handler chain vs the central router.
+
+Rebuilds the handler list the bot registered before the router existed
+(MessageHandler(filters.Regex(...)) / CallbackQueryHandler(pattern=...) in
+registration order) and compares the time PTB needs to find the handler for
+a mix of button presses and callback queries with one Router.resolve call.
+
+Usage:
+    python benchmarks/dispatch_benchmark.py --rounds 200
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:BENCHMARK')
+
+def legacy_handlers():
+    """The regex chain as bot.py used to register it"""
+    from telegram.ext import CallbackQueryHandler, CommandHandler, MessageHandler, filters
+    from handlers import start, dragon, egg, garden, profile, vip, battlepass
+    from shop import shop_handler
+    from payment import crypto_handler
+    
+    return [
+        CommandHandler("start", start.start_command),
+        CommandHandler("help", start.help_command),
+        CommandHandler("language", start.language_command),
+        CallbackQueryHandler(start.back_to_menu, pattern="^start_menu$"),
+        CallbackQueryHandler(start.help_command, pattern="^help_menu$"),
+        MessageHandler(filters.TEXT & (filters.Regex('Главное меню|Main Menu') | filters.Regex('Назад|Back')), start.back_to_menu),
+        MessageHandler(filters.TEXT & filters.Regex('🛒 Магазин|🛒 Shop'), shop_handler.shop_menu),
+        MessageHandler(filters.TEXT & filters.Regex('👑 VIP'), vip.vip_menu),
+        MessageHandler(filters.TEXT & filters.Regex('🌐 Язык|🌐 Language'), start.language_command),
+        MessageHandler(filters.TEXT & filters.Regex('❓ Справка|❓ Help'), start.help_command),
+        CallbackQueryHandler(dragon.dragons_menu, pattern="^dragons_menu$"),
+        CallbackQueryHandler(dragon.view_dragon, pattern="^view_dragon_"),
+        CallbackQueryHandler(dragon.feed_dragon, pattern="^feed_dragon_"),
+        CallbackQueryHandler(dragon.dragons_list, pattern="^dragons_list$"),
+        MessageHandler(filters.TEXT & filters.Regex('🐉 Драконы|🐉 Dragons'), dragon.dragons_menu),
+        CallbackQueryHandler(egg.eggs_menu, pattern="^eggs_menu$"),
+        CallbackQueryHandler(egg.claim_daily_egg, pattern="^claim_daily_egg$"),
+        CallbackQueryHandler(egg.check_eggs, pattern="^check_eggs$"),
+        CallbackQueryHandler(egg.hatch_egg, pattern="^hatch_egg_"),
+        CallbackQueryHandler(egg.shop_eggs, pattern="^shop_eggs$"),
+        CallbackQueryHandler(egg.buy_egg, pattern="^buy_egg_"),
+        MessageHandler(filters.TEXT & filters.Regex('🥚 Яйца|🥚 Eggs'), egg.eggs_menu),
+        CallbackQueryHandler(garden.garden_menu, pattern="^garden_menu$"),
+        CallbackQueryHandler(garden.plant_menu, pattern="^plant_menu$"),
+        CallbackQueryHandler(garden.plant_crop, pattern="^plant_"),
+        CallbackQueryHandler(garden.check_plants, pattern="^check_plants$"),
+        CallbackQueryHandler(garden.harvest_menu, pattern="^harvest_menu$"),
+        CallbackQueryHandler(garden.harvest_all, pattern="^harvest_all$"),
+        MessageHandler(filters.TEXT & filters.Regex('🌱 Сад|🌱 Garden'), garden.garden_menu),
+        CommandHandler("profile", profile.profile_command),
+        CallbackQueryHandler(profile.profile_menu, pattern="^profile_menu$"),
+        MessageHandler(filters.TEXT & filters.Regex('Профиль|Profile'), profile.profile_menu),
+        CallbackQueryHandler(vip.vip_menu, pattern="^vip_menu$"),
+        MessageHandler(filters.TEXT & filters.Regex('🥉 VIP Bronze|🥈 VIP Silver|🥇 VIP Gold|💎 VIP Platinum'), vip.activate_vip),
+        MessageHandler(filters.TEXT & filters.Regex('👑 VIP'), vip.vip_menu),
+        CallbackQueryHandler(battlepass.battlepass_menu, pattern="^battlepass_menu$"),
+        MessageHandler(filters.TEXT & filters.Regex('🎖️ Боевой пропуск|🎖️ Battlepass'), battlepass.battlepass_menu),
+        CallbackQueryHandler(shop_handler.shop_menu, pattern="^shop_menu$"),
+        CallbackQueryHandler(shop_handler.show_crystals_shop, pattern="^shop_crystals$"),
+        CallbackQueryHandler(shop_handler.show_vip_shop, pattern="^shop_vip$"),
+        MessageHandler(filters.TEXT & filters.Regex('🥚|🔵|💎'), shop_handler.handle_shop_purchase),
+        MessageHandler(filters.TEXT & filters.Regex('🛒 Магазин|🛒 Shop'), shop_handler.shop_menu),
+        MessageHandler(filters.TEXT & (filters.Regex('₿') | filters.Regex('⟠') | filters.Regex('USDT') | filters.Regex('TON')),
+                       crypto_handler.handle_crypto_selection),
+        MessageHandler(filters.TEXT & filters.Regex('🔍'), crypto_handler.check_crypto_payment),
+    ]
+
+def make_updates():
+    from telegram import Update, Message, Chat, CallbackQuery, User
+    from localization import MESSAGES
+    
+    user = User(1, False, 'Bench')
+    chat = Chat(1, 'private')
+    texts = [
+        messages[key]
+        for messages in MESSAGES.values()
+        for key in ('nav_eggs', 'nav_dragons', 'nav_garden', 'nav_profile', 'nav_shop', 'nav_vip',
+                    'nav_battlepass', 'nav_language', 'nav_help', 'nav_back', 'crypto_usdt')
+    ]
+    texts += ["🥚 500 💰", "🥇 VIP Gold 999⭐️", "🔍 Check Payment:12345", "some free text"]
+    data = ['start_menu', 'dragons_menu', 'view_dragon_42', 'hatch_egg_7', 'plant_Carrot',
+            'harvest_all', 'shop_vip', 'buy_egg_Rare', 'unknown_button']
+    
+    updates = [Update(i, message=Message(i, datetime.now(), chat, from_user=user, text=text))
+               for i, text in enumerate(texts)]
+    updates += [Update(1000 + i, callback_query=CallbackQuery(str(i), user, 'instance', data=value))
+                for i, value in enumerate(data)]
+    return updates
+
+def run(args):
+    import bot
+    from core import RouterHandler
+    
+    application = bot.build_application()
+    handlers = application.handlers[0]
+    router = next(handler.router for handler in handlers if isinstance(handler, RouterHandler))
+    legacy = legacy_handlers()
+    updates = make_updates()
+    
+    def legacy_dispatch(update):
+        checks = 0
+        for handler in legacy:
+            checks += 1
+            if handler.check_update(update):
+                break
+        return checks
+    
+    def router_dispatch(update):
+        # Same first-match loop PTB runs over group 0, router first
+        checks = 0
+        for handler in handlers:
+            checks += 1
+            if handler.check_update(update):
+                break
+        return checks
+    
+    results = {}
+    for name, dispatch in (('regex chain', legacy_dispatch), ('router', router_dispatch)):
+        checks = sum(dispatch(update) for update in updates)
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            for update in updates:
+                dispatch(update)
+        elapsed = time.perf_counter() - started
+        results[name] = elapsed / (args.rounds * len(updates))
+        print(f"{name:12} {results[name] * 1e6:8.2f} µs/update   "
+              f"{checks / len(updates):5.1f} handler checks/update")
+    
+    print(f"\nRouter: {len(router.texts)} button texts, {len(router.callbacks)} callbacks; "
+          f"speedup {results['regex chain'] / results['router']:.1f}x over {len(updates)} sample updates")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+    run(args)
+
+if __name__ == '__main__':
+    main()
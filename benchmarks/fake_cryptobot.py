@@ -0,0 +1,82 @@
+"""
+Local stand-in for the CryptoBot (Crypto Pay) API used by benchmarks.
+
+Serves createInvoice, getInvoice, getInvoices, getCurrencies and getBalance
+from memory, with optional latency and a rate of injected 503 responses.
+"""
+
+import asyncio
+import random
+import time
+from aiohttp import web
+
+class FakeCryptoBot:
+    def __init__(self, port: int = 18090, latency: float = 0.0, fail_rate: float = 0.0):
+        self.port = port
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.invoices = {}
+        self.calls = {}
+        self.connections = set()
+        self.failures = 0
+    
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/api"
+    
+    def add_invoice(self, status: str = 'active', amount: str = '10', asset: str = 'USDT', payload: str = '') -> dict:
+        invoice_id = len(self.invoices) + 1
+        invoice = {
+            'invoice_id': invoice_id,
+            'status': status,
+            'asset': asset,
+            'amount': amount,
+            'payload': payload,
+            'pay_url': f"https://t.me/CryptoBot?start=IV{invoice_id}",
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S.000Z', time.gmtime())
+        }
+        self.invoices[invoice_id] = invoice
+        return invoice
+    
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info['method']
+        self.calls[method] = self.calls.get(method, 0) + 1
+        self.connections.add(request.transport.get_extra_info('peername'))
+        
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.fail_rate and random.random() < self.fail_rate:
+            self.failures += 1
+            return web.json_response({'ok': False, 'error': 'unavailable'}, status=503)
+        
+        params = dict(request.query)
+        if request.can_read_body:
+            params.update(await request.json())
+        
+        if method == 'createInvoice':
+            result = self.add_invoice(amount=params['amount'], asset=params['asset'], payload=params.get('payload', ''))
+        elif method == 'getInvoice':
+            result = self.invoices.get(int(params['invoice_id']))
+            if result is None:
+                return web.json_response({'ok': False, 'error': 'INVOICE_NOT_FOUND'})
+        elif method == 'getInvoices':
+            ids = [int(i) for i in str(params.get('invoice_ids', '')).split(',') if i]
+            result = {'items': [self.invoices[i] for i in ids if i in self.invoices]}
+        elif method == 'getCurrencies':
+            result = [{'code': code, 'is_blockchain': True} for code in ('BTC', 'ETH', 'USDT', 'TON')]
+        elif method == 'getBalance':
+            result = [{'currency_code': 'USDT', 'available': '100.0'}]
+        else:
+            return web.json_response({'ok': False, 'error': 'METHOD_NOT_FOUND'}, status=404)
+        
+        return web.json_response({'ok': True, 'result': result})
+    
+    async def start(self):
+        app = web.Application()
+        app.router.add_route('*', '/api/{method}', self.handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, '127.0.0.1', self.port).start()
+    
+    async def stop(self):
+        await self.runner.cleanup()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+t() throughput: the former per-call lookup (language check, nested dict.get
+fallback, str.format) vs the precompiled catalog, for a static message, a
+templated one and a key only the fallback language defines.
+
+Usage:
+    python benchmarks/localization_benchmark.py --calls 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from localization import MESSAGES, DEFAULT_LANGUAGE, t
+
+def legacy_get_message(lang: str, key: str, **kwargs):
+    """The old get_message"""
+    if lang not in MESSAGES:
+        lang = DEFAULT_LANGUAGE
+    
+    template = MESSAGES[lang].get(key, MESSAGES[DEFAULT_LANGUAGE].get(key, key))
+    
+    if kwargs:
+        return template.format(**kwargs)
+    return template
+
+CASES = [
+    ('static', ('en', 'help_title'), {}),
+    ('templated', ('en', 'start_welcome_back'),
+     {'first_name': 'Player', 'gold': 12345, 'crystals': 50, 'dragons': 7, 'eggs': 3}),
+    ('unknown language', ('de', 'nav_help'), {}),
+]
+
+def measure(name, call, args, kwargs, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        call(*args, **kwargs)
+    return calls / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--calls', type=int, default=1_000_000)
+    args = parser.parse_args()
+    
+    print(f"{'case':18} {'legacy calls/s':>16} {'catalog calls/s':>16} {'speedup':>8}")
+    for name, call_args, kwargs in CASES:
+        if legacy_get_message(*call_args, **kwargs) != t(*call_args, **kwargs):
+            raise SystemExit(f"Output differs for {name}")
+        legacy = measure(name, legacy_get_message, call_args, kwargs, args.calls)
+        compiled = measure(name, t, call_args, kwargs, args.calls)
+        print(f"{name:18} {legacy:16,.0f} {compiled:16,.0f} {compiled / legacy:7.2f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Egg rarity rolls: the former cumulative-sum loop over random.randint(1, 100)
+vs single alias-table rolls vs vectorized roll_many.
+
+Usage:
+    python benchmarks/rarity_benchmark.py --rolls 1000000 --egg-type Premium
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.constants import EGG_TYPES
+from utils.rarity import RarityRoller
+
+def cumulative_roll(egg_type):
+    """The old determine_egg_rarity"""
+    rarities = EGG_TYPES[egg_type]['rarities']
+    rand = random.randint(1, 100)
+    cumulative = 0
+    for rarity, chance in rarities.items():
+        cumulative += chance
+        if rand <= cumulative:
+            return rarity
+    return 'Common'
+
+def measure(name, call, rolls):
+    started = time.perf_counter()
+    call()
+    elapsed = time.perf_counter() - started
+    print(f"{name:22} {rolls / elapsed:14,.0f} rolls/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rolls', type=int, default=1_000_000)
+    parser.add_argument('--egg-type', default='Premium', choices=sorted(EGG_TYPES))
+    parser.add_argument('--batch', type=int, default=10, help='eggs per roll_many call (bulk purchase size)')
+    args = parser.parse_args()
+    
+    roller = RarityRoller(seed=0)
+    measure('cumulative loop', lambda: [cumulative_roll(args.egg_type) for _ in range(args.rolls)], args.rolls)
+    measure('alias roll', lambda: [roller.roll(args.egg_type) for _ in range(args.rolls // 10)], args.rolls // 10)
+    measure(f'roll_many({args.batch})',
+            lambda: [roller.roll_many(args.egg_type, args.batch) for _ in range(args.rolls // args.batch)],
+            args.rolls // args.batch * args.batch)
+    measure(f'roll_many({args.rolls})', lambda: roller.roll_many(args.egg_type, args.rolls), args.rolls)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Pending invoice reconciliation: one getInvoice call and transaction per
+invoice (what polling each row costs) vs the batched CryptoReconciler,
+against a local fake CryptoBot.
+
+Usage:
+    python benchmarks/reconcile_benchmark.py --invoices 5000 --batch-size 100 --latency 0.005
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_cryptobot import FakeCryptoBot
+
+def configure_environment(args):
+    # Must run before the bot modules import config
+    os.environ['DATABASE_URL'] = args.database_url
+
+def seed(fake, count):
+    """Fresh pending rows backed by fake invoices: ~20% paid, ~10% expired, ~10% stale"""
+    from sqlalchemy import delete, insert
+    from database import get_session, init_db
+    from database.models import CryptoTransaction, User
+    init_db()
+    
+    now = datetime.utcnow()
+    with get_session() as session:
+        session.execute(delete(CryptoTransaction))
+        session.execute(delete(User).where(User.telegram_id >= 900_000_000))
+        session.execute(insert(User), [
+            {'telegram_id': 900_000_000 + i, 'first_name': 'Payer', 'gold': 0, 'crystals': 0} for i in range(100)
+        ])
+        user_ids = [user.id for user in session.query(User.id).filter(User.telegram_id >= 900_000_000)]
+        
+        rows = []
+        for i in range(count):
+            roll = random.random()
+            status = 'paid' if roll < 0.2 else 'expired' if roll < 0.3 else 'active'
+            invoice = fake.add_invoice(status=status)
+            stale = 0.3 <= roll < 0.4
+            rows.append({
+                'user_id': user_ids[i % len(user_ids)],
+                'invoice_id': str(invoice['invoice_id']),
+                'currency': 'USDT',
+                'amount': 10.0,
+                'status': 'pending',
+                'created_at': now - timedelta(days=2 if stale else 0, seconds=count - i)
+            })
+        session.execute(insert(CryptoTransaction), rows)
+
+async def per_invoice(api, invoice_ttl):
+    """Resolve every pending row on its own, as the check button does"""
+    from database import get_async_session
+    from database.models import CryptoTransaction
+    from services import AsyncCryptoService
+    from sqlalchemy import select
+    
+    expire_before = datetime.utcnow() - timedelta(seconds=invoice_ttl)
+    async with get_async_session() as session:
+        pending = (await session.execute(
+            select(CryptoTransaction.invoice_id, CryptoTransaction.created_at)
+            .where(CryptoTransaction.status == 'pending')
+        )).all()
+    
+    for invoice_id, created_at in pending:
+        result = await api.get_invoice(invoice_id)
+        async with get_async_session() as session:
+            if result['success'] and result['status'] == 'completed':
+                await AsyncCryptoService.complete_transaction(session, invoice_id)
+            elif (result['success'] and result['status'] == 'failed') or created_at < expire_before:
+                await AsyncCryptoService.fail_transaction(session, invoice_id)
+    return len(pending)
+
+async def run(args):
+    import config
+    from database import dispose_async_engine
+    from payment import CryptoBotAPI, close_http_client
+    from jobs import CryptoReconciler
+    
+    logging.getLogger('payment.cryptobot_api').setLevel(logging.ERROR)
+    fake = FakeCryptoBot(latency=args.latency)
+    config.CRYPTOBOT_API_URL = fake.base_url
+    api = CryptoBotAPI(api_token='benchmark')
+    
+    await fake.start()
+    try:
+        seed(fake, args.invoices)
+        fake.calls.clear()
+        started = time.perf_counter()
+        checked = await per_invoice(api, config.CRYPTO_INVOICE_TTL)
+        elapsed = time.perf_counter() - started
+        print(f"{'per invoice':14} {checked / elapsed:8,.0f} invoices/s   API calls {sum(fake.calls.values())}")
+        
+        fake.invoices.clear()
+        seed(fake, args.invoices)
+        fake.calls.clear()
+        stats = await CryptoReconciler(batch_size=args.batch_size, api=api).run()
+        print(f"{'batched':14} {stats['invoices_per_second']:8,.0f} invoices/s   API calls {stats['api_calls']}   "
+              f"saved {stats['api_calls_saved']}   completed {stats['completed']}   expired {stats['expired']}")
+    finally:
+        await close_http_client()
+        await dispose_async_engine()
+        await fake.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--invoices', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.005, help='simulated API latency (s)')
+    parser.add_argument('--database-url', default='sqlite:///loadtest.db')
+    args = parser.parse_args()
+    
+    configure_environment(args)
+    asyncio.run(run(args))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Webhook load test against a local stand-in for the Telegram Bot API.
+
+Starts a fake Bot API server, runs the bot in webhook mode in-process with
+its outbound client pointed at the fake server, then fires synthetic
+/start and Help updates at the webhook from many simulated players.
+
+Usage:
+    python benchmarks/webhook_loadtest.py --updates 2000 --users 200 --concurrent-updates 16
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FAKE_API_PORT = 18081
+WEBHOOK_PORT = 18080
+SECRET = 'loadtest-secret'
+
+def configure_environment(args):
+    # Must run before the bot modules import config
+    os.environ.update({
+        'TELEGRAM_BOT_TOKEN': '123456:LOADTEST',
+        'BOT_MODE': 'webhook',
+        'WEBHOOK_URL': f'http://127.0.0.1:{WEBHOOK_PORT}',
+        'WEBHOOK_SECRET_TOKEN': SECRET,
+        'WEB_HOST': '127.0.0.1',
+        'PORT': str(WEBHOOK_PORT),
+        'TELEGRAM_API_BASE_URL': f'http://127.0.0.1:{FAKE_API_PORT}/bot',
+        'CONCURRENT_UPDATES': str(args.concurrent_updates),
+        'DATABASE_URL': args.database_url,
+        # Off by default: the test measures the bot, not Telegram's limits
+        'OUTBOUND_RATE_LIMIT': 'true' if args.outbound_rate_limit else 'false',
+    })
+
+class FakeTelegramAPI:
+    """Answers every Bot API method with a minimal valid result"""
+    
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = {}
+        self.sent = 0
+        self.sent_event = asyncio.Event()
+        self.expected = 0
+    
+    async def handle(self, request):
+        from aiohttp import web
+        method = request.match_info['method']
+        self.calls[method] = self.calls.get(method, 0) + 1
+        
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        
+        if method == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'LoadTest', 'username': 'loadtest_bot'}
+        elif method in ('sendMessage', 'editMessageText'):
+            data = await request.post()
+            chat_id = int(data.get('chat_id', 0))
+            result = {
+                'message_id': self.calls[method],
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'text': data.get('text', '')
+            }
+            self.sent += 1
+            if self.sent >= self.expected:
+                self.sent_event.set()
+        else:
+            result = True
+        
+        return web.json_response({'ok': True, 'result': result})
+    
+    async def start(self):
+        from aiohttp import web
+        app = web.Application()
+        app.router.add_post('/bot{token}/{method}', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, '127.0.0.1', FAKE_API_PORT).start()
+    
+    async def stop(self):
+        await self.runner.cleanup()
+
+def make_update(update_id: int, user_id: int) -> dict:
+    text = '/start' if update_id % 2 else '❓ Help'
+    message = {
+        'message_id': update_id,
+        'date': int(time.time()),
+        'chat': {'id': user_id, 'type': 'private'},
+        'from': {'id': user_id, 'is_bot': False, 'first_name': f'Player{user_id}'},
+        'text': text
+    }
+    if text.startswith('/'):
+        message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(text)}]
+    return {'update_id': update_id, 'message': message}
+
+async def run(args):
+    import httpx
+    import bot
+    from database import init_db
+    
+    init_db()
+    for noisy in ('aiohttp.access', 'httpx', 'telegram', 'apscheduler'):
+        logging.getLogger(noisy).setLevel(logging.WARNING)
+    
+    fake_api = FakeTelegramAPI(args.api_latency)
+    fake_api.expected = args.updates
+    await fake_api.start()
+    
+    application = bot.build_application()
+    stop_event = asyncio.Event()
+    server = asyncio.create_task(bot.run_webhook(application, stop_event))
+    
+    async with httpx.AsyncClient(base_url=f'http://127.0.0.1:{WEBHOOK_PORT}') as client:
+        for _ in range(100):
+            try:
+                if (await client.get('/readyz')).status_code == 200:
+                    break
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+        
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies = []
+        
+        async def post(update_id):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(
+                    '/telegram',
+                    json=make_update(update_id, 10_000 + update_id % args.users),
+                    headers={'X-Telegram-Bot-Api-Secret-Token': SECRET}
+                )
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+        
+        started = time.perf_counter()
+        await asyncio.gather(*(post(i) for i in range(1, args.updates + 1)))
+        ingest_time = time.perf_counter() - started
+        
+        try:
+            await asyncio.wait_for(fake_api.sent_event.wait(), timeout=args.timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️  Timed out: {fake_api.sent}/{args.updates} replies sent")
+        total_time = time.perf_counter() - started
+    
+    stop_event.set()
+    await server
+    await fake_api.stop()
+    
+    latencies.sort()
+    print(f"Updates:              {args.updates} from {args.users} users")
+    print(f"Concurrent updates:   {args.concurrent_updates}")
+    print(f"Webhook ingest:       {args.updates / ingest_time:,.0f} updates/s")
+    print(f"Webhook p50 / p99:    {latencies[len(latencies) // 2] * 1000:.1f} / "
+          f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+    print(f"End-to-end:           {fake_api.sent / total_time:,.0f} replies/s ({total_time:.2f}s)")
+    print(f"Bot API calls:        {fake_api.calls}")
+    stats = application.update_processor.stats()
+    print(f"Update wait p50/p99:  {stats['wait_p50_ms']:.1f} / {stats['wait_p99_ms']:.1f} ms "
+          f"(max {stats['wait_max_ms']:.1f} ms)")
+    print(f"SQL per update:       max {stats['sql_max_statements']}, "
+          f"{stats['sql_over_budget']} over SQL_UPDATE_BUDGET")
+    if application.bot.rate_limiter is not None:
+        outbound = application.bot.rate_limiter.stats()
+        for lane, lane_stats in outbound['lanes'].items():
+            if lane_stats['sent']:
+                print(f"Outbound {lane + ':':12} {lane_stats['sent']} sent, wait p50/p99 "
+                      f"{lane_stats['wait_p50_ms']:.1f} / {lane_stats['wait_p99_ms']:.1f} ms")
+        print(f"RetryAfter retries:   {outbound['retry_after']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=1000)
+    parser.add_argument('--users', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=50, help='parallel webhook requests')
+    parser.add_argument('--concurrent-updates', type=int, default=8, help='CONCURRENT_UPDATES for the bot')
+    parser.add_argument('--api-latency', type=float, default=0.02, help='simulated Bot API latency (s)')
+    parser.add_argument('--timeout', type=float, default=120)
+    parser.add_argument('--database-url', default='sqlite:///loadtest.db')
+    parser.add_argument('--outbound-rate-limit', action='store_true', help='throttle Bot API calls like production')
+    args = parser.parse_args()
+    
+    configure_environment(args)
+    asyncio.run(run(args))
+
+if __name__ == '__main__':
+    main()
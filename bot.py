@@ -1,21 +1,31 @@
+import asyncio
 import logging
+import signal
 import sys
+from aiohttp import web
 from telegram.ext import Application
 from telegram import Update
 import config
-from database import init_db
+from database import init_db, dispose_async_engine
 from handlers import (
     register_start_handlers,
     register_dragon_handlers,
     register_egg_handlers,
     register_garden_handlers,
-    register_profile_handlers
+    register_profile_handlers,
+    register_admin_handlers
 )
 from handlers.vip import register_vip_handlers
 from handlers.battlepass import register_battlepass_handlers
 from shop import register_shop_handlers
 from payment.stars_handler import register_stars_handlers
 from payment.crypto_handler import register_crypto_handlers
+from payment import close_http_client
+from server import create_web_app
+from core import PerUserUpdateProcessor, PriorityRateLimiter, get_router
+from jobs import register_jobs
+from localization import CATALOG
+from utils.balance import reload_game_balance
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -23,21 +33,33 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def main():
-    if not config.TELEGRAM_BOT_TOKEN:
-        logger.error("TELEGRAM_BOT_TOKEN not found in environment variables!")
-        logger.error("Please create a .env file with your bot token.")
-        logger.error("See .env.example for reference.")
-        sys.exit(1)
-    
-    logger.info("Initializing database...")
-    init_db()
-    logger.info("Database initialized successfully!")
-    
-    logger.info("Creating bot application...")
-    application = Application.builder().token(config.TELEGRAM_BOT_TOKEN).build()
+async def post_shutdown(application: Application):
+    await close_http_client()
+    await dispose_async_engine()
+
+def build_application() -> Application:
+    builder = (
+        Application.builder()
+        .token(config.TELEGRAM_BOT_TOKEN)
+        .base_url(config.TELEGRAM_API_BASE_URL)
+        .concurrent_updates(PerUserUpdateProcessor(
+            max_concurrent_updates=config.CONCURRENT_UPDATES,
+            max_pending_updates=config.MAX_PENDING_UPDATES
+        ))
+        .connection_pool_size(config.TELEGRAM_CONNECTION_POOL_SIZE)
+        .pool_timeout(config.TELEGRAM_POOL_TIMEOUT)
+        .post_shutdown(post_shutdown)
+    )
+    if config.OUTBOUND_RATE_LIMIT:
+        builder = builder.rate_limiter(PriorityRateLimiter())
+    if config.BOT_MODE == 'webhook':
+        # Updates arrive through our own web server, no Updater needed
+        builder = builder.updater(None)
+    application = builder.build()
     
     logger.info("Registering handlers...")
+    # Install the button/callback router first so routed updates need one check
+    get_router(application)
     register_start_handlers(application)
     register_dragon_handlers(application)
     register_egg_handlers(application)
@@ -48,13 +70,79 @@ def main():
     register_shop_handlers(application)
     register_stars_handlers(application)
     register_crypto_handlers(application)
+    register_admin_handlers(application)
     logger.info("All handlers registered!")
     
+    register_jobs(application)
+    
+    return application
+
+async def run_webhook(application: Application, stop_event: asyncio.Event = None):
+    """Serve updates through the embedded web server until stop_event is set (or SIGINT/SIGTERM)"""
+    if stop_event is None:
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop_event.set)
+    
+    runner = web.AppRunner(create_web_app(application))
+    
+    async with application:
+        await application.bot.set_webhook(
+            url=f"{config.WEBHOOK_URL.rstrip('/')}{config.WEBHOOK_PATH}",
+            secret_token=config.WEBHOOK_SECRET_TOKEN,
+            allowed_updates=Update.ALL_TYPES,
+            max_connections=config.WEBHOOK_MAX_CONNECTIONS
+        )
+        await application.start()
+        await runner.setup()
+        await web.TCPSite(runner, host=config.WEB_HOST, port=config.PORT).start()
+        logger.info(f"Webhook server listening on {config.WEB_HOST}:{config.PORT}{config.WEBHOOK_PATH}")
+        
+        try:
+            await stop_event.wait()
+        finally:
+            await runner.cleanup()
+            await application.stop()
+    
+    # Application.__aexit__ only calls shutdown(); run_polling would also call post_shutdown
+    await post_shutdown(application)
+
+def main():
+    if not config.TELEGRAM_BOT_TOKEN:
+        logger.error("TELEGRAM_BOT_TOKEN not found in environment variables!")
+        logger.error("Please create a .env file with your bot token.")
+        logger.error("See .env.example for reference.")
+        sys.exit(1)
+    
+    if config.BOT_MODE == 'webhook' and not (config.WEBHOOK_URL and config.WEBHOOK_SECRET_TOKEN):
+        logger.error("BOT_MODE=webhook requires WEBHOOK_URL and WEBHOOK_SECRET_TOKEN.")
+        sys.exit(1)
+    
+    if config.CRYPTOBOT_WEBHOOK_ENABLED and config.BOT_MODE != 'webhook':
+        logger.warning("CRYPTOBOT_WEBHOOK_ENABLED needs BOT_MODE=webhook; "
+                       "crypto payments will be checked via the API instead.")
+    
+    CATALOG.warn_if_incomplete()
+    if config.GAME_BALANCE_FILE:
+        reload_game_balance()
+    
+    logger.info("Initializing database...")
+    init_db()
+    logger.info("Database initialized successfully!")
+    
+    logger.info("Creating bot application...")
+    application = build_application()
+    
     logger.info("Starting bot...")
     logger.info(f"Bot username: @{config.BOT_USERNAME}")
+    logger.info(f"Mode: {config.BOT_MODE}, concurrent updates: {config.CONCURRENT_UPDATES}")
     logger.info("Dragon Garden bot is now running! Press Ctrl+C to stop.")
     
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if config.BOT_MODE == 'webhook':
+        asyncio.run(run_webhook(application))
+    else:
+        application.run_polling(allowed_updates=Update.ALL_TYPES)
 
 if __name__ == '__main__':
     main()
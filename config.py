@@ -7,10 +7,89 @@ TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///dragon_garden.db')
 BOT_USERNAME = os.getenv('BOT_USERNAME', 'dragon_garden_bot')
 ADMIN_USER_IDS = [int(id.strip()) for id in os.getenv('ADMIN_USER_IDS', '').split(',') if id.strip()]
+GAME_BALANCE_FILE = os.getenv('GAME_BALANCE_FILE')  # Optional JSON overrides for PLANTS/EGG_TYPES/RARITIES (/reload_balance)
 
 # CryptoBot Settings
 CRYPTOBOT_API_TOKEN = os.getenv('CRYPTOBOT_API_TOKEN')
 CRYPTOBOT_API_URL = os.getenv('CRYPTOBOT_API_URL', 'https://pay.crypt.bot/api')
+CRYPTOBOT_HTTP2 = os.getenv('CRYPTOBOT_HTTP2', 'true').lower() in ('1', 'true', 'yes')
+CRYPTOBOT_MAX_CONNECTIONS = int(os.getenv('CRYPTOBOT_MAX_CONNECTIONS', '20'))
+CRYPTOBOT_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('CRYPTOBOT_MAX_KEEPALIVE_CONNECTIONS', '10'))
+CRYPTOBOT_KEEPALIVE_EXPIRY = float(os.getenv('CRYPTOBOT_KEEPALIVE_EXPIRY', '30'))  # Seconds
+CRYPTOBOT_MAX_RETRIES = int(os.getenv('CRYPTOBOT_MAX_RETRIES', '3'))  # Idempotent calls only
+CRYPTOBOT_BACKOFF_BASE = float(os.getenv('CRYPTOBOT_BACKOFF_BASE', '0.25'))  # Seconds
+CRYPTOBOT_BACKOFF_MAX = float(os.getenv('CRYPTOBOT_BACKOFF_MAX', '5.0'))  # Seconds
+# invoice_paid webhooks, served by the embedded web server (BOT_MODE=webhook)
+CRYPTOBOT_WEBHOOK_ENABLED = os.getenv('CRYPTOBOT_WEBHOOK_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+CRYPTOBOT_WEBHOOK_PATH = os.getenv('CRYPTOBOT_WEBHOOK_PATH', '/cryptobot')
+CRYPTO_PAYMENT_CRYSTALS = int(os.getenv('CRYPTO_PAYMENT_CRYSTALS', '100'))  # Crystals per paid invoice
+CRYPTO_RECONCILE_ENABLED = os.getenv('CRYPTO_RECONCILE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+CRYPTO_RECONCILE_INTERVAL = int(os.getenv('CRYPTO_RECONCILE_INTERVAL', '300'))  # Seconds
+CRYPTO_RECONCILE_BATCH_SIZE = int(os.getenv('CRYPTO_RECONCILE_BATCH_SIZE', '100'))  # Invoices per getInvoices call
+CRYPTO_INVOICE_TTL = int(os.getenv('CRYPTO_INVOICE_TTL', str(24 * 60 * 60)))  # Pending invoices older than this expire
+
+# Serving mode: 'polling' (default) or 'webhook'
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+
+# Webhook Settings (used when BOT_MODE=webhook)
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')  # Public base URL, e.g. https://your-domain.com
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN')
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+WEB_HOST = os.getenv('WEB_HOST', '0.0.0.0')
+PORT = int(os.getenv('PORT', '8443'))
+
+# Update processing and outbound Telegram HTTP client
+# Updates from different users run in parallel (up to CONCURRENT_UPDATES), a
+# single user's updates always run one at a time in order
+CONCURRENT_UPDATES = int(os.getenv('CONCURRENT_UPDATES', '1'))
+MAX_PENDING_UPDATES = int(os.getenv('MAX_PENDING_UPDATES', '1000'))
+TELEGRAM_API_BASE_URL = os.getenv('TELEGRAM_API_BASE_URL', 'https://api.telegram.org/bot')
+TELEGRAM_CONNECTION_POOL_SIZE = int(os.getenv('TELEGRAM_CONNECTION_POOL_SIZE', '256'))
+TELEGRAM_POOL_TIMEOUT = float(os.getenv('TELEGRAM_POOL_TIMEOUT', '5.0'))
+
+# Outbound Bot API rate limiting (token buckets, see core/rate_limiter.py)
+OUTBOUND_RATE_LIMIT = os.getenv('OUTBOUND_RATE_LIMIT', 'true').lower() in ('1', 'true', 'yes')
+OUTBOUND_GLOBAL_RATE = float(os.getenv('OUTBOUND_GLOBAL_RATE', '30'))  # Requests per second, all chats
+OUTBOUND_GLOBAL_BURST = float(os.getenv('OUTBOUND_GLOBAL_BURST', '30'))
+OUTBOUND_CHAT_RATE = float(os.getenv('OUTBOUND_CHAT_RATE', '1'))  # Per private chat, per second
+OUTBOUND_CHAT_BURST = float(os.getenv('OUTBOUND_CHAT_BURST', '3'))
+OUTBOUND_GROUP_RATE = float(os.getenv('OUTBOUND_GROUP_RATE', str(20 / 60)))  # Per group chat (20 per minute)
+OUTBOUND_CHAT_BUCKETS = int(os.getenv('OUTBOUND_CHAT_BUCKETS', '10000'))  # Idle buckets are pruned past this
+OUTBOUND_MAX_RETRIES = int(os.getenv('OUTBOUND_MAX_RETRIES', '3'))  # Retries after RetryAfter (429)
+
+# User snapshot cache (in-process, per bot instance)
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '10000'))
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '300'))  # Seconds
+
+# Fingerprints of the last render per message, used to skip no-op edits
+EDIT_FINGERPRINT_CACHE_SIZE = int(os.getenv('EDIT_FINGERPRINT_CACHE_SIZE', '10000'))
+EDIT_FINGERPRINT_TTL = int(os.getenv('EDIT_FINGERPRINT_TTL', '86400'))  # Seconds
+
+# ORM loading and per-update SQL statement budgets
+DB_RELATIONSHIP_LAZY = os.getenv('DB_RELATIONSHIP_LAZY', 'select')  # 'raise' fails on unplanned lazy loads
+SQL_UPDATE_BUDGET = int(os.getenv('SQL_UPDATE_BUDGET', '30'))  # Statements per update before it is flagged
+SQL_BUDGET_STRICT = os.getenv('SQL_BUDGET_STRICT', 'false').lower() in ('1', 'true', 'yes')  # Raise instead of log
+
+# Ready notifications (eggs hatched / plants ready)
+READY_NOTIFICATIONS = os.getenv('READY_NOTIFICATIONS', 'true').lower() in ('1', 'true', 'yes')
+READY_NOTIFY_HORIZON = int(os.getenv('READY_NOTIFY_HORIZON', '600'))  # Seconds of deadlines kept in memory
+READY_NOTIFY_REFILL_INTERVAL = int(os.getenv('READY_NOTIFY_REFILL_INTERVAL', '60'))  # Seconds
+
+# Dragon needs decay (evaluated when read, nothing is rewritten periodically)
+DRAGON_HUNGER_DECAY_PER_DAY = int(os.getenv('DRAGON_HUNGER_DECAY_PER_DAY', '10'))  # Points per day
+DRAGON_HAPPINESS_DECAY_PER_DAY = int(os.getenv('DRAGON_HAPPINESS_DECAY_PER_DAY', '5'))  # Points per day
+
+# Reconciliation of the denormalized per-user counters (users.dragon_count, ...)
+COUNTER_RECONCILE_ENABLED = os.getenv('COUNTER_RECONCILE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+COUNTER_RECONCILE_INTERVAL = int(os.getenv('COUNTER_RECONCILE_INTERVAL', str(24 * 60 * 60)))  # Seconds
+COUNTER_RECONCILE_CHUNK_SIZE = int(os.getenv('COUNTER_RECONCILE_CHUNK_SIZE', '1000'))  # Users per transaction
+
+# Admin broadcasts (/broadcast)
+BROADCAST_PAGE_SIZE = int(os.getenv('BROADCAST_PAGE_SIZE', '500'))  # Recipients per query and checkpoint
+BROADCAST_CONCURRENCY = int(os.getenv('BROADCAST_CONCURRENCY', '20'))  # Sends in flight
+BROADCAST_RATE = float(os.getenv('BROADCAST_RATE', '25'))  # Messages per second when OUTBOUND_RATE_LIMIT is off
+BROADCAST_RESUME_DELAY = int(os.getenv('BROADCAST_RESUME_DELAY', '10'))  # Seconds after startup
 
 # Game Settings
 DAILY_FREE_EGG_COOLDOWN = 24 * 60 * 60
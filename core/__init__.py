@@ -0,0 +1,16 @@
+from .update_processor import PerUserUpdateProcessor
+from .router import Router, RouterHandler, PrefixTrie, get_router
+from .screens import Screen, ScreenCache, cached_screen, screen_cache
+from .edits import EditFingerprints, edit_fingerprints, edit_message_text
+from .rate_limiter import (
+    PriorityRateLimiter, TokenBucket, outbound_lane, priority_lane, retry_after_seconds,
+    PAYMENT, INTERACTIVE, NOTIFICATION, BROADCAST
+)
+
+__all__ = [
+    'PerUserUpdateProcessor', 'Router', 'RouterHandler', 'PrefixTrie', 'get_router',
+    'Screen', 'ScreenCache', 'cached_screen', 'screen_cache',
+    'EditFingerprints', 'edit_fingerprints', 'edit_message_text',
+    'PriorityRateLimiter', 'TokenBucket', 'outbound_lane', 'priority_lane', 'retry_after_seconds',
+    'PAYMENT', 'INTERACTIVE', 'NOTIFICATION', 'BROADCAST'
+]
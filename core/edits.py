@@ -0,0 +1,85 @@
+"""
+Skip message edits that would not change anything.
+
+Refresh buttons (check_eggs, check_plants) often re-render exactly what the
+message already shows, and Telegram answers such an edit with "message is
+not modified" after spending a request of our outbound budget on it.
+
+For each (chat_id, message_id) the store keeps a fingerprint of the source
+we last rendered into it (text, parse mode, markup) and of the message that
+came back. An edit is skipped when the source is unchanged and the message
+in the callback still looks the way we left it, so an edit made elsewhere
+(another handler, another bot instance) never hides a real change.
+"""
+
+import logging
+from telegram.error import BadRequest
+from utils.cache import TTLCache
+import config
+
+logger = logging.getLogger(__name__)
+
+def _markup_key(reply_markup):
+    return reply_markup.to_json() if reply_markup is not None else None
+
+def _shown(message) -> int:
+    """Fingerprint of what a message currently displays"""
+    return hash((getattr(message, 'text', None), _markup_key(getattr(message, 'reply_markup', None))))
+
+class EditFingerprints:
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.sent = 0
+        self.skipped = 0
+        self.not_modified = 0
+    
+    def unchanged(self, key, rendered: int, message) -> bool:
+        entry = self._cache.get(key)
+        return entry is not None and entry == (rendered, _shown(message))
+    
+    def record(self, key, rendered: int, message):
+        self._cache.set(key, (rendered, _shown(message)))
+    
+    def forget(self, key):
+        self._cache.invalidate(key)
+    
+    def stats(self) -> dict:
+        return {
+            'size': len(self._cache),
+            'sent': self.sent,
+            'skipped': self.skipped,
+            'not_modified': self.not_modified
+        }
+
+edit_fingerprints = EditFingerprints(config.EDIT_FINGERPRINT_CACHE_SIZE, config.EDIT_FINGERPRINT_TTL)
+
+async def edit_message_text(query, text: str, reply_markup=None, parse_mode: str = None) -> bool:
+    """
+    query.edit_message_text unless the message already shows this render.
+    Handlers answer the query themselves, so a skipped edit costs no API
+    call at all. Returns True if an edit was sent.
+    """
+    message = query.message
+    key = (message.chat_id, message.message_id) if message is not None else None
+    rendered = hash((text, parse_mode, _markup_key(reply_markup)))
+    
+    if key is not None and edit_fingerprints.unchanged(key, rendered, message):
+        edit_fingerprints.skipped += 1
+        return False
+    
+    try:
+        result = await query.edit_message_text(text=text, reply_markup=reply_markup, parse_mode=parse_mode)
+    except BadRequest as e:
+        if 'not modified' not in str(e).lower():
+            raise
+        # Rendered by a path that bypasses the store (or before a restart)
+        edit_fingerprints.not_modified += 1
+        return False
+    
+    edit_fingerprints.sent += 1
+    if key is not None:
+        if isinstance(result, bool):
+            edit_fingerprints.forget(key)
+        else:
+            edit_fingerprints.record(key, rendered, result)
+    return True
@@ -0,0 +1,264 @@
+"""
+Outbound Bot API scheduling.
+
+Every request the bot makes goes through ``PriorityRateLimiter`` (PTB's
+``BaseRateLimiter`` hook in ExtBot), so handlers keep calling
+``reply_text``/``edit_message_text``/``query.answer`` as before.
+
+A request first takes a token from its chat's bucket (private chats and
+groups have different limits; requests without a chat_id skip this), then
+waits for a token from the global bucket. Global tokens are handed out by
+lane, so a payment confirmation overtakes queued notifications.
+
+The lane comes from, in order: ``rate_limit_args={'lane': ...}`` on ExtBot
+methods, the enclosing ``outbound_lane()`` block or ``@priority_lane``
+handler, the endpoint (pre-checkout answers are payments), else INTERACTIVE.
+
+On ``RetryAfter`` the chat (or everything, for requests without a chat) is
+paused for the advertised time and the request is re-queued in its lane,
+up to ``max_retries`` times.
+"""
+
+import asyncio
+import functools
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+import config
+
+logger = logging.getLogger(__name__)
+
+# Lanes, highest priority first
+PAYMENT = 0
+INTERACTIVE = 1
+NOTIFICATION = 2
+BROADCAST = 3
+LANE_NAMES = {PAYMENT: 'payment', INTERACTIVE: 'interactive', NOTIFICATION: 'notification', BROADCAST: 'broadcast'}
+
+ENDPOINT_LANES = {
+    'answerPreCheckoutQuery': PAYMENT,
+}
+
+_lane: ContextVar[int] = ContextVar('outbound_lane', default=None)
+
+@contextmanager
+def outbound_lane(lane: int):
+    """Send the Bot API requests made inside the block in lane"""
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+def priority_lane(lane: int):
+    """Declare the lane of every Bot API request an async handler makes"""
+    def decorator(callback):
+        @functools.wraps(callback)
+        async def wrapper(*args, **kwargs):
+            with outbound_lane(lane):
+                return await callback(*args, **kwargs)
+        wrapper.outbound_lane = lane
+        return wrapper
+    return decorator
+
+def retry_after_seconds(error: RetryAfter) -> float:
+    """RetryAfter.retry_after is an int in PTB 21 and a timedelta in later releases"""
+    delay = error.retry_after
+    return delay.total_seconds() if isinstance(delay, timedelta) else delay
+
+class TokenBucket:
+    """Refills rate tokens per second up to burst"""
+    __slots__ = ('rate', 'burst', 'tokens', 'updated', 'paused_until')
+    
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+        self.paused_until = 0.0
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available"""
+        self._refill(now)
+        wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+        return max(wait, self.paused_until - now)
+    
+    def reserve(self, now: float) -> float:
+        """Take a token, possibly ahead of time; returns how long to wait before using it"""
+        wait = max(self.paused_until - now, 0.0)
+        self._refill(now)
+        self.tokens -= 1
+        if self.tokens < 0:
+            wait = max(wait, -self.tokens / self.rate)
+        return wait
+    
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+    
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.burst and self.paused_until <= now
+
+class _LaneStats:
+    __slots__ = ('waits', 'queued', 'sent', 'max_wait')
+    
+    def __init__(self, samples: int):
+        self.waits = deque(maxlen=samples)
+        self.queued = 0
+        self.sent = 0
+        self.max_wait = 0.0
+
+class PriorityRateLimiter(BaseRateLimiter):
+    def __init__(
+        self,
+        global_rate: float = None,
+        global_burst: float = None,
+        chat_rate: float = None,
+        chat_burst: float = None,
+        group_rate: float = None,
+        max_retries: int = None,
+        wait_samples: int = 1000,
+        clock=time.monotonic
+    ):
+        self._clock = clock
+        self.global_bucket = TokenBucket(
+            global_rate or config.OUTBOUND_GLOBAL_RATE, global_burst or config.OUTBOUND_GLOBAL_BURST, clock()
+        )
+        self.chat_rate = chat_rate or config.OUTBOUND_CHAT_RATE
+        self.chat_burst = chat_burst or config.OUTBOUND_CHAT_BURST
+        self.group_rate = group_rate or config.OUTBOUND_GROUP_RATE
+        self.max_retries = config.OUTBOUND_MAX_RETRIES if max_retries is None else max_retries
+        self._chats = {}
+        self._queue = []
+        self._sequence = itertools.count()
+        self._wake = None
+        self._dispatcher = None
+        self._lanes = {lane: _LaneStats(wait_samples) for lane in LANE_NAMES}
+        self.retry_after = 0
+    
+    async def initialize(self):
+        if self._dispatcher is None or self._dispatcher.done():
+            self._wake = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch(), name='outbound_dispatcher')
+    
+    async def shutdown(self):
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        for _, _, future in self._queue:
+            future.cancel()
+        self._queue.clear()
+    
+    def _chat_bucket(self, chat_id, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= config.OUTBOUND_CHAT_BUCKETS:
+                # Full buckets carry no state worth keeping
+                self._chats = {key: b for key, b in self._chats.items() if not b.idle(now)}
+            # Negative ids are groups and channels, which Telegram limits per minute
+            rate = self.group_rate if isinstance(chat_id, int) and chat_id < 0 else self.chat_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, self.chat_burst, now)
+        return bucket
+    
+    async def _dispatch(self):
+        """Hand out global tokens, lowest lane first"""
+        while True:
+            if not self._queue:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            delay = self.global_bucket.delay(self._clock())
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            _, _, future = heapq.heappop(self._queue)
+            if not future.done():
+                self.global_bucket.take(self._clock())
+                future.set_result(None)
+    
+    async def _acquire(self, chat_id, lane: int):
+        stats = self._lanes[lane]
+        enqueued_at = self._clock()
+        stats.queued += 1
+        try:
+            if chat_id is not None:
+                wait = self._chat_bucket(chat_id, enqueued_at).reserve(enqueued_at)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            
+            if self._dispatcher is None:
+                await self.initialize()
+            future = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._queue, (lane, next(self._sequence), future))
+            self._wake.set()
+            await future
+        finally:
+            stats.queued -= 1
+        
+        wait = self._clock() - enqueued_at
+        stats.waits.append(wait)
+        stats.max_wait = max(stats.max_wait, wait)
+        stats.sent += 1
+    
+    @staticmethod
+    def resolve_lane(endpoint: str, rate_limit_args) -> int:
+        if isinstance(rate_limit_args, dict) and 'lane' in rate_limit_args:
+            return rate_limit_args['lane']
+        lane = _lane.get()
+        if lane is not None:
+            return lane
+        return ENDPOINT_LANES.get(endpoint, INTERACTIVE)
+    
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        lane = self.resolve_lane(endpoint, rate_limit_args)
+        chat_id = data.get('chat_id')
+        
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(chat_id, lane)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                self.retry_after += 1
+                delay = retry_after_seconds(e)
+                now = self._clock()
+                bucket = self._chat_bucket(chat_id, now) if chat_id is not None else self.global_bucket
+                bucket.paused_until = max(bucket.paused_until, now + delay)
+                logger.warning(f"{endpoint} hit a flood limit (chat {chat_id}), retrying in {delay}s")
+    
+    def stats(self) -> dict:
+        def percentile(waits, p):
+            return waits[min(len(waits) - 1, int(len(waits) * p))] if waits else 0.0
+        
+        lanes = {}
+        for lane, stats in self._lanes.items():
+            waits = sorted(stats.waits)
+            lanes[LANE_NAMES[lane]] = {
+                'queued': stats.queued,
+                'sent': stats.sent,
+                'wait_p50_ms': percentile(waits, 0.50) * 1000,
+                'wait_p99_ms': percentile(waits, 0.99) * 1000,
+                'wait_max_ms': stats.max_wait * 1000
+            }
+        return {
+            'lanes': lanes,
+            'chats_tracked': len(self._chats),
+            'retry_after': self.retry_after
+        }
@@ -0,0 +1,150 @@
+"""
+Central dispatch for reply-keyboard buttons and inline callback data.
+
+Every button text is registered once per language from ``localization.MESSAGES``
+into a dict, and callback data is matched exactly or by the longest registered
+prefix via a trie. A single ``RouterHandler`` in handler group 0 then resolves
+any update with one lookup instead of PTB testing a chain of regex handlers.
+"""
+
+import logging
+from telegram import Update
+from telegram.ext import BaseHandler
+from localization import MESSAGES
+
+logger = logging.getLogger(__name__)
+
+class PrefixTrie:
+    """Character trie returning the value of the longest registered prefix of a key"""
+    
+    _VALUE = object()
+    
+    def __init__(self):
+        self._root = {}
+    
+    def insert(self, prefix: str, value):
+        node = self._root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[self._VALUE] = value
+    
+    def get(self, prefix: str):
+        node = self._root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return None
+        return node.get(self._VALUE)
+    
+    def longest_prefix(self, key: str):
+        node = self._root
+        match = node.get(self._VALUE)
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                break
+            match = node.get(self._VALUE, match)
+        return match
+
+class Router:
+    """Maps button texts and callback data to handler callbacks"""
+    
+    def __init__(self):
+        self.texts = {}
+        self.text_prefixes = PrefixTrie()
+        self.callbacks = {}
+        self.callback_prefixes = PrefixTrie()
+    
+    @staticmethod
+    def _register(table: dict, key: str, callback, kind: str):
+        existing = table.get(key)
+        if existing is not None and existing is not callback:
+            raise ValueError(
+                f"{kind} {key!r} is already routed to {existing.__qualname__}, "
+                f"cannot route it to {callback.__qualname__}"
+            )
+        table[key] = callback
+    
+    @staticmethod
+    def _register_prefix(trie: PrefixTrie, prefix: str, callback, kind: str):
+        existing = trie.get(prefix)
+        if existing is not None and existing is not callback:
+            raise ValueError(
+                f"{kind} prefix {prefix!r} is already routed to {existing.__qualname__}, "
+                f"cannot route it to {callback.__qualname__}"
+            )
+        trie.insert(prefix, callback)
+    
+    def add_text(self, callback, *texts: str):
+        """Route exact message texts (literal button labels)"""
+        for text in texts:
+            self._register(self.texts, text, callback, 'Text')
+    
+    def add_button(self, callback, *keys: str):
+        """Route a localized button: the text of each key in every language"""
+        for key in keys:
+            for lang, messages in MESSAGES.items():
+                if key in messages:
+                    self._register(self.texts, messages[key], callback, 'Text')
+                else:
+                    logger.warning(f"Button '{key}' has no '{lang}' translation")
+    
+    def add_text_prefix(self, callback, prefix: str):
+        """Route message texts starting with prefix (buttons carrying an id)"""
+        self._register_prefix(self.text_prefixes, prefix, callback, 'Text')
+    
+    def add_callback(self, callback, *data: str):
+        """Route exact callback data"""
+        for value in data:
+            self._register(self.callbacks, value, callback, 'Callback')
+    
+    def add_callback_prefix(self, callback, prefix: str):
+        """Route callback data starting with prefix, e.g. 'view_dragon_' + id"""
+        self._register_prefix(self.callback_prefixes, prefix, callback, 'Callback')
+    
+    def resolve(self, update: object):
+        """Return the callback for an update, or None if nothing is routed"""
+        if not isinstance(update, Update):
+            return None
+        
+        query = update.callback_query
+        if query is not None:
+            data = query.data
+            if data is None:
+                return None
+            return self.callbacks.get(data) or self.callback_prefixes.longest_prefix(data)
+        
+        message = update.message
+        if message is not None and message.text is not None:
+            text = message.text
+            return self.texts.get(text) or self.text_prefixes.longest_prefix(text)
+        
+        return None
+
+class RouterHandler(BaseHandler):
+    """PTB handler that dispatches through a Router"""
+    
+    def __init__(self, router: Router):
+        super().__init__(self._dispatch)
+        self.router = router
+    
+    async def _dispatch(self, update, context):
+        # Never called directly - handle_update passes the resolved callback
+        raise RuntimeError("RouterHandler dispatches via handle_update")
+    
+    def check_update(self, update: object):
+        return self.router.resolve(update)
+    
+    async def handle_update(self, update, application, check_result, context):
+        self.collect_additional_context(context, update, application, check_result)
+        return await check_result(update, context)
+
+def get_router(application) -> Router:
+    """Return the application's router, installing it in handler group 0 on first use"""
+    for handler in application.handlers.get(0, []):
+        if isinstance(handler, RouterHandler):
+            return handler.router
+    
+    router = Router()
+    application.add_handler(RouterHandler(router))
+    return router
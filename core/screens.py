@@ -0,0 +1,68 @@
+"""
+Rendered-screen cache for static and semi-static menus.
+
+A screen builder turns a language into the parts of a menu that are the
+same for every player: the text around one per-user slot, plus the reply
+markup object. Builders run once per (screen, language, balance version,
+catalog version) and handlers splice the per-user fragment (usually a
+balance line) into the cached text. Reloading the game balance or the
+texts drops every cached screen.
+"""
+
+import functools
+from dataclasses import dataclass
+from utils.balance import balance_version, on_balance_reload
+from localization import CATALOG
+
+@dataclass(frozen=True)
+class Screen:
+    head: str
+    reply_markup: object = None
+    tail: str = ''
+    
+    def render(self, fragment: str = '') -> str:
+        """Full text with the per-user fragment spliced in between head and tail"""
+        return self.head + fragment + self.tail
+
+class ScreenCache:
+    def __init__(self):
+        self._screens = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, name: str, lang: str, build) -> Screen:
+        # The versions in the key keep a screen built during a reload from being served afterwards
+        key = (name, lang, balance_version(), CATALOG.version)
+        screen = self._screens.get(key)
+        if screen is None:
+            self.misses += 1
+            screen = self._screens[key] = build(lang)
+        else:
+            self.hits += 1
+        return screen
+    
+    def clear(self, version: int = None):
+        self._screens.clear()
+    
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._screens),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+screen_cache = ScreenCache()
+on_balance_reload(screen_cache.clear)
+CATALOG.on_compile(screen_cache.clear)
+
+def cached_screen(build):
+    """Decorate a builder(lang) -> Screen so calls return the cached Screen"""
+    name = f"{build.__module__}.{build.__qualname__}"
+    
+    @functools.wraps(build)
+    def get(lang: str) -> Screen:
+        return screen_cache.get(name, lang, build)
+    get.build = build
+    return get
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from database import unit_of_work
+from database.budget import statement_budget
+from utils.clock import request_time
+import config
+
+logger = logging.getLogger(__name__)
+
+class _UserSlot:
+    """Per-user lock plus the number of updates holding or waiting for it"""
+    __slots__ = ('lock', 'pending')
+    
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.pending = 0
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Runs updates from different users in parallel while updates from the same
+    user run one at a time, in arrival order.
+    
+    PTB holds one of ``max_pending_updates`` slots for every update it hands
+    over. An update then waits for its user's lock and only afterwards for one
+    of ``max_concurrent_updates`` running slots, so a user spamming a button
+    queues behind themselves without occupying slots other players need.
+    Per-user locks are dropped as soon as nobody holds or waits for them.
+    """
+    
+    def __init__(self, max_concurrent_updates: int, max_pending_updates: int = None, wait_samples: int = 1000):
+        super().__init__(max(max_pending_updates or max_concurrent_updates * 64, max_concurrent_updates))
+        self.running_limit = max_concurrent_updates
+        self._running = asyncio.BoundedSemaphore(max_concurrent_updates)
+        self._slots = {}
+        self._waits = deque(maxlen=wait_samples)
+        self.pending = 0
+        self.active = 0
+        self.processed = 0
+        self.max_wait = 0.0
+        self.max_statements = 0
+        self.over_budget = 0
+    
+    @staticmethod
+    def get_key(update: object):
+        if isinstance(update, Update) and update.effective_user:
+            return update.effective_user.id
+        return None
+    
+    async def do_process_update(self, update: object, coroutine):
+        key = self.get_key(update)
+        enqueued_at = time.monotonic()
+        self.pending += 1
+        
+        if key is None:
+            # Nothing to serialize on (channel posts, polls, ...)
+            try:
+                await self._run(coroutine, enqueued_at)
+            finally:
+                self.pending -= 1
+            return
+        
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = _UserSlot()
+        slot.pending += 1
+        
+        try:
+            async with slot.lock:
+                await self._run(coroutine, enqueued_at)
+        finally:
+            self.pending -= 1
+            slot.pending -= 1
+            if slot.pending == 0:
+                del self._slots[key]
+    
+    async def _run(self, coroutine, enqueued_at: float):
+        async with self._running:
+            wait = time.monotonic() - enqueued_at
+            self._waits.append(wait)
+            self.max_wait = max(self.max_wait, wait)
+            self.active += 1
+            budget = None
+            try:
+                with request_time(), statement_budget('update', config.SQL_UPDATE_BUDGET) as budget, unit_of_work():
+                    await coroutine
+            except Exception as e:
+                logger.error(f"Unhandled error while processing update: {e}")
+            finally:
+                self.active -= 1
+                self.processed += 1
+                if budget is not None:
+                    self.max_statements = max(self.max_statements, budget.count)
+                    self.over_budget += budget.exceeded
+    
+    async def initialize(self):
+        pass
+    
+    async def shutdown(self):
+        pass
+    
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+        
+        def percentile(p):
+            return waits[min(len(waits) - 1, int(len(waits) * p))] if waits else 0.0
+        
+        return {
+            'running_limit': self.running_limit,
+            'active': self.active,
+            'queue_depth': self.pending - self.active,
+            'users_queued': len(self._slots),
+            'max_user_queue_depth': max((slot.pending for slot in self._slots.values()), default=0),
+            'processed': self.processed,
+            'wait_p50_ms': percentile(0.50) * 1000,
+            'wait_p99_ms': percentile(0.99) * 1000,
+            'wait_max_ms': self.max_wait * 1000,
+            'sql_max_statements': self.max_statements,
+            'sql_over_budget': self.over_budget
+        }
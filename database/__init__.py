@@ -1,4 +1,7 @@
-from .db import init_db, get_session
+from .db import init_db, get_session, unit_of_work, get_async_session, dispose_async_engine
 from .models import User, Dragon, Egg, Plant, Garden
 
-__all__ = ['init_db', 'get_session', 'User', 'Dragon', 'Egg', 'Plant', 'Garden']
+__all__ = [
+    'init_db', 'get_session', 'unit_of_work', 'get_async_session', 'dispose_async_engine',
+    'User', 'Dragon', 'Egg', 'Plant', 'Garden'
+]
@@ -0,0 +1,130 @@
+"""
+Index audit for the per-user service queries.
+
+Runs every read issued by the services against a throwaway user, asks the
+database for the plan of each statement and flags sequential scans. All
+work happens inside a transaction that is rolled back afterwards.
+
+Usage:
+    python -m database.audit
+"""
+
+import sys
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .db import engine, init_db
+from services import UserService, EggService, GardenService, DragonService, BattlepassService
+
+class _ProbeTelegramUser:
+    id = -1
+    username = 'index_audit'
+    first_name = 'Index Audit'
+
+# (name, call) pairs - each call receives (session, user) and issues the same
+# queries the handlers trigger through the services
+SERVICE_QUERIES = [
+    ('UserService.get_or_create_user',
+     lambda session, user: UserService.get_or_create_user(session, _ProbeTelegramUser())),
+    ('EggService.get_user_eggs',
+     lambda session, user: EggService.get_user_eggs(session, user)),
+    ('EggService.get_egg_by_id',
+     lambda session, user: EggService.get_egg_by_id(session, 1, user.id)),
+    ('EggService.check_ready_eggs',
+     lambda session, user: EggService.check_ready_eggs(session, user)),
+    ('GardenService.get_user_plants',
+     lambda session, user: GardenService.get_user_plants(session, user)),
+    ('GardenService.get_plant_by_id',
+     lambda session, user: GardenService.get_plant_by_id(session, 1, user.id)),
+    ('GardenService.check_ready_plants',
+     lambda session, user: GardenService.check_ready_plants(session, user)),
+    ('GardenService.get_user_garden',
+     lambda session, user: GardenService.get_user_garden(session, user)),
+    ('DragonService.get_user_dragons',
+     lambda session, user: DragonService.get_user_dragons(session, user)),
+    ('DragonService.get_dragon_by_id',
+     lambda session, user: DragonService.get_dragon_by_id(session, 1, user.id)),
+    ('BattlepassService.get_or_create_battlepass',
+     lambda session, user: BattlepassService.get_or_create_battlepass(session, user)),
+]
+
+def _explain(connection, statement, parameters):
+    """Return the plan lines for a statement and whether it contains a sequential scan"""
+    if connection.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        plan = [row[-1] for row in rows]
+        # "SCAN <table>" without an index is a full table scan; "SEARCH ... USING INDEX" is fine
+        seq_scan = any(line.startswith('SCAN ') and 'USING' not in line for line in plan)
+    else:
+        rows = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).fetchall()
+        plan = [row[0] for row in rows]
+        seq_scan = any('Seq Scan' in line for line in plan)
+    return plan, seq_scan
+
+def audit_service_queries():
+    """Run EXPLAIN on every service query. Returns a list of result dicts."""
+    init_db()
+    results = []
+    
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            if connection.dialect.name == 'postgresql':
+                # Small tables are always seq-scanned; force the planner to show
+                # whether a usable index exists at all
+                connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            
+            session = Session(bind=connection, autoflush=False)
+            user = UserService.get_or_create_user(session, _ProbeTelegramUser())
+            
+            captured = []
+            
+            def capture(conn, cursor, statement, parameters, context, executemany):
+                if statement.lstrip().upper().startswith('SELECT'):
+                    captured.append((statement, parameters))
+            
+            event.listen(connection, 'before_cursor_execute', capture)
+            try:
+                for name, call in SERVICE_QUERIES:
+                    captured.clear()
+                    savepoint = session.begin_nested()
+                    try:
+                        call(session, user)
+                    finally:
+                        savepoint.rollback()
+                    
+                    for statement, parameters in list(captured):
+                        plan, seq_scan = _explain(connection, statement, parameters)
+                        results.append({
+                            'name': name,
+                            'statement': statement,
+                            'plan': plan,
+                            'seq_scan': seq_scan
+                        })
+            finally:
+                event.remove(connection, 'before_cursor_execute', capture)
+                session.close()
+        finally:
+            transaction.rollback()
+    
+    return results
+
+def format_audit_report(results):
+    lines = []
+    for result in results:
+        status = "❌ SEQ SCAN" if result['seq_scan'] else "✅ indexed"
+        lines.append(f"{status}  {result['name']}")
+        for plan_line in result['plan']:
+            lines.append(f"    {plan_line}")
+    
+    flagged = sum(1 for result in results if result['seq_scan'])
+    lines.append("")
+    lines.append(f"{len(results)} queries audited, {flagged} sequential scan(s)")
+    return "\n".join(lines)
+
+def main():
+    results = audit_service_queries()
+    print(format_audit_report(results))
+    return 1 if any(result['seq_scan'] for result in results) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
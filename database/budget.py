@@ -0,0 +1,72 @@
+"""
+Per-update SQL statement budgets.
+
+A ``statement_budget`` block counts every statement executed on any engine,
+sync or async, from the task that opened it. Exceeding the limit is logged,
+or raises ``StatementBudgetExceeded`` when ``SQL_BUDGET_STRICT`` is on (the
+tests), so a screen that grows an N+1 fails at the offending statement.
+
+Handlers declare their own budget with ``@sql_budget(n)``; the update
+processor wraps every update in a looser ``SQL_UPDATE_BUDGET``.
+"""
+
+import functools
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import config
+
+logger = logging.getLogger(__name__)
+
+class StatementBudgetExceeded(RuntimeError):
+    pass
+
+class StatementBudget:
+    __slots__ = ('name', 'limit', 'strict', 'count')
+    
+    def __init__(self, name: str, limit: int, strict: bool):
+        self.name = name
+        self.limit = limit
+        self.strict = strict
+        self.count = 0
+    
+    @property
+    def exceeded(self) -> bool:
+        return self.count > self.limit
+
+# Budgets open in the current context, outermost first
+_active: ContextVar[tuple] = ContextVar('sql_statement_budgets', default=())
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    for budget in _active.get():
+        budget.count += 1
+        if budget.strict and budget.count == budget.limit + 1:
+            raise StatementBudgetExceeded(
+                f"{budget.name} exceeded its budget of {budget.limit} SQL statements: {statement}"
+            )
+
+@contextmanager
+def statement_budget(name: str, limit: int, strict: bool = None):
+    """Count the statements run inside the block against limit"""
+    budget = StatementBudget(name, limit, config.SQL_BUDGET_STRICT if strict is None else strict)
+    token = _active.set(_active.get() + (budget,))
+    try:
+        yield budget
+    finally:
+        _active.reset(token)
+        if budget.exceeded and not budget.strict:
+            logger.warning(f"{name} ran {budget.count} SQL statements (budget {limit})")
+
+def sql_budget(limit: int):
+    """Declare how many SQL statements an async handler may run per update"""
+    def decorator(callback):
+        @functools.wraps(callback)
+        async def wrapper(*args, **kwargs):
+            with statement_budget(callback.__qualname__, limit):
+                return await callback(*args, **kwargs)
+        wrapper.sql_budget = limit
+        return wrapper
+    return decorator
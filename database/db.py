@@ -1,24 +1,158 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
-from contextlib import contextmanager
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
+import asyncio
+import threading
 import config
 
 engine = create_engine(config.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Services leave pending changes to autoflush/commit and only flush when they need a generated id
+SessionLocal = sessionmaker(autocommit=False, autoflush=True, expire_on_commit=False, bind=engine)
 Base = declarative_base()
 
+# Async drivers used for each backend when the async engine is created
+ASYNC_DRIVERS = {
+    'sqlite': 'aiosqlite',
+    'postgresql': 'asyncpg',
+}
+
+_async_engine = None
+_AsyncSessionLocal = None
+
 def init_db():
     from .models import User, Dragon, Egg, Plant, Garden, Battlepass, Purchase, CryptoTransaction
+    from .migrations import run_migrations
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    ensure_indexes()
+
+def ensure_indexes():
+    """Create indexes missing from existing tables (create_all only indexes new tables)"""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+class UnitOfWork:
+    """The sessions shared by every get_session()/get_async_session() of one task (one update in the bot)"""
+    __slots__ = ('owner', 'session', 'depth', 'async_session', 'async_depth')
+    
+    def __init__(self, owner):
+        self.owner = owner
+        self.session = None
+        self.depth = 0
+        self.async_session = None
+        self.async_depth = 0
+
+_unit_of_work: ContextVar = ContextVar('unit_of_work', default=None)
+
+def _current_owner():
+    # Tasks spawned from a handler inherit its context; they must not share its session
+    try:
+        return asyncio.current_task() or threading.get_ident()
+    except RuntimeError:
+        return threading.get_ident()
+
+def _current_unit_of_work():
+    uow = _unit_of_work.get()
+    return uow if uow is not None and uow.owner == _current_owner() else None
 
 @contextmanager
-def get_session():
-    session = SessionLocal()
+def unit_of_work():
+    """
+    Keep one session for everything the block runs (the update processor
+    opens one per update). get_session() and get_async_session() blocks
+    inside reuse it; each outermost block still commits when it ends, so no
+    transaction stays open while the handler talks to Telegram.
+    """
+    uow = _current_unit_of_work()
+    if uow is not None:
+        yield uow
+        return
+    
+    uow = UnitOfWork(_current_owner())
+    token = _unit_of_work.set(uow)
     try:
-        yield session
-        session.commit()
-    except Exception:
-        session.rollback()
-        raise
+        yield uow
     finally:
-        session.close()
+        _unit_of_work.reset(token)
+        if uow.session is not None:
+            uow.session.close()
+        if uow.async_session is not None:
+            # Every async block has committed or rolled back, so this only clears the identity map
+            uow.async_session.sync_session.close()
+
+@contextmanager
+def get_session():
+    """Transactional session scope; nested calls join the enclosing one"""
+    with unit_of_work() as uow:
+        if uow.session is None:
+            uow.session = SessionLocal()
+        session = uow.session
+        
+        uow.depth += 1
+        try:
+            yield session
+            if uow.depth == 1:
+                session.commit()
+        except Exception:
+            if uow.depth == 1:
+                session.rollback()
+            raise
+        finally:
+            uow.depth -= 1
+
+def get_async_url(database_url: str):
+    """Translate a sync DATABASE_URL into its async-driver equivalent"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend == 'postgres':
+        backend = 'postgresql'
+    driver = ASYNC_DRIVERS.get(backend)
+    if not driver:
+        raise ValueError(f"No async driver configured for database backend '{backend}'")
+    return url.set(drivername=f"{backend}+{driver}")
+
+def get_async_engine():
+    """Create the async engine on first use so the sync path never needs the async drivers"""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        _async_engine = create_async_engine(get_async_url(config.DATABASE_URL))
+        _AsyncSessionLocal = async_sessionmaker(
+            bind=_async_engine,
+            autoflush=True,
+            expire_on_commit=False
+        )
+    return _async_engine
+
+@asynccontextmanager
+async def get_async_session():
+    """Async transactional session scope; nested calls join the enclosing one"""
+    get_async_engine()
+    with unit_of_work() as uow:
+        if uow.async_session is None:
+            uow.async_session = _AsyncSessionLocal()
+        session = uow.async_session
+        
+        uow.async_depth += 1
+        try:
+            yield session
+            if uow.async_depth == 1:
+                await session.commit()
+        except BaseException:
+            # Cancellation included: the connection must go back to the pool here
+            if uow.async_depth == 1:
+                await session.rollback()
+            raise
+        finally:
+            uow.async_depth -= 1
+
+async def dispose_async_engine():
+    """Close pooled async connections (called on application shutdown)"""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _AsyncSessionLocal = None
@@ -0,0 +1,25 @@
+"""
+Portable SQL expressions that differ between backends.
+"""
+
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+class seconds_between(FunctionElement):
+    """Whole seconds from start to end (DateTime expressions), truncated"""
+    type = BigInteger()
+    name = 'seconds_between'
+    inherit_cache = True
+
+@compiles(seconds_between)
+def _seconds_between_default(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return (f"CAST(FLOOR(EXTRACT(EPOCH FROM ({compiler.process(end, **kw)} - {compiler.process(start, **kw)})))"
+            f" AS BIGINT)")
+
+@compiles(seconds_between, 'sqlite')
+def _seconds_between_sqlite(element, compiler, **kw):
+    start, end = list(element.clauses)
+    return (f"CAST((julianday({compiler.process(end, **kw)}) - julianday({compiler.process(start, **kw)}))"
+            f" * 86400 AS INTEGER)")
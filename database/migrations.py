@@ -0,0 +1,86 @@
+"""
+One-off schema migrations for existing databases.
+
+``create_all`` only creates missing tables, so changes to tables that
+already exist are applied here. Every migration inspects the live schema
+first and is a no-op when it has already been applied, so ``init_db``
+can run them on every start.
+
+Usage:
+    python -m database.migrations
+"""
+
+import logging
+from datetime import datetime
+from sqlalchemy import inspect, text
+
+logger = logging.getLogger(__name__)
+
+def drop_plants_is_ready(connection) -> bool:
+    """Readiness is derived from plants.ready_at (Plant.is_ready); the stored flag is obsolete"""
+    inspector = inspect(connection)
+    if not inspector.has_table('plants'):
+        return False
+    if 'is_ready' not in {column['name'] for column in inspector.get_columns('plants')}:
+        return False
+    connection.exec_driver_sql("ALTER TABLE plants DROP COLUMN is_ready")
+    return True
+
+def add_dragons_baseline_at(connection) -> bool:
+    """
+    Hunger/happiness decay lazily from dragons.baseline_at. Existing rows
+    hold the values the decay job last wrote, so they are anchored at now.
+    """
+    inspector = inspect(connection)
+    if not inspector.has_table('dragons'):
+        return False
+    if 'baseline_at' in {column['name'] for column in inspector.get_columns('dragons')}:
+        return False
+    connection.exec_driver_sql("ALTER TABLE dragons ADD COLUMN baseline_at TIMESTAMP")
+    connection.execute(text("UPDATE dragons SET baseline_at = :now"), {'now': datetime.utcnow()})
+    return True
+
+def add_users_counters(connection) -> bool:
+    """Add the denormalized per-user counters and backfill them from the owned rows"""
+    inspector = inspect(connection)
+    if not inspector.has_table('users'):
+        return False
+    existing = {column['name'] for column in inspector.get_columns('users')}
+    counters = {
+        'dragon_count': "SELECT COUNT(*) FROM dragons WHERE dragons.user_id = users.id",
+        'active_egg_count': "SELECT COUNT(*) FROM eggs WHERE eggs.user_id = users.id AND eggs.is_hatched = :false",
+        'growing_plant_count': "SELECT COUNT(*) FROM plants WHERE plants.user_id = users.id AND plants.is_harvested = :false",
+    }
+    missing = [name for name in counters if name not in existing]
+    if not missing:
+        return False
+    for name in missing:
+        connection.exec_driver_sql(f"ALTER TABLE users ADD COLUMN {name} INTEGER NOT NULL DEFAULT 0")
+    assignments = ", ".join(f"{name} = ({counters[name]})" for name in missing)
+    connection.execute(text(f"UPDATE users SET {assignments}"), {'false': False})
+    return True
+
+# Applied in order
+MIGRATIONS = [
+    drop_plants_is_ready,
+    add_dragons_baseline_at,
+    add_users_counters,
+]
+
+def run_migrations(engine) -> list:
+    """Apply pending migrations in one transaction. Returns the names of those applied."""
+    applied = []
+    with engine.begin() as connection:
+        for migration in MIGRATIONS:
+            if migration(connection):
+                logger.info(f"Applied migration {migration.__name__}")
+                applied.append(migration.__name__)
+    return applied
+
+def main():
+    from .db import engine
+    applied = run_migrations(engine)
+    print("\n".join(f"✅ {name}" for name in applied) or "Nothing to migrate")
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,15 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, JSON, Index, case, func, literal
 from sqlalchemy.orm import relationship
+from sqlalchemy.ext.hybrid import hybrid_property
 from datetime import datetime
+from utils.clock import now
 from .db import Base
+from .functions import seconds_between
+import config
+
+# Loader strategy of every relationship unless a query asks for another one.
+# 'raise' (used by the tests) turns any lazy load a screen did not plan for into an error.
+RELATIONSHIP_LAZY = config.DB_RELATIONSHIP_LAZY
 
 class User(Base):
     __tablename__ = 'users'
@@ -20,36 +28,69 @@ class User(Base):
     last_daily_egg = Column(DateTime, nullable=True)
     last_daily_gold_claim = Column(DateTime, nullable=True)
     last_premium_seeds_claim = Column(DateTime, nullable=True)
+    # Denormalized counts, kept in step by the services (UserService.increment)
+    # and repaired by jobs.counter_reconciler
+    dragon_count = Column(Integer, default=0, server_default='0', nullable=False)
+    active_egg_count = Column(Integer, default=0, server_default='0', nullable=False)
+    growing_plant_count = Column(Integer, default=0, server_default='0', nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    dragons = relationship('Dragon', back_populates='owner', cascade='all, delete-orphan')
-    eggs = relationship('Egg', back_populates='owner', cascade='all, delete-orphan')
-    plants = relationship('Plant', back_populates='owner', cascade='all, delete-orphan')
-    garden = relationship('Garden', back_populates='owner', uselist=False, cascade='all, delete-orphan')
-    battlepass = relationship('Battlepass', back_populates='user', uselist=False, cascade='all, delete-orphan')
-    purchases = relationship('Purchase', back_populates='user', cascade='all, delete-orphan')
-    crypto_transactions = relationship('CryptoTransaction', back_populates='user', cascade='all, delete-orphan')
+    dragons = relationship('Dragon', back_populates='owner', cascade='all, delete-orphan', lazy=RELATIONSHIP_LAZY)
+    eggs = relationship('Egg', back_populates='owner', cascade='all, delete-orphan', lazy=RELATIONSHIP_LAZY)
+    plants = relationship('Plant', back_populates='owner', cascade='all, delete-orphan', lazy=RELATIONSHIP_LAZY)
+    garden = relationship('Garden', back_populates='owner', uselist=False, cascade='all, delete-orphan', lazy=RELATIONSHIP_LAZY)
+    battlepass = relationship('Battlepass', back_populates='user', uselist=False, cascade='all, delete-orphan', lazy=RELATIONSHIP_LAZY)
+    purchases = relationship('Purchase', back_populates='user', cascade='all, delete-orphan', lazy=RELATIONSHIP_LAZY)
+    crypto_transactions = relationship('CryptoTransaction', back_populates='user', cascade='all, delete-orphan', lazy=RELATIONSHIP_LAZY)
+
+def _decayed(base: int, since: datetime, per_day: int) -> int:
+    """base minus per_day for every full 1/per_day of a day since `since`, floored at 0"""
+    elapsed = max(int((now() - since).total_seconds()), 0) if since else 0
+    return max(base - elapsed * per_day // 86400, 0)
+
+def _decayed_sql(base, since, per_day: int):
+    decay = seconds_between(since, literal(now(), DateTime)) * per_day // 86400
+    # A NULL baseline makes decay NULL; like _decayed, read the base value then
+    return func.coalesce(case((decay <= 0, base), (decay >= base, 0), else_=base - decay), base)
 
 class Dragon(Base):
     __tablename__ = 'dragons'
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     dragon_type = Column(String(100), nullable=False)
     name = Column(String(100), nullable=False)
     rarity = Column(String(50), nullable=False)
     level = Column(Integer, default=1)
     experience = Column(Integer, default=0)
-    hunger = Column(Integer, default=100)
-    happiness = Column(Integer, default=100)
+    # Hunger/happiness as of baseline_at; the current values decay from there
+    hunger_base = Column('hunger', Integer, default=100)
+    happiness_base = Column('happiness', Integer, default=100)
+    baseline_at = Column(DateTime, default=datetime.utcnow)
     strength = Column(Integer, default=10)
     agility = Column(Integer, default=10)
     intelligence = Column(Integer, default=10)
     last_fed = Column(DateTime, nullable=True)
     hatched_at = Column(DateTime, default=datetime.utcnow)
     
-    owner = relationship('User', back_populates='dragons')
+    owner = relationship('User', back_populates='dragons', lazy=RELATIONSHIP_LAZY)
+    
+    @hybrid_property
+    def hunger(self):
+        return _decayed(self.hunger_base, self.baseline_at, config.DRAGON_HUNGER_DECAY_PER_DAY)
+    
+    @hunger.expression
+    def hunger(cls):
+        return _decayed_sql(cls.hunger_base, cls.baseline_at, config.DRAGON_HUNGER_DECAY_PER_DAY)
+    
+    @hybrid_property
+    def happiness(self):
+        return _decayed(self.happiness_base, self.baseline_at, config.DRAGON_HAPPINESS_DECAY_PER_DAY)
+    
+    @happiness.expression
+    def happiness(cls):
+        return _decayed_sql(cls.happiness_base, cls.baseline_at, config.DRAGON_HAPPINESS_DECAY_PER_DAY)
 
 class Egg(Base):
     __tablename__ = 'eggs'
@@ -63,7 +104,23 @@ class Egg(Base):
     hatches_at = Column(DateTime, nullable=False)
     is_hatched = Column(Boolean, default=False)
     
-    owner = relationship('User', back_populates='eggs')
+    owner = relationship('User', back_populates='eggs', lazy=RELATIONSHIP_LAZY)
+    
+    @hybrid_property
+    def is_ready(self):
+        """Hatch time has passed (as of the request's now); in SQL: hatches_at <= :now"""
+        return self.hatches_at is not None and self.hatches_at <= now()
+    
+    @is_ready.expression
+    def is_ready(cls):
+        return cls.hatches_at <= now()
+    
+    # Matches EggService lookups: a user's unhatched eggs, ordered/filtered by hatch time
+    __table_args__ = (
+        Index('ix_eggs_user_hatched_hatches_at', 'user_id', 'is_hatched', 'hatches_at'),
+        # Range scans over all users by hatch time (ready notifications)
+        Index('ix_eggs_hatches_at', 'hatches_at'),
+    )
 
 class Plant(Base):
     __tablename__ = 'plants'
@@ -73,10 +130,24 @@ class Plant(Base):
     plant_type = Column(String(100), nullable=False)
     planted_at = Column(DateTime, default=datetime.utcnow)
     ready_at = Column(DateTime, nullable=False)
-    is_ready = Column(Boolean, default=False)
     is_harvested = Column(Boolean, default=False)
     
-    owner = relationship('User', back_populates='plants')
+    owner = relationship('User', back_populates='plants', lazy=RELATIONSHIP_LAZY)
+    
+    @hybrid_property
+    def is_ready(self):
+        """Growth time has passed (as of the request's now); in SQL: ready_at <= :now"""
+        return self.ready_at is not None and self.ready_at <= now()
+    
+    @is_ready.expression
+    def is_ready(cls):
+        return cls.ready_at <= now()
+    
+    # Matches GardenService lookups: a user's unharvested plants, filtered by ready time
+    __table_args__ = (
+        Index('ix_plants_user_harvested_ready_at', 'user_id', 'is_harvested', 'ready_at'),
+        Index('ix_plants_ready_at', 'ready_at'),
+    )
 
 class Garden(Base):
     __tablename__ = 'gardens'
@@ -89,7 +160,7 @@ class Garden(Base):
     theme = Column(String(50), default='Classic')
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    owner = relationship('User', back_populates='garden')
+    owner = relationship('User', back_populates='garden', lazy=RELATIONSHIP_LAZY)
 
 class Battlepass(Base):
     __tablename__ = 'battlepasses'
@@ -104,13 +175,13 @@ class Battlepass(Base):
     rewards_claimed = Column(JSON, default=dict)  # Day numbers claimed
     created_at = Column(DateTime, default=datetime.utcnow)
     
-    user = relationship('User', back_populates='battlepass')
+    user = relationship('User', back_populates='battlepass', lazy=RELATIONSHIP_LAZY)
 
 class Purchase(Base):
     __tablename__ = 'purchases'
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     payment_type = Column(String(50))  # 'stars', 'crypto'
     amount_stars = Column(Integer, nullable=True)
     amount_crypto = Column(Float, nullable=True)
@@ -122,13 +193,13 @@ class Purchase(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
     
-    user = relationship('User', back_populates='purchases')
+    user = relationship('User', back_populates='purchases', lazy=RELATIONSHIP_LAZY)
 
 class CryptoTransaction(Base):
     __tablename__ = 'crypto_transactions'
     
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False, index=True)
     invoice_id = Column(String(255), unique=True, nullable=False)
     currency = Column(String(10), nullable=False)  # BTC, ETH, USDT, TON
     amount = Column(Float, nullable=False)
@@ -138,4 +209,17 @@ class CryptoTransaction(Base):
     completed_at = Column(DateTime, nullable=True)
     confirmed_at = Column(DateTime, nullable=True)
     
-    user = relationship('User', back_populates='crypto_transactions')
+    user = relationship('User', back_populates='crypto_transactions', lazy=RELATIONSHIP_LAZY)
+    
+    # Reconciler pages through pending invoices oldest first
+    __table_args__ = (
+        Index('ix_crypto_transactions_status_created_at', 'status', 'created_at'),
+    )
+
+class JobState(Base):
+    """Checkpoint/watermark of a background job, so it resumes after a restart"""
+    __tablename__ = 'job_states'
+    
+    name = Column(String(100), primary_key=True)
+    state = Column(JSON, default=dict)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -5,6 +5,7 @@ from .garden import register_garden_handlers
 from .profile import register_profile_handlers
 from .vip import register_vip_handlers
 from .battlepass import register_battlepass_handlers
+from .admin import register_admin_handlers
 
 __all__ = [
     'register_start_handlers',
@@ -13,5 +14,6 @@ __all__ = [
     'register_garden_handlers',
     'register_profile_handlers',
     'register_vip_handlers',
-    'register_battlepass_handlers'
+    'register_battlepass_handlers',
+    'register_admin_handlers'
 ]
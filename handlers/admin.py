@@ -0,0 +1,157 @@
+import asyncio
+from telegram import Update
+from telegram.ext import ContextTypes, CommandHandler
+from database.audit import audit_service_queries, format_audit_report
+from services import UserService
+from core import screen_cache, edit_fingerprints
+from utils.balance import reload_game_balance
+from localization import CATALOG, reload_catalog
+from jobs.broadcast import Broadcast, start_broadcast, running_broadcasts, latest_broadcast_state
+import config
+
+def is_admin(update: Update) -> bool:
+    """Check if the update comes from a configured admin"""
+    return update.effective_user is not None and update.effective_user.id in config.ADMIN_USER_IDS
+
+async def index_audit_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Run EXPLAIN on the service queries and report sequential scans (admin only)"""
+    if not is_admin(update):
+        return
+    
+    # The audit runs blocking EXPLAIN queries - keep them off the event loop
+    results = await asyncio.to_thread(audit_service_queries)
+    report = format_audit_report(results)
+    
+    # Telegram caps messages at 4096 characters
+    for start in range(0, len(report), 4000):
+        await update.message.reply_text(report[start:start + 4000])
+
+async def cache_stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show in-process cache counters (admin only)"""
+    if not is_admin(update):
+        return
+    
+    stats = UserService.snapshot_cache_stats()
+    text = (
+        "📊 User snapshot cache\n\n"
+        f"Entries: {stats['size']}/{stats['maxsize']}\n"
+        f"Hits: {stats['hits']}\n"
+        f"Misses: {stats['misses']}\n"
+        f"Evictions: {stats['evictions']}\n"
+        f"Hit rate: {stats['hit_rate']:.1%}"
+    )
+    screens = screen_cache.stats()
+    text += (
+        "\n\n🖼 Screen cache\n\n"
+        f"Screens: {screens['size']}\n"
+        f"Hits: {screens['hits']}\n"
+        f"Misses: {screens['misses']}\n"
+        f"Hit rate: {screens['hit_rate']:.1%}"
+    )
+    edits = edit_fingerprints.stats()
+    text += (
+        "\n\n✏️ Message edits\n\n"
+        f"Sent: {edits['sent']}\n"
+        f"Skipped (unchanged): {edits['skipped']}\n"
+        f"Not modified errors: {edits['not_modified']}"
+    )
+    await update.message.reply_text(text)
+
+async def reload_balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Re-read GAME_BALANCE_FILE and rebuild cached screens (admin only)"""
+    if not is_admin(update):
+        return
+    
+    if not config.GAME_BALANCE_FILE:
+        await update.message.reply_text("GAME_BALANCE_FILE is not set")
+        return
+    try:
+        version = reload_game_balance()
+    except (OSError, ValueError) as e:
+        await update.message.reply_text(f"❌ Balance reload failed: {e}")
+        return
+    await update.message.reply_text(f"✅ Game balance reloaded (version {version})")
+
+async def reload_texts_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Re-read the localization modules and rebuild cached screens (admin only)"""
+    if not is_admin(update):
+        return
+    
+    try:
+        version = reload_catalog()
+    except Exception as e:
+        await update.message.reply_text(f"❌ Texts reload failed: {e}")
+        return
+    
+    note = "" if CATALOG.warn_if_incomplete() else "\n⚠️ Missing keys or placeholder mismatches, see the log"
+    await update.message.reply_text(f"✅ Texts reloaded (catalog version {version}){note}")
+
+def parse_broadcast(text: str):
+    """Split '[lang=xx] [vip=N] message' into (message, language, min_vip_level)"""
+    language = min_vip_level = None
+    while True:
+        option, _, rest = text.partition(' ')
+        if option.startswith('lang='):
+            language = option[len('lang='):]
+        elif option.startswith('vip=') and option[len('vip='):].isdigit():
+            min_vip_level = int(option[len('vip='):])
+        else:
+            return text, language, min_vip_level
+        text = rest.lstrip()
+
+def format_broadcast_report(report: dict) -> str:
+    return (
+        f"📣 Broadcast {report['name']} ({report['status']})\n\n"
+        f"Delivered: {report['delivered']}\n"
+        f"Blocked: {report['blocked']}\n"
+        f"Failed: {report['failed']}\n"
+        f"Throughput: {report['per_second']:.1f} msg/s over {report['seconds']:.0f}s"
+    )
+
+async def broadcast_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """/broadcast [lang=ru|en] [vip=N] <message> - send message to every matching player (admin only)"""
+    if not is_admin(update):
+        return
+    
+    parts = update.message.text.split(maxsplit=1)
+    text, language, min_vip_level = parse_broadcast(parts[1] if len(parts) > 1 else '')
+    if not text:
+        await update.message.reply_text("Usage: /broadcast [lang=ru|en] [vip=N] <message>")
+        return
+    
+    broadcast = Broadcast.create(text, language, min_vip_level)
+    chat_id = update.effective_chat.id
+    
+    async def on_finished(report):
+        await context.bot.send_message(chat_id=chat_id, text=format_broadcast_report(report))
+    
+    start_broadcast(context.application, broadcast, on_finished)
+    segment = ', '.join(filter(None, [language and f"lang={language}", min_vip_level and f"vip>={min_vip_level}"]))
+    await update.message.reply_text(f"📣 Broadcast {broadcast.name} started ({segment or 'all players'})")
+
+async def broadcast_status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Progress of running broadcasts, or the last one (admin only)"""
+    if not is_admin(update):
+        return
+    
+    running = [broadcast.report() for broadcast in running_broadcasts() if broadcast.state]
+    if running:
+        text = "\n\n".join(format_broadcast_report(report) for report in running)
+    else:
+        state = await latest_broadcast_state()
+        if not state:
+            text = "No broadcasts yet"
+        else:
+            broadcast = Broadcast.from_state(state['name'], state)
+            broadcast.state = state
+            text = format_broadcast_report(broadcast.report())
+    await update.message.reply_text(text)
+
+def register_admin_handlers(application):
+    """Register admin-only commands"""
+    application.add_handler(CommandHandler("index_audit", index_audit_command))
+    application.add_handler(CommandHandler("cache_stats", cache_stats_command))
+    application.add_handler(CommandHandler("reload_balance", reload_balance_command))
+    application.add_handler(CommandHandler("reload_texts", reload_texts_command))
+    application.add_handler(CommandHandler("broadcast", broadcast_command))
+    application.add_handler(CommandHandler("broadcast_status", broadcast_status_command))
@@ -1,26 +1,29 @@
 from telegram import Update, ReplyKeyboardMarkup
-from telegram.ext import ContextTypes, CallbackQueryHandler, MessageHandler, filters
-from database import get_session
+from telegram.ext import ContextTypes
+from database import get_async_session
+from database.budget import sql_budget
 from database.models import User, Battlepass
-from services import UserService
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from services import AsyncUserService
 from payment.stars_handler import send_stars_invoice
 from localization import t
+from core import get_router
 from datetime import datetime, timedelta
 import config
 
+@sql_budget(3)
 async def battlepass_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show Battlepass status"""
     query = update.callback_query
     await query.answer()
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user, joinedload(User.battlepass))
         lang = user.language
         
         text = t(lang, 'battlepass_title')
-        
-        # Get or create battlepass
-        bp = session.query(Battlepass).filter_by(user_id=user.id).first()
+        bp = user.battlepass
         
         if bp and bp.is_active and bp.expiration_date and bp.expiration_date > datetime.utcnow():
             text += t(lang, 'battlepass_active',
@@ -51,74 +54,67 @@ async def battlepass_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def buy_battlepass(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Buy Battlepass"""
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
         lang = user.language
         
-        if user.crystals < config.BATTLEPASS_PRICE:
-            await update.message.reply_text(
-                t(lang, 'shop_not_enough_crystals')
-            )
-            return
-        
         # Purchase with crystals
-        UserService.remove_crystals(session, user, config.BATTLEPASS_PRICE)
-        
-        # Create/activate battlepass
-        bp = session.query(Battlepass).filter_by(user_id=user.id).first()
-        if not bp:
-            bp = Battlepass(
-                user_id=user.id,
-                is_active=True,
-                purchase_date=datetime.utcnow(),
-                expiration_date=datetime.utcnow() + timedelta(days=config.BATTLEPASS_DURATION_DAYS),
-                season_number=1,
-                current_progress=0
-            )
-            session.add(bp)
+        if await AsyncUserService.remove_crystals(session, user, config.BATTLEPASS_PRICE) is None:
+            text = t(lang, 'shop_not_enough_crystals')
         else:
-            bp.is_active = True
-            bp.purchase_date = datetime.utcnow()
-            bp.expiration_date = datetime.utcnow() + timedelta(days=config.BATTLEPASS_DURATION_DAYS)
-            bp.current_progress = 0
-            bp.rewards_claimed = {}
-        
-        await update.message.reply_text(
-            "✅ Боевой пропуск активирован!\n\n"
-            f"Действует до: {bp.expiration_date.strftime('%d.%m.%Y')}\n\n"
-            "Заходите ежедневно для прогресса!"
-        )
+            # Create/activate battlepass
+            bp = await session.scalar(select(Battlepass).filter_by(user_id=user.id))
+            if not bp:
+                bp = Battlepass(
+                    user_id=user.id,
+                    is_active=True,
+                    purchase_date=datetime.utcnow(),
+                    expiration_date=datetime.utcnow() + timedelta(days=config.BATTLEPASS_DURATION_DAYS),
+                    season_number=1,
+                    current_progress=0
+                )
+                session.add(bp)
+            else:
+                bp.is_active = True
+                bp.purchase_date = datetime.utcnow()
+                bp.expiration_date = datetime.utcnow() + timedelta(days=config.BATTLEPASS_DURATION_DAYS)
+                bp.current_progress = 0
+                bp.rewards_claimed = {}
+            
+            text = (
+                "✅ Боевой пропуск активирован!\n\n"
+                f"Действует до: {bp.expiration_date.strftime('%d.%m.%Y')}\n\n"
+                "Заходите ежедневно для прогресса!"
+            )
+    
+    # Reply once the purchase has committed
+    await update.message.reply_text(text)
 
 async def claim_battlepass_rewards(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Claim Battlepass rewards"""
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user, joinedload(User.battlepass))
         lang = user.language
         
-        bp = session.query(Battlepass).filter_by(user_id=user.id).first()
+        bp = user.battlepass
         
         if not bp or not bp.is_active:
-            await update.message.reply_text(
-                t(lang, 'battlepass_not_active')
-            )
-            return
-        
+            text = t(lang, 'battlepass_not_active')
         # Simple reward logic: give rewards based on progress
-        if bp.current_progress >= 7:  # Weekly reward
-            UserService.add_gold(session, user, 300)
-            await update.message.reply_text(
+        elif bp.current_progress >= 7:  # Weekly reward
+            await AsyncUserService.add_gold(session, user, 300)
+            text = (
                 f"🎁 Еженедельная награда получена!\n\n"
                 f"💎 +300 Золота"
             )
         else:
-            await update.message.reply_text(
-                "⏰ Еженедельная награда доступна через 7 дней"
-            )
+            text = "⏰ Еженедельная награда доступна через 7 дней"
+    
+    await update.message.reply_text(text)
 
 def register_battlepass_handlers(application):
     """Register Battlepass handlers"""
-    application.add_handler(CallbackQueryHandler(battlepass_menu, pattern="^battlepass_menu$"))
-    application.add_handler(MessageHandler(
-        filters.TEXT & filters.Regex('🎖️ Боевой пропуск|🎖️ Battlepass'),
-        battlepass_menu
-    ))
+    router = get_router(application)
+    router.add_callback(battlepass_menu, 'battlepass_menu')
+    router.add_button(battlepass_menu, 'nav_battlepass')
+    router.add_button(buy_battlepass, 'battlepass_buy_button')
@@ -1,11 +1,14 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
-from telegram.ext import ContextTypes, CallbackQueryHandler, MessageHandler, filters
-from database import get_session
-from services import UserService, DragonService
+from telegram.ext import ContextTypes
+from database import get_async_session
+from database.budget import sql_budget
+from services import AsyncUserService, AsyncDragonService
 from utils.helpers import format_dragon_stats
 from utils.constants import RARITIES
 from localization import t
+from core import get_router
 
+@sql_budget(4)
 async def dragons_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     is_callback = query is not None
@@ -13,10 +16,10 @@ async def dragons_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if is_callback:
         await query.answer()
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
         lang = user.language
-        dragons = DragonService.get_user_dragons(session, user)
+        dragons = await AsyncDragonService.get_user_dragons(session, user)
         
         if not dragons:
             text = t(lang, 'dragons_empty')
@@ -77,30 +80,30 @@ async def dragons_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def view_dragon(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    await query.answer()
-    
     dragon_id = int(query.data.split('_')[2])
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
-        dragon = DragonService.get_dragon_by_id(session, dragon_id, user.id)
-        
-        if not dragon:
-            await query.answer("❌ Dragon not found!", show_alert=True)
-            return
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
+        dragon = await AsyncDragonService.get_dragon_by_id(session, dragon_id, user.id)
         
-        text = "🐉 **Dragon Details**\n\n"
-        text += format_dragon_stats(dragon)
-        
-        from datetime import datetime
-        if dragon.last_fed:
-            time_since_fed = (datetime.utcnow() - dragon.last_fed).total_seconds() / 3600
-            if time_since_fed < 24:
-                text += f"\n\n⏰ Can feed again in {24 - time_since_fed:.1f} hours"
+        if dragon:
+            text = "🐉 **Dragon Details**\n\n"
+            text += format_dragon_stats(dragon)
+            
+            from datetime import datetime
+            if dragon.last_fed:
+                time_since_fed = (datetime.utcnow() - dragon.last_fed).total_seconds() / 3600
+                if time_since_fed < 24:
+                    text += f"\n\n⏰ Can feed again in {24 - time_since_fed:.1f} hours"
+                else:
+                    text += "\n\n✅ Ready to be fed!"
             else:
-                text += "\n\n✅ Ready to be fed!"
-        else:
-            text += "\n\n🍖 Never been fed - feed me!"
+                text += "\n\n🍖 Never been fed - feed me!"
+    
+    if not dragon:
+        await query.answer("❌ Dragon not found!", show_alert=True)
+        return
+    await query.answer()
     
     keyboard = [
         [InlineKeyboardButton("🍖 Feed Dragon", callback_data=f"feed_dragon_{dragon.id}")],
@@ -118,46 +121,45 @@ async def feed_dragon(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     dragon_id = int(query.data.split('_')[2])
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
-        dragon = DragonService.get_dragon_by_id(session, dragon_id, user.id)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
+        dragon = await AsyncDragonService.get_dragon_by_id(session, dragon_id, user.id)
         
+        text = None
         if not dragon:
-            await query.answer("❌ Dragon not found!", show_alert=True)
-            return
-        
-        success, result = DragonService.feed_dragon(session, dragon)
-        
-        if not success:
-            hours_remaining = result
-            await query.answer(
-                f"⏰ You can feed this dragon again in {hours_remaining:.1f} hours!",
-                show_alert=True
-            )
-            return
-        
-        if result == "level_up":
-            await query.answer("🎉 Your dragon leveled up!", show_alert=True)
-            text = (
-                "🎉 **Level Up!**\n\n"
-                f"{RARITIES[dragon.rarity]['emoji']} **{dragon.name}** reached Level {dragon.level}!\n\n"
-                "**New Stats:**\n"
-                f"💪 Strength: {dragon.strength}\n"
-                f"⚡ Agility: {dragon.agility}\n"
-                f"🧠 Intelligence: {dragon.intelligence}\n\n"
-                f"❤️ Hunger: {dragon.hunger}%\n"
-                f"😊 Happiness: {dragon.happiness}%"
-            )
+            alert = "❌ Dragon not found!"
         else:
-            await query.answer("✅ Dragon fed successfully!", show_alert=True)
-            text = (
-                "🍖 **Dragon Fed!**\n\n"
-                f"{RARITIES[dragon.rarity]['emoji']} **{dragon.name}** enjoyed the meal!\n\n"
-                f"❤️ Hunger: {dragon.hunger}%\n"
-                f"😊 Happiness: {dragon.happiness}%\n"
-                f"⭐ Experience gained: +10\n\n"
-                "Come back tomorrow to feed again!"
-            )
+            success, result = await AsyncDragonService.feed_dragon(session, dragon)
+            
+            if not success:
+                hours_remaining = result
+                alert = f"⏰ You can feed this dragon again in {hours_remaining:.1f} hours!"
+            elif result == "level_up":
+                alert = "🎉 Your dragon leveled up!"
+                text = (
+                    "🎉 **Level Up!**\n\n"
+                    f"{RARITIES[dragon.rarity]['emoji']} **{dragon.name}** reached Level {dragon.level}!\n\n"
+                    "**New Stats:**\n"
+                    f"💪 Strength: {dragon.strength}\n"
+                    f"⚡ Agility: {dragon.agility}\n"
+                    f"🧠 Intelligence: {dragon.intelligence}\n\n"
+                    f"❤️ Hunger: {dragon.hunger}%\n"
+                    f"😊 Happiness: {dragon.happiness}%"
+                )
+            else:
+                alert = "✅ Dragon fed successfully!"
+                text = (
+                    "🍖 **Dragon Fed!**\n\n"
+                    f"{RARITIES[dragon.rarity]['emoji']} **{dragon.name}** enjoyed the meal!\n\n"
+                    f"❤️ Hunger: {dragon.hunger}%\n"
+                    f"😊 Happiness: {dragon.happiness}%\n"
+                    f"⭐ Experience gained: +10\n\n"
+                    "Come back tomorrow to feed again!"
+                )
+    
+    await query.answer(alert, show_alert=True)
+    if text is None:
+        return
     
     keyboard = [
         [InlineKeyboardButton("📊 View Stats", callback_data=f"view_dragon_{dragon.id}")],
@@ -175,9 +177,9 @@ async def dragons_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
-        dragons = DragonService.get_user_dragons(session, user)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
+        dragons = await AsyncDragonService.get_user_dragons(session, user)
         
         text = f"🐉 **All Your Dragons** ({len(dragons)} total)\n\n"
         
@@ -199,12 +201,10 @@ async def dragons_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 def register_dragon_handlers(application):
-    application.add_handler(CallbackQueryHandler(dragons_menu, pattern="^dragons_menu$"))
-    application.add_handler(CallbackQueryHandler(view_dragon, pattern="^view_dragon_"))
-    application.add_handler(CallbackQueryHandler(feed_dragon, pattern="^feed_dragon_"))
-    application.add_handler(CallbackQueryHandler(dragons_list, pattern="^dragons_list$"))
-    # Message handlers for reply keyboard buttons
-    application.add_handler(MessageHandler(
-        filters.TEXT & filters.Regex('🐉 Драконы|🐉 Dragons'),
-        dragons_menu
-    ))
+    router = get_router(application)
+    router.add_callback(dragons_menu, 'dragons_menu')
+    router.add_callback_prefix(view_dragon, 'view_dragon_')
+    router.add_callback_prefix(feed_dragon, 'feed_dragon_')
+    router.add_callback(dragons_list, 'dragons_list')
+    # Message handler for reply keyboard button
+    router.add_button(dragons_menu, 'nav_dragons')
@@ -1,12 +1,19 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes, CallbackQueryHandler, MessageHandler, filters
-from database import get_session
-from services import UserService, EggService, DragonService
+from telegram.ext import ContextTypes
+from database import get_async_session
+from database.budget import sql_budget
+from services import EggService, VIPService, AsyncUserService, AsyncEggService
 from utils.helpers import format_time_remaining, can_claim_daily_egg
 from utils.constants import EGG_TYPES, RARITIES
 from localization import t
+from core import get_router, cached_screen, Screen, edit_message_text
 from datetime import datetime
+from collections import Counter
 
+# Eggs bought by the bulk buttons in the egg shop
+BULK_EGG_COUNT = 10
+
+@sql_budget(4)
 async def eggs_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     is_callback = query is not None
@@ -14,10 +21,11 @@ async def eggs_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if is_callback:
         await query.answer()
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
         lang = user.language
-        eggs = EggService.get_user_eggs(session, user)
+        eggs = await AsyncEggService.get_user_eggs(session, user)
+        ready_count = sum(1 for egg in eggs if egg.is_ready)
         
         if not eggs:
             text = t(lang, 'eggs_empty')
@@ -38,6 +46,8 @@ async def eggs_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
         [InlineKeyboardButton("🔄 Check Eggs", callback_data="check_eggs")],
         [InlineKeyboardButton(t(lang, 'eggs_back'), callback_data="start_menu")]
     ]
+    if ready_count:
+        keyboard.insert(0, [InlineKeyboardButton(f"🐣 Hatch All Ready ({ready_count})", callback_data="hatch_all_eggs")])
     reply_markup = InlineKeyboardMarkup(keyboard)
     
     if is_callback:
@@ -55,30 +65,32 @@ async def eggs_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def claim_daily_egg(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    await query.answer()
+    alert = None
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
         
         if not can_claim_daily_egg(user):
             time_since = (datetime.utcnow() - user.last_daily_egg).total_seconds()
             hours_remaining = 24 - (time_since / 3600)
-            await query.answer(
-                f"⏰ You can claim your next free egg in {hours_remaining:.1f} hours!",
-                show_alert=True
+            alert = f"⏰ You can claim your next free egg in {hours_remaining:.1f} hours!"
+        else:
+            egg = await AsyncEggService.create_egg(session, user, "Daily Free")
+            await AsyncUserService.update_daily_egg_time(session, user)
+            
+            text = (
+                "🎉 **Daily Egg Claimed!**\n\n"
+                f"You received a {EGG_TYPES['Daily Free']['emoji']} Daily Free Egg!\n"
+                f"Rarity: {RARITIES[egg.rarity]['emoji']} {egg.rarity}\n\n"
+                f"⏰ Hatches in: {format_time_remaining(egg.hatches_at)}\n\n"
+                "Come back tomorrow for another free egg!"
             )
-            return
-        
-        egg = EggService.create_egg(session, user, "Daily Free")
-        UserService.update_daily_egg_time(session, user)
-        
-        text = (
-            "🎉 **Daily Egg Claimed!**\n\n"
-            f"You received a {EGG_TYPES['Daily Free']['emoji']} Daily Free Egg!\n"
-            f"Rarity: {RARITIES[egg.rarity]['emoji']} {egg.rarity}\n\n"
-            f"⏰ Hatches in: {format_time_remaining(egg.hatches_at)}\n\n"
-            "Come back tomorrow for another free egg!"
-        )
+    
+    # Talk to Telegram only once the transaction is over
+    if alert:
+        await query.answer(alert, show_alert=True)
+        return
+    await query.answer()
     
     keyboard = [[InlineKeyboardButton("« Back to Eggs", callback_data="eggs_menu")]]
     reply_markup = InlineKeyboardMarkup(keyboard)
@@ -93,9 +105,9 @@ async def check_eggs(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
-        ready_eggs = EggService.check_ready_eggs(session, user)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
+        ready_eggs = await AsyncEggService.check_ready_eggs(session, user)
         
         if ready_eggs:
             text = (
@@ -113,6 +125,8 @@ async def check_eggs(update: Update, context: ContextTypes.DEFAULT_TYPE):
                         callback_data=f"hatch_egg_{egg.id}"
                     )
                 ])
+            if len(ready_eggs) > 1:
+                keyboard.insert(0, [InlineKeyboardButton("🐣 Hatch All", callback_data="hatch_all_eggs")])
             keyboard.append([InlineKeyboardButton("« Back", callback_data="eggs_menu")])
             reply_markup = InlineKeyboardMarkup(keyboard)
         else:
@@ -120,45 +134,48 @@ async def check_eggs(update: Update, context: ContextTypes.DEFAULT_TYPE):
             keyboard = [[InlineKeyboardButton("« Back", callback_data="eggs_menu")]]
             reply_markup = InlineKeyboardMarkup(keyboard)
     
-    await query.edit_message_text(
-        text=text,
-        reply_markup=reply_markup,
-        parse_mode='Markdown'
-    )
+    await edit_message_text(query, text, reply_markup, parse_mode='Markdown')
 
 async def hatch_egg(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    await query.answer()
-    
     egg_id = int(query.data.split('_')[2])
+    alert = None
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
-        egg = EggService.get_egg_by_id(session, egg_id, user.id)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
+        egg = await AsyncEggService.get_egg_by_id(session, egg_id, user.id)
         
-        if not egg:
-            await query.answer("❌ Egg not found!", show_alert=True)
-            return
-        
-        if not egg.is_ready:
-            await query.answer("⏰ This egg is not ready yet!", show_alert=True)
-            return
-        
-        hatched_egg = EggService.hatch_egg(session, egg)
-        dragon = DragonService.create_dragon(session, user, egg.rarity)
-        
-        dragon_info = dragon.dragon_type
+        if not egg or egg.is_hatched:
+            alert = "❌ Egg not found!"
+        elif not egg.is_ready:
+            alert = "⏰ This egg is not ready yet!"
+        else:
+            # Same path as Hatch All, so the dragon limit is enforced by the database
+            dragons, remaining = await AsyncEggService.hatch_all_ready(session, user, egg_ids=[egg.id])
+            if not dragons and remaining:
+                alert = t(user.language, 'dragons_limit_reached',
+                          count=user.dragon_count, max=VIPService.get_max_dragons(user))
+            elif not dragons:
+                # A concurrent tap hatched it first
+                alert = "❌ Egg not found!"
         
-        text = (
-            "🎊 **Congratulations!**\n\n"
-            f"Your {EGG_TYPES[egg.egg_type]['emoji']} egg has hatched!\n\n"
-            f"🐉 You got: **{dragon.name}**\n"
-            f"⭐ Rarity: {RARITIES[dragon.rarity]['emoji']} {dragon.rarity}\n"
-            f"💪 Strength: {dragon.strength}\n"
-            f"⚡ Agility: {dragon.agility}\n"
-            f"🧠 Intelligence: {dragon.intelligence}\n\n"
-            "Your new dragon is waiting in your collection!"
-        )
+        if not alert:
+            dragon = dragons[0]
+            text = (
+                "🎊 **Congratulations!**\n\n"
+                f"Your {EGG_TYPES[egg.egg_type]['emoji']} egg has hatched!\n\n"
+                f"🐉 You got: **{dragon.name}**\n"
+                f"⭐ Rarity: {RARITIES[dragon.rarity]['emoji']} {dragon.rarity}\n"
+                f"💪 Strength: {dragon.strength}\n"
+                f"⚡ Agility: {dragon.agility}\n"
+                f"🧠 Intelligence: {dragon.intelligence}\n\n"
+                "Your new dragon is waiting in your collection!"
+            )
+    
+    if alert:
+        await query.answer(alert, show_alert=True)
+        return
+    await query.answer()
     
     keyboard = [
         [InlineKeyboardButton("🐉 View My Dragons", callback_data="dragons_menu")],
@@ -172,43 +189,46 @@ async def hatch_egg(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode='Markdown'
     )
 
-async def shop_eggs(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def hatch_all_eggs(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    await query.answer()
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
-        
-        text = (
-            "🛒 **Egg Shop**\n\n"
-            f"Your Balance:\n"
-            f"💰 {user.gold:,} Gold\n"
-            f"💎 {user.crystals:,} Crystals\n\n"
-            "Available Eggs:\n\n"
-        )
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
+        dragons, remaining = await AsyncEggService.hatch_all_ready(session, user)
         
-        for egg_type, data in EGG_TYPES.items():
-            if egg_type == "Daily Free":
-                continue
+        if not dragons:
+            if remaining:
+                alert = t(user.language, 'dragons_limit_reached',
+                          count=user.dragon_count, max=VIPService.get_max_dragons(user))
+            else:
+                alert = "⏰ No eggs are ready to hatch yet!"
+        else:
+            text = (
+                "🎊 **Congratulations!**\n\n"
+                f"{len(dragons)} egg(s) hatched!\n\n"
+            )
+            for dragon in dragons:
+                text += f"🐉 **{dragon.name}** {RARITIES[dragon.rarity]['emoji']} {dragon.rarity}\n"
             
-            text += f"{data['emoji']} **{egg_type} Egg**\n"
-            if data['cost_gold'] > 0:
-                text += f"💰 Cost: {data['cost_gold']:,} Gold\n"
-            if data['cost_crystals'] > 0:
-                text += f"💎 Cost: {data['cost_crystals']:,} Crystals\n"
-            text += f"⏰ Hatching: {data['hatching_hours']} hours\n"
-            text += f"📊 Rarities:\n"
-            for rarity, chance in data['rarities'].items():
-                if chance > 0:
-                    text += f"  {RARITIES[rarity]['emoji']} {rarity}: {chance}%\n"
-            text += "\n"
+            if remaining:
+                text += (
+                    f"\n🥚 {remaining} more egg(s) ready, but you reached the limit of "
+                    f"{VIPService.get_max_dragons(user)} dragons. Upgrade VIP to hatch them!"
+                )
+            else:
+                text += "\nYour new dragons are waiting in your collection!"
+    
+    if not dragons:
+        await query.answer(alert, show_alert=True)
+        return
+    await query.answer()
     
     keyboard = [
-        [InlineKeyboardButton("🥚 Buy Regular Egg (500 Gold)", callback_data="buy_egg_Regular")],
-        [InlineKeyboardButton("🔵 Buy Rare Egg (2000 Gold)", callback_data="buy_egg_Rare")],
-        [InlineKeyboardButton("💎 Buy Premium Egg (200 Crystals)", callback_data="buy_egg_Premium")],
-        [InlineKeyboardButton("« Back", callback_data="eggs_menu")]
+        [InlineKeyboardButton("🐉 View My Dragons", callback_data="dragons_menu")],
+        [InlineKeyboardButton("« Back to Eggs", callback_data="eggs_menu")]
     ]
+    if remaining:
+        keyboard.insert(0, [InlineKeyboardButton("👑 VIP", callback_data="vip_menu")])
     reply_markup = InlineKeyboardMarkup(keyboard)
     
     await query.edit_message_text(
@@ -217,39 +237,118 @@ async def shop_eggs(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode='Markdown'
     )
 
-async def buy_egg(update: Update, context: ContextTypes.DEFAULT_TYPE):
+# Egg types sold from the inline egg shop, with a bulk button each
+SHOP_EGG_TYPES = ('Regular', 'Rare', 'Premium')
+
+@cached_screen
+def egg_shop_screen(lang: str) -> Screen:
+    """Egg list and buy buttons; the player's balance is spliced in between head and tail"""
+    text = "Available Eggs:\n\n"
+    for egg_type, data in EGG_TYPES.items():
+        if egg_type == "Daily Free":
+            continue
+        
+        text += f"{data['emoji']} **{egg_type} Egg**\n"
+        if data['cost_gold'] > 0:
+            text += f"💰 Cost: {data['cost_gold']:,} Gold\n"
+        if data['cost_crystals'] > 0:
+            text += f"💎 Cost: {data['cost_crystals']:,} Crystals\n"
+        text += f"⏰ Hatching: {data['hatching_hours']} hours\n"
+        text += f"📊 Rarities:\n"
+        for rarity, chance in data['rarities'].items():
+            if chance > 0:
+                text += f"  {RARITIES[rarity]['emoji']} {rarity}: {chance}%\n"
+        text += "\n"
+    
+    keyboard = []
+    for egg_type in SHOP_EGG_TYPES:
+        data = EGG_TYPES[egg_type]
+        price = f"{data['cost_gold']} Gold" if data['cost_gold'] > 0 else f"{data['cost_crystals']} Crystals"
+        keyboard.append([
+            InlineKeyboardButton(f"{data['emoji']} Buy {egg_type} Egg ({price})", callback_data=f"buy_egg_{egg_type}"),
+            InlineKeyboardButton(f"x{BULK_EGG_COUNT}", callback_data=f"buy_egg_{egg_type}_{BULK_EGG_COUNT}")
+        ])
+    keyboard.append([InlineKeyboardButton("« Back", callback_data="eggs_menu")])
+    return Screen("🛒 **Egg Shop**\n\nYour Balance:\n", InlineKeyboardMarkup(keyboard), text)
+
+async def shop_eggs(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    egg_type = query.data.split('_')[2]
+    await query.answer()
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
-        
-        can_purchase, message = EggService.can_purchase_egg(user, egg_type)
-        
-        if not can_purchase:
-            await query.answer(f"❌ {message}", show_alert=True)
-            return
-        
-        egg_data = EGG_TYPES[egg_type]
-        
-        if egg_data['cost_gold'] > 0:
-            UserService.remove_gold(session, user, egg_data['cost_gold'])
-        if egg_data['cost_crystals'] > 0:
-            UserService.remove_crystals(session, user, egg_data['cost_crystals'])
-        
-        egg = EggService.create_egg(session, user, egg_type)
-        
-        await query.answer(f"✅ Purchased {egg_type} Egg!", show_alert=True)
+    snapshot = await AsyncUserService.get_snapshot(update.effective_user)
+    screen = egg_shop_screen(snapshot.language)
+    
+    await query.edit_message_text(
+        text=screen.render(f"💰 {snapshot.gold:,} Gold\n💎 {snapshot.crystals:,} Crystals\n\n"),
+        reply_markup=screen.reply_markup,
+        parse_mode='Markdown'
+    )
+
+async def _purchase_eggs(session, user, egg_type: str, count: int):
+    """Charge user and create the eggs; returns (alert, text), text None if nothing was bought"""
+    can_purchase, message = EggService.can_purchase_egg(user, egg_type, count)
+    
+    if not can_purchase:
+        return f"❌ {message}", None
+    
+    egg_data = EGG_TYPES[egg_type]
+    
+    gold, crystals = user.gold, user.crystals
+    if egg_data['cost_gold'] > 0:
+        gold = await AsyncUserService.remove_gold(session, user, egg_data['cost_gold'] * count)
+    elif egg_data['cost_crystals'] > 0:
+        crystals = await AsyncUserService.remove_crystals(session, user, egg_data['cost_crystals'] * count)
+    
+    if gold is None or crystals is None:
+        # Balance changed since the check above (e.g. a second tap)
+        return "❌ Not enough funds!", None
+    
+    eggs = await AsyncEggService.create_eggs(session, user, egg_type, count)
+    
+    if count == 1:
+        egg = eggs[0]
+        alert = f"✅ Purchased {egg_type} Egg!"
         
         text = (
             "🎉 **Purchase Successful!**\n\n"
             f"You bought a {egg_data['emoji']} {egg_type} Egg!\n"
             f"Rarity: {RARITIES[egg.rarity]['emoji']} {egg.rarity}\n\n"
             f"⏰ Hatches in: {format_time_remaining(egg.hatches_at)}\n\n"
-            f"Current Balance:\n"
-            f"💰 {user.gold:,} Gold\n"
-            f"💎 {user.crystals:,} Crystals"
         )
+    else:
+        alert = f"✅ Purchased {count} {egg_type} Eggs!"
+        
+        rolled = Counter(egg.rarity for egg in eggs)
+        text = (
+            "🎉 **Purchase Successful!**\n\n"
+            f"You bought {count} {egg_data['emoji']} {egg_type} Eggs!\n"
+        )
+        for rarity in RARITIES:
+            if rolled[rarity]:
+                text += f"{RARITIES[rarity]['emoji']} {rarity}: {rolled[rarity]}\n"
+        text += f"\n⏰ Hatch in: {format_time_remaining(eggs[0].hatches_at)}\n\n"
+    
+    text += (
+        f"Current Balance:\n"
+        f"💰 {gold:,} Gold\n"
+        f"💎 {crystals:,} Crystals"
+    )
+    return alert, text
+
+async def buy_egg(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    # buy_egg_<type> or buy_egg_<type>_<count>
+    parts = query.data.split('_')
+    egg_type = parts[2]
+    count = BULK_EGG_COUNT if parts[3:] == [str(BULK_EGG_COUNT)] else 1
+    
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
+        alert, text = await _purchase_eggs(session, user, egg_type, count)
+    
+    await query.answer(alert, show_alert=True)
+    if text is None:
+        return
     
     keyboard = [
         [InlineKeyboardButton("🛒 Buy Another", callback_data="shop_eggs")],
@@ -264,14 +363,13 @@ async def buy_egg(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 def register_egg_handlers(application):
-    application.add_handler(CallbackQueryHandler(eggs_menu, pattern="^eggs_menu$"))
-    application.add_handler(CallbackQueryHandler(claim_daily_egg, pattern="^claim_daily_egg$"))
-    application.add_handler(CallbackQueryHandler(check_eggs, pattern="^check_eggs$"))
-    application.add_handler(CallbackQueryHandler(hatch_egg, pattern="^hatch_egg_"))
-    application.add_handler(CallbackQueryHandler(shop_eggs, pattern="^shop_eggs$"))
-    application.add_handler(CallbackQueryHandler(buy_egg, pattern="^buy_egg_"))
-    # Message handlers for reply keyboard buttons
-    application.add_handler(MessageHandler(
-        filters.TEXT & filters.Regex('🥚 Яйца|🥚 Eggs'),
-        eggs_menu
-    ))
+    router = get_router(application)
+    router.add_callback(eggs_menu, 'eggs_menu')
+    router.add_callback(claim_daily_egg, 'claim_daily_egg')
+    router.add_callback(check_eggs, 'check_eggs')
+    router.add_callback_prefix(hatch_egg, 'hatch_egg_')
+    router.add_callback(hatch_all_eggs, 'hatch_all_eggs')
+    router.add_callback(shop_eggs, 'shop_eggs')
+    router.add_callback_prefix(buy_egg, 'buy_egg_')
+    # Message handler for reply keyboard button
+    router.add_button(eggs_menu, 'nav_eggs')
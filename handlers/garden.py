@@ -1,11 +1,15 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import ContextTypes, CallbackQueryHandler, MessageHandler, filters
-from database import get_session
-from services import UserService, GardenService
+from telegram.ext import ContextTypes
+from database import get_async_session, User
+from database.budget import sql_budget
+from sqlalchemy.orm import joinedload
+from services import AsyncUserService, AsyncGardenService
 from utils.helpers import format_time_remaining
 from utils.constants import PLANTS
 from localization import t
+from core import get_router, cached_screen, Screen, edit_message_text
 
+@sql_budget(4)
 async def garden_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     is_callback = query is not None
@@ -13,11 +17,11 @@ async def garden_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if is_callback:
         await query.answer()
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user, joinedload(User.garden))
         lang = user.language
-        garden = GardenService.get_user_garden(session, user)
-        plants = GardenService.get_user_plants(session, user)
+        garden = user.garden
+        plants = await AsyncGardenService.get_user_plants(session, user)
         
         text = t(lang, 'garden_title')
         text += f"_{garden.description}_\n\n"
@@ -60,27 +64,18 @@ async def garden_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
             parse_mode='Markdown'
         )
 
-async def plant_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    query = update.callback_query
-    await query.answer()
-    
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
-        
-        text = (
-            "🌱 **Plant Shop**\n\n"
-            f"Your Gold: 💰 {user.gold:,}\n\n"
-            "Available Plants:\n\n"
-        )
-        
-        for plant_name, data in PLANTS.items():
-            text += f"{data['emoji']} **{plant_name}**\n"
-            text += f"💰 Cost: {data['cost_gold']} Gold\n"
-            text += f"⏰ Growth: {data['growth_hours']} hours\n"
-            text += f"💵 Reward: {data['reward_gold']} Gold\n"
-            profit = data['reward_gold'] - data['cost_gold']
-            text += f"📈 Profit: +{profit} Gold\n"
-            text += f"_{data['description']}_\n\n"
+@cached_screen
+def plant_shop_screen(lang: str) -> Screen:
+    """Plant list and buttons; the player's gold is spliced in between head and tail"""
+    text = "\n\nAvailable Plants:\n\n"
+    for plant_name, data in PLANTS.items():
+        text += f"{data['emoji']} **{plant_name}**\n"
+        text += f"💰 Cost: {data['cost_gold']} Gold\n"
+        text += f"⏰ Growth: {data['growth_hours']} hours\n"
+        text += f"💵 Reward: {data['reward_gold']} Gold\n"
+        profit = data['reward_gold'] - data['cost_gold']
+        text += f"📈 Profit: +{profit} Gold\n"
+        text += f"_{data['description']}_\n\n"
     
     keyboard = []
     for plant_name in list(PLANTS.keys())[:6]:
@@ -92,11 +87,18 @@ async def plant_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ])
     
     keyboard.append([InlineKeyboardButton("« Back to Garden", callback_data="garden_menu")])
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    return Screen("🌱 **Plant Shop**\n\nYour Gold: 💰 ", InlineKeyboardMarkup(keyboard), text)
+
+async def plant_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
+    await query.answer()
+    
+    snapshot = await AsyncUserService.get_snapshot(update.effective_user)
+    screen = plant_shop_screen(snapshot.language)
     
     await query.edit_message_text(
-        text=text,
-        reply_markup=reply_markup,
+        text=screen.render(f"{snapshot.gold:,}"),
+        reply_markup=screen.reply_markup,
         parse_mode='Markdown'
     )
 
@@ -104,27 +106,27 @@ async def plant_crop(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     plant_name = query.data.split('_', 1)[1].replace('_', ' ')
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
-        
-        plant, message = GardenService.plant_crop(session, user, plant_name)
-        
-        if not plant:
-            await query.answer(f"❌ {message}", show_alert=True)
-            return
-        
-        plant_data = PLANTS[plant_name]
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
         
-        await query.answer(f"✅ Planted {plant_name}!", show_alert=True)
+        plant, message = await AsyncGardenService.plant_crop(session, user, plant_name)
         
-        text = (
-            "🌱 **Plant Successful!**\n\n"
-            f"You planted {plant_data['emoji']} **{plant_name}**!\n\n"
-            f"💰 Cost: -{plant_data['cost_gold']} Gold\n"
-            f"⏰ Ready in: {format_time_remaining(plant.ready_at)}\n"
-            f"💵 Will earn: {plant_data['reward_gold']} Gold\n\n"
-            f"Current Gold: 💰 {user.gold:,}"
-        )
+        if plant:
+            plant_data = PLANTS[plant_name]
+            
+            text = (
+                "🌱 **Plant Successful!**\n\n"
+                f"You planted {plant_data['emoji']} **{plant_name}**!\n\n"
+                f"💰 Cost: -{plant_data['cost_gold']} Gold\n"
+                f"⏰ Ready in: {format_time_remaining(plant.ready_at)}\n"
+                f"💵 Will earn: {plant_data['reward_gold']} Gold\n\n"
+                f"Current Gold: 💰 {user.gold:,}"
+            )
+    
+    if not plant:
+        await query.answer(f"❌ {message}", show_alert=True)
+        return
+    await query.answer(f"✅ Planted {plant_name}!", show_alert=True)
     
     keyboard = [
         [InlineKeyboardButton("🌱 Plant Another", callback_data="plant_menu")],
@@ -142,9 +144,9 @@ async def check_plants(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
-        ready_plants = GardenService.check_ready_plants(session, user)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
+        ready_plants = await AsyncGardenService.check_ready_plants(session, user)
         
         if ready_plants:
             text = (
@@ -163,19 +165,15 @@ async def check_plants(update: Update, context: ContextTypes.DEFAULT_TYPE):
         keyboard.append([InlineKeyboardButton("« Back to Garden", callback_data="garden_menu")])
         reply_markup = InlineKeyboardMarkup(keyboard)
     
-    await query.edit_message_text(
-        text=text,
-        reply_markup=reply_markup,
-        parse_mode='Markdown'
-    )
+    await edit_message_text(query, text, reply_markup, parse_mode='Markdown')
 
 async def harvest_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
-        plants = GardenService.get_user_plants(session, user)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
+        plants = await AsyncGardenService.get_user_plants(session, user)
         ready_plants = [p for p in plants if p.is_ready]
         
         if not ready_plants:
@@ -210,43 +208,30 @@ async def harvest_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def harvest_all(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
-    await query.answer()
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
-        plants = GardenService.get_user_plants(session, user)
-        ready_plants = [p for p in plants if p.is_ready]
-        
-        if not ready_plants:
-            await query.answer("❌ No plants ready to harvest!", show_alert=True)
-            return
-        
-        total_gold = 0
-        harvested_plants = []
-        
-        for plant in ready_plants:
-            reward = GardenService.harvest_plant(session, user, plant)
-            if reward:
-                total_gold += reward
-                harvested_plants.append(plant.plant_type)
-        
-        await query.answer(f"✅ Harvested {len(harvested_plants)} plants!", show_alert=True)
-        
-        text = (
-            "🎉 **Harvest Complete!**\n\n"
-            f"You harvested {len(harvested_plants)} plant(s)!\n\n"
-        )
-        
-        plant_counts = {}
-        for plant_type in harvested_plants:
-            plant_counts[plant_type] = plant_counts.get(plant_type, 0) + 1
-        
-        for plant_type, count in plant_counts.items():
-            plant_emoji = PLANTS[plant_type]['emoji']
-            text += f"{plant_emoji} {plant_type} x{count}\n"
-        
-        text += f"\n💰 **Total Earned: {total_gold:,} Gold**\n"
-        text += f"💰 New Balance: {user.gold:,} Gold"
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
+        summary = await AsyncGardenService.harvest_all(session, user)
+    
+    if summary is None:
+        await query.answer("❌ No plants ready to harvest!", show_alert=True)
+        return
+    
+    await query.answer(f"✅ Harvested {summary.plants} plants!", show_alert=True)
+    
+    text = (
+        "🎉 **Harvest Complete!**\n\n"
+        f"You harvested {summary.plants} plant(s)!\n\n"
+    )
+    
+    for plant_type, count in summary.counts.items():
+        plant_emoji = PLANTS[plant_type]['emoji']
+        text += f"{plant_emoji} {plant_type} x{count}\n"
+    
+    if summary.bonus_gold:
+        text += f"\n👑 VIP Bonus: +{summary.bonus_gold:,} Gold"
+    text += f"\n💰 **Total Earned: {summary.total_gold:,} Gold**\n"
+    text += f"💰 New Balance: {summary.balance:,} Gold"
     
     keyboard = [
         [InlineKeyboardButton("🌱 Plant More", callback_data="plant_menu")],
@@ -261,14 +246,12 @@ async def harvest_all(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 def register_garden_handlers(application):
-    application.add_handler(CallbackQueryHandler(garden_menu, pattern="^garden_menu$"))
-    application.add_handler(CallbackQueryHandler(plant_menu, pattern="^plant_menu$"))
-    application.add_handler(CallbackQueryHandler(plant_crop, pattern="^plant_"))
-    application.add_handler(CallbackQueryHandler(check_plants, pattern="^check_plants$"))
-    application.add_handler(CallbackQueryHandler(harvest_menu, pattern="^harvest_menu$"))
-    application.add_handler(CallbackQueryHandler(harvest_all, pattern="^harvest_all$"))
-    # Message handlers for reply keyboard buttons
-    application.add_handler(MessageHandler(
-        filters.TEXT & filters.Regex('🌱 Сад|🌱 Garden'),
-        garden_menu
-    ))
+    router = get_router(application)
+    router.add_callback(garden_menu, 'garden_menu')
+    router.add_callback(plant_menu, 'plant_menu')
+    router.add_callback_prefix(plant_crop, 'plant_')
+    router.add_callback(check_plants, 'check_plants')
+    router.add_callback(harvest_menu, 'harvest_menu')
+    router.add_callback(harvest_all, 'harvest_all')
+    # Message handler for reply keyboard button
+    router.add_button(garden_menu, 'nav_garden')
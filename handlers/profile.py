@@ -1,21 +1,26 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
-from telegram.ext import ContextTypes, CallbackQueryHandler, MessageHandler, filters, CommandHandler
-from database import get_session
-from database.models import User, Battlepass
-from services import UserService
+from telegram.ext import ContextTypes, CommandHandler
+from database import get_async_session
+from database.budget import sql_budget
+from database.models import User, Dragon
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+from services import AsyncUserService
 from utils.helpers import format_user_profile
 from utils.constants import RARITIES
 from localization import t
+from core import get_router
 from datetime import datetime
 import config
 
+@sql_budget(3)
 async def profile_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     if query:
         await query.answer()
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user, joinedload(User.battlepass))
         lang = user.language
         
         text = t(lang, 'profile_title')
@@ -25,9 +30,9 @@ async def profile_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
                   gold=user.gold, 
                   crystals=user.crystals)
         text += t(lang, 'profile_stats',
-                  dragons=len(user.dragons),
-                  eggs=len([e for e in user.eggs if not e.is_hatched]),
-                  plants=len([p for p in user.plants if not p.is_harvested]),
+                  dragons=user.dragon_count,
+                  eggs=user.active_egg_count,
+                  plants=user.growing_plant_count,
                   created=user.created_at.strftime('%Y-%m-%d'))
         
         # VIP Status
@@ -46,7 +51,7 @@ async def profile_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
             text += "\n👑 VIP: Неактивен\n"
         
         # Battlepass Status
-        bp = session.query(Battlepass).filter_by(user_id=user.id).first()
+        bp = user.battlepass
         if bp and bp.is_active and bp.expiration_date and bp.expiration_date > datetime.utcnow():
             text += f"\n🎖️ Боевой пропуск: Активен\n"
             text += f"📊 Прогресс: {bp.current_progress}/{config.BATTLEPASS_MAX_DAYS} дней\n"
@@ -54,8 +59,10 @@ async def profile_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
             text += "\n🎖️ Боевой пропуск: Неактивен\n"
         
         rarity_counts = {}
-        for dragon in user.dragons:
-            rarity_counts[dragon.rarity] = rarity_counts.get(dragon.rarity, 0) + 1
+        if user.dragon_count:
+            rarity_counts = dict((await session.execute(
+                select(Dragon.rarity, func.count()).where(Dragon.user_id == user.id).group_by(Dragon.rarity)
+            )).all())
         
         if rarity_counts:
             text += "\n\n🐉 **Коллекция драконов:**\n"
@@ -85,8 +92,7 @@ async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 def register_profile_handlers(application):
     application.add_handler(CommandHandler("profile", profile_command))
-    application.add_handler(CallbackQueryHandler(profile_menu, pattern="^profile_menu$"))
-    application.add_handler(MessageHandler(
-        filters.TEXT & filters.Regex('Профиль|Profile'),
-        profile_menu
-    ))
+    
+    router = get_router(application)
+    router.add_callback(profile_menu, 'profile_menu')
+    router.add_button(profile_menu, 'nav_profile')
@@ -1,15 +1,16 @@
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
-from telegram.ext import ContextTypes, CommandHandler, CallbackQueryHandler, MessageHandler, filters
-from database import get_session
-from services import UserService
+from telegram.ext import ContextTypes, CommandHandler
+from database import get_async_session
+from database.budget import sql_budget
+from services import AsyncUserService
 from localization import t
 from datetime import datetime
-from shop.shop_handler import shop_menu
-from handlers.vip import vip_menu
+from core import get_router, cached_screen, Screen
 
+@sql_budget(3)
 async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
         
         is_new_user = user.created_at and (user.updated_at - user.created_at).total_seconds() < 5
         lang = user.language
@@ -17,13 +18,12 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if is_new_user:
             welcome_text = t(lang, 'start_welcome')
         else:
-            eggs_count = len([e for e in user.eggs if not e.is_hatched])
             welcome_text = t(lang, 'start_welcome_back',
                              first_name=user.first_name,
                              gold=user.gold,
                              crystals=user.crystals,
-                             dragons=len(user.dragons),
-                             eggs=eggs_count)
+                             dragons=user.dragon_count,
+                             eggs=user.active_egg_count)
     
     keyboard = [
         [t(lang, 'nav_eggs'), t(lang, 'nav_dragons')],
@@ -47,11 +47,8 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             parse_mode='Markdown'
         )
 
-async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
-        lang = user.language
-    
+@cached_screen
+def help_screen(lang: str) -> Screen:
     help_text = t(lang, 'help_title')
     help_text += t(lang, 'help_eggs')
     help_text += t(lang, 'help_dragons')
@@ -60,26 +57,27 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     help_text += t(lang, 'help_commands')
     
     keyboard = [[t(lang, 'nav_start')]]
-    reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
+    return Screen(help_text, ReplyKeyboardMarkup(keyboard, resize_keyboard=True))
+
+async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    screen = help_screen((await AsyncUserService.get_snapshot(update.effective_user)).language)
     
     if update.callback_query:
         await update.callback_query.edit_message_text(
-            text=help_text,
-            reply_markup=reply_markup,
+            text=screen.render(),
+            reply_markup=screen.reply_markup,
             parse_mode='Markdown'
         )
     else:
         await update.message.reply_text(
-            text=help_text,
-            reply_markup=reply_markup,
+            text=screen.render(),
+            reply_markup=screen.reply_markup,
             parse_mode='Markdown'
         )
 
 async def language_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Change language"""
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
-        lang = user.language
+    lang = (await AsyncUserService.get_snapshot(update.effective_user)).language
     
     text = t(lang, 'language_select')
     
@@ -100,20 +98,20 @@ async def set_language(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Set language"""
     message_text = update.message.text
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
         
         # Parse language from message
         if 'Русский' in message_text or 'Russian' in message_text:
-            user.language = 'ru'
+            await AsyncUserService.set_language(session, user, 'ru')
         elif 'English' in message_text:
-            user.language = 'en'
+            await AsyncUserService.set_language(session, user, 'en')
         
         lang = user.language
-        
-        await update.message.reply_text(t(lang, 'language_changed'))
-        # Return to main menu
-        await start_command(update, context)
+    
+    await update.message.reply_text(t(lang, 'language_changed'))
+    # Return to main menu (after the commit, so it renders the new language)
+    await start_command(update, context)
 
 async def back_to_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await start_command(update, context)
@@ -122,26 +120,12 @@ def register_start_handlers(application):
     application.add_handler(CommandHandler("start", start_command))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("language", language_command))
-    application.add_handler(CallbackQueryHandler(back_to_menu, pattern="^start_menu$"))
-    application.add_handler(CallbackQueryHandler(help_command, pattern="^help_menu$"))
-    application.add_handler(MessageHandler(
-        filters.TEXT & (filters.Regex('Главное меню|Main Menu') | filters.Regex('Назад|Back')),
-        back_to_menu
-    ))
-    # Message handlers for reply keyboard buttons
-    application.add_handler(MessageHandler(
-        filters.TEXT & filters.Regex('🛒 Магазин|🛒 Shop'),
-        shop_menu
-    ))
-    application.add_handler(MessageHandler(
-        filters.TEXT & filters.Regex('👑 VIP'),
-        vip_menu
-    ))
-    application.add_handler(MessageHandler(
-        filters.TEXT & filters.Regex('🌐 Язык|🌐 Language'),
-        language_command
-    ))
-    application.add_handler(MessageHandler(
-        filters.TEXT & filters.Regex('❓ Справка|❓ Help'),
-        help_command
-    ))
+    
+    router = get_router(application)
+    router.add_callback(back_to_menu, 'start_menu')
+    router.add_callback(help_command, 'help_menu')
+    # Reply keyboard buttons
+    router.add_button(back_to_menu, 'nav_start', 'nav_back')
+    router.add_button(language_command, 'nav_language')
+    router.add_button(help_command, 'nav_help')
+    router.add_button(set_language, 'language_russian', 'language_english')
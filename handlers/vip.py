@@ -1,13 +1,20 @@
 from telegram import Update, ReplyKeyboardMarkup
-from telegram.ext import ContextTypes, CallbackQueryHandler, MessageHandler, filters
-from database import get_session
+from telegram.ext import ContextTypes
+from database import get_async_session
 from database.models import User
-from services import UserService
+from services import AsyncUserService
 from payment.stars_handler import send_stars_invoice
 from localization import t
+from core import get_router
 from datetime import datetime, timedelta
 import config
 
+# Reply keyboard button text -> VIP level, e.g. "🥉 VIP Bronze 99⭐️"
+VIP_BUTTONS = {
+    f"{config.VIP_BENEFITS[level]['emoji']} {config.VIP_BENEFITS[level]['name']} {price}⭐️": level
+    for level, price in config.VIP_PRICES.items()
+}
+
 async def vip_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show VIP status and options"""
     query = update.callback_query
@@ -16,8 +23,8 @@ async def vip_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if is_callback:
         await query.answer()
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
         lang = user.language
         
         # Check if VIP is active
@@ -49,13 +56,8 @@ async def vip_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
         text += "\n\n"
         text += t(lang, 'vip_level_4')
     
-    keyboard = [
-        ["🥉 VIP Bronze 99⭐️"],
-        ["🥈 VIP Silver 499⭐️"],
-        ["🥇 VIP Gold 999⭐️"],
-        ["💎 VIP Platinum 1999⭐️"],
-        [t(lang, 'nav_back')]
-    ]
+    keyboard = [[button] for button in VIP_BUTTONS]
+    keyboard.append([t(lang, 'nav_back')])
     
     reply_markup = ReplyKeyboardMarkup(keyboard, resize_keyboard=True)
     
@@ -68,26 +70,14 @@ async def activate_vip(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle VIP activation button"""
     message = update.message.text
     
-    vip_map = {
-        "🥉 VIP Bronze 99⭐️": 1,
-        "🥈 VIP Silver 499⭐️": 2,
-        "🥇 VIP Gold 999⭐️": 3,
-        "💎 VIP Platinum 1999⭐️": 4
-    }
-    
-    vip_level = vip_map.get(message)
+    vip_level = VIP_BUTTONS.get(message)
     if vip_level:
         await send_stars_invoice(update, context, 'vip', vip_level, config.VIP_PRICES[vip_level])
 
 def register_vip_handlers(application):
     """Register VIP handlers"""
-    application.add_handler(CallbackQueryHandler(vip_menu, pattern="^vip_menu$"))
-    application.add_handler(MessageHandler(
-        filters.TEXT & filters.Regex('🥉 VIP Bronze|🥈 VIP Silver|🥇 VIP Gold|💎 VIP Platinum'),
-        activate_vip
-    ))
+    router = get_router(application)
+    router.add_callback(vip_menu, 'vip_menu')
+    router.add_text(activate_vip, *VIP_BUTTONS)
     # Message handler for reply keyboard VIP button
-    application.add_handler(MessageHandler(
-        filters.TEXT & filters.Regex('👑 VIP'),
-        vip_menu
-    ))
+    router.add_button(vip_menu, 'nav_vip')
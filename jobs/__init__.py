@@ -0,0 +1,17 @@
+from .ready_notifier import ReadyNotifier, register_ready_notifier
+from .crypto_reconciler import CryptoReconciler, register_crypto_reconciler
+from .counter_reconciler import CounterReconciler, register_counter_reconciler
+from .broadcast import Broadcast, start_broadcast, register_broadcast_resume
+
+def register_jobs(application):
+    """Schedule all background jobs on the application's JobQueue"""
+    register_ready_notifier(application)
+    register_crypto_reconciler(application)
+    register_counter_reconciler(application)
+    register_broadcast_resume(application)
+
+__all__ = [
+    'ReadyNotifier', 'CryptoReconciler', 'CounterReconciler', 'Broadcast', 'start_broadcast',
+    'register_ready_notifier', 'register_crypto_reconciler', 'register_counter_reconciler',
+    'register_broadcast_resume', 'register_jobs'
+]
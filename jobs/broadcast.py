@@ -0,0 +1,234 @@
+"""
+Announcements to every player (or a segment of them).
+
+Recipients are streamed in user id order with keyset pagination, one page
+per query, while the previous page is being sent. Sends run concurrently
+in the BROADCAST lane of the outbound rate limiter, so players' own
+replies and notifications are never queued behind an announcement. When
+the bot runs without the limiter (OUTBOUND_RATE_LIMIT off) the job paces
+itself at BROADCAST_RATE and waits out RetryAfter on its own.
+
+The text is sent as Markdown. If Telegram can't parse it, the message is
+resent as plain text and the rest of the broadcast stays plain.
+
+Progress (last user id done and the counters) is saved to ``job_states``
+after every page under ``broadcast:<id>``. After a crash or restart the
+broadcast resumes from the last finished page; at most one page can be
+delivered twice.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from sqlalchemy import or_, select
+from telegram.error import BadRequest, Forbidden, RetryAfter, TelegramError
+from database import get_async_session
+from database.models import JobState, User
+from core import outbound_lane, PriorityRateLimiter, TokenBucket, retry_after_seconds, BROADCAST
+from .state import load_job_state, save_job_state
+import config
+
+logger = logging.getLogger(__name__)
+
+STATE_PREFIX = 'broadcast:'
+
+# Broadcasts running in this process, by name
+_running = {}
+
+class Broadcast:
+    def __init__(self, name: str, text: str, language: str = None, min_vip_level: int = None,
+                 page_size: int = config.BROADCAST_PAGE_SIZE,
+                 concurrency: int = config.BROADCAST_CONCURRENCY):
+        self.name = name
+        self.text = text
+        self.language = language
+        self.min_vip_level = min_vip_level
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.state = {}
+        self.bucket = None
+    
+    @classmethod
+    def create(cls, text: str, language: str = None, min_vip_level: int = None, **kwargs):
+        name = f"{STATE_PREFIX}{datetime.utcnow():%Y%m%d%H%M%S%f}"
+        return cls(name, text, language, min_vip_level, **kwargs)
+    
+    @classmethod
+    def from_state(cls, name: str, state: dict, **kwargs):
+        return cls(name, state['text'], state.get('language'), state.get('min_vip_level'), **kwargs)
+    
+    def segment(self) -> list:
+        """WHERE criteria of the recipients"""
+        criteria = []
+        if self.language:
+            criteria.append(User.language == self.language)
+        if self.min_vip_level:
+            # Same rule as VIPService.is_vip_active: no expiration means permanent
+            criteria.append(User.vip_level >= self.min_vip_level)
+            criteria.append(or_(User.vip_expiration.is_(None), User.vip_expiration > datetime.utcnow()))
+        return criteria
+    
+    async def fetch_page(self, after_id: int) -> list:
+        """(id, telegram_id) of the next page of recipients after after_id"""
+        async with get_async_session() as session:
+            # SELECT id, telegram_id FROM users WHERE id > :after_id AND ... ORDER BY id LIMIT :n
+            return (await session.execute(
+                select(User.id, User.telegram_id)
+                .where(User.id > after_id, *self.segment())
+                .order_by(User.id)
+                .limit(self.page_size)
+            )).all()
+    
+    async def deliver(self, bot, telegram_id: int):
+        """Send to one recipient, pacing and retrying itself when the bot has no rate limiter"""
+        retries = 0
+        while True:
+            if self.bucket is not None:
+                wait = self.bucket.reserve(time.monotonic())
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            
+            parse_mode = self.state.get('parse_mode', 'Markdown')
+            try:
+                return await bot.send_message(chat_id=telegram_id, text=self.text, parse_mode=parse_mode)
+            except BadRequest as e:
+                if not parse_mode or "can't parse entities" not in e.message.lower():
+                    raise
+                logger.warning(f"Broadcast {self.name} is not valid Markdown ({e.message}), sending as plain text")
+                self.state['parse_mode'] = None
+            except RetryAfter as e:
+                # The rate limiter already retried; without it, pause every send
+                if self.bucket is None or retries == config.OUTBOUND_MAX_RETRIES:
+                    raise
+                retries += 1
+                delay = retry_after_seconds(e)
+                self.bucket.paused_until = max(self.bucket.paused_until, time.monotonic() + delay)
+                logger.warning(f"Broadcast {self.name} hit a flood limit, pausing {delay}s")
+    
+    async def send_page(self, bot, rows: list, semaphore: asyncio.Semaphore):
+        counts = self.state
+        
+        async def send(telegram_id):
+            async with semaphore:
+                try:
+                    await self.deliver(bot, telegram_id)
+                    counts['delivered'] += 1
+                except Forbidden:
+                    counts['blocked'] += 1
+                except TelegramError as e:
+                    logger.debug(f"Broadcast to {telegram_id} failed: {e}")
+                    counts['failed'] += 1
+        
+        await asyncio.gather(*(send(telegram_id) for _, telegram_id in rows))
+    
+    async def checkpoint(self):
+        async with get_async_session() as session:
+            await save_job_state(session, self.name, self.state)
+    
+    async def run(self, bot) -> dict:
+        """Send to every recipient not reached yet; returns the report"""
+        async with get_async_session() as session:
+            self.state = await load_job_state(session, self.name)
+        if not self.state:
+            self.state = {
+                'text': self.text, 'language': self.language, 'min_vip_level': self.min_vip_level,
+                'status': 'running', 'after_id': 0, 'delivered': 0, 'failed': 0, 'blocked': 0,
+                'seconds': 0.0, 'started_at': datetime.utcnow().isoformat()
+            }
+            await self.checkpoint()
+        
+        semaphore = asyncio.Semaphore(self.concurrency)
+        if not isinstance(getattr(bot, 'rate_limiter', None), PriorityRateLimiter):
+            self.bucket = TokenBucket(config.BROADCAST_RATE, config.BROADCAST_RATE, time.monotonic())
+        started = time.perf_counter()
+        elapsed = self.state['seconds']
+        
+        with outbound_lane(BROADCAST):
+            rows = await self.fetch_page(self.state['after_id'])
+            while rows:
+                # Fetch the next page while this one is being sent
+                next_page = asyncio.create_task(self.fetch_page(rows[-1].id))
+                try:
+                    await self.send_page(bot, rows, semaphore)
+                except BaseException:
+                    next_page.cancel()
+                    raise
+                self.state['after_id'] = rows[-1].id
+                self.state['seconds'] = elapsed + time.perf_counter() - started
+                await self.checkpoint()
+                rows = await next_page
+        
+        self.state['status'] = 'finished'
+        self.state['seconds'] = elapsed + time.perf_counter() - started
+        self.state['finished_at'] = datetime.utcnow().isoformat()
+        await self.checkpoint()
+        
+        report = self.report()
+        logger.info(f"Broadcast {self.name} finished: {report['delivered']} delivered, {report['blocked']} blocked, "
+                    f"{report['failed']} failed, {report['per_second']:.1f} msg/s")
+        return report
+    
+    def report(self) -> dict:
+        state = self.state
+        sent = state['delivered'] + state['failed'] + state['blocked']
+        return {
+            'name': self.name,
+            'status': state['status'],
+            'delivered': state['delivered'],
+            'failed': state['failed'],
+            'blocked': state['blocked'],
+            'seconds': state['seconds'],
+            'per_second': sent / state['seconds'] if state['seconds'] else 0.0
+        }
+
+def start_broadcast(application, broadcast: Broadcast, on_finished=None) -> asyncio.Task:
+    """Run broadcast in the background of application; on_finished(report) is awaited at the end"""
+    async def run():
+        try:
+            report = await broadcast.run(application.bot)
+            if on_finished is not None:
+                await on_finished(report)
+        except Exception as e:
+            logger.error(f"Broadcast {broadcast.name} failed: {e}")
+        finally:
+            _running.pop(broadcast.name, None)
+    
+    task = application.create_task(run(), name=broadcast.name)
+    _running[broadcast.name] = broadcast
+    return task
+
+def running_broadcasts() -> list:
+    return list(_running.values())
+
+async def load_unfinished() -> list:
+    """Broadcasts whose saved state says they were still running"""
+    async with get_async_session() as session:
+        rows = (await session.execute(
+            select(JobState.name, JobState.state).where(JobState.name.startswith(STATE_PREFIX))
+        )).all()
+    return [Broadcast.from_state(name, state) for name, state in rows
+            if state and state.get('status') == 'running' and name not in _running]
+
+async def latest_broadcast_state() -> dict:
+    async with get_async_session() as session:
+        row = (await session.execute(
+            select(JobState.name, JobState.state)
+            .where(JobState.name.startswith(STATE_PREFIX))
+            .order_by(JobState.name.desc())
+            .limit(1)
+        )).first()
+    return {'name': row.name, **row.state} if row else {}
+
+def register_broadcast_resume(application):
+    """Resume broadcasts interrupted by a crash or restart shortly after startup"""
+    if application.job_queue is None:
+        logger.warning("JobQueue unavailable, interrupted broadcasts will not resume")
+        return None
+    
+    async def resume(context):
+        for broadcast in await load_unfinished():
+            logger.info(f"Resuming broadcast {broadcast.name}")
+            start_broadcast(context.application, broadcast)
+    
+    return application.job_queue.run_once(resume, when=config.BROADCAST_RESUME_DELAY, name='broadcast_resume')
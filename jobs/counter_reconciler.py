@@ -0,0 +1,101 @@
+"""
+Repair drift in the denormalized per-user counters.
+
+``users.dragon_count``, ``active_egg_count`` and ``growing_plant_count`` are
+bumped by the services in the same transaction as the rows they count, so
+they only drift through manual edits, deletes outside the services or bugs.
+This job walks the users table in id order, recomputes each chunk with one
+GROUP BY per counted table and rewrites the counters that disagree.
+
+Usage (one pass right now, outside the bot):
+    python -m jobs.counter_reconciler --chunk-size 1000
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime
+from database import get_async_session, dispose_async_engine
+from services import AsyncUserService
+from .state import save_job_state
+import config
+
+logger = logging.getLogger(__name__)
+
+class CounterReconciler:
+    def __init__(self, name: str = 'counter_reconciler',
+                 chunk_size: int = config.COUNTER_RECONCILE_CHUNK_SIZE,
+                 interval: float = config.COUNTER_RECONCILE_INTERVAL):
+        self.name = name
+        self.chunk_size = chunk_size
+        self.interval = interval
+    
+    async def run(self) -> dict:
+        """Reconcile every user once, one transaction per chunk. Returns run statistics."""
+        stats = {'checked': 0, 'fixed': 0, 'chunks': 0}
+        after_id = 0
+        started = time.perf_counter()
+        
+        while True:
+            async with get_async_session() as session:
+                result = await AsyncUserService.reconcile_counters(session, after_id, self.chunk_size)
+            if result['last_id'] is None:
+                break
+            after_id = result['last_id']
+            stats['checked'] += result['checked']
+            stats['fixed'] += result['fixed']
+            stats['chunks'] += 1
+        
+        stats['seconds'] = time.perf_counter() - started
+        
+        async with get_async_session() as session:
+            await save_job_state(session, self.name, {
+                'finished_at': datetime.utcnow().isoformat(),
+                'last_run': stats
+            })
+        
+        log = logger.warning if stats['fixed'] else logger.info
+        log(f"Counter reconcile: {stats['checked']} users in {stats['chunks']} chunks, "
+            f"{stats['fixed']} fixed, {stats['seconds']:.2f}s")
+        return stats
+    
+    async def job(self, context):
+        """JobQueue callback: reconcile, then re-arm for the next run"""
+        try:
+            await self.run()
+        except Exception as e:
+            logger.error(f"Counter reconcile failed: {e}")
+        context.job_queue.run_once(self.job, when=self.interval, name=self.name)
+
+def register_counter_reconciler(application):
+    if not config.COUNTER_RECONCILE_ENABLED:
+        return None
+    if application.job_queue is None:
+        logger.warning("JobQueue unavailable, counter reconciliation disabled")
+        return None
+    
+    reconciler = CounterReconciler()
+    application.job_queue.run_once(reconciler.job, when=reconciler.interval, name=reconciler.name)
+    return reconciler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--chunk-size', type=int, default=config.COUNTER_RECONCILE_CHUNK_SIZE)
+    args = parser.parse_args()
+    
+    from database import init_db
+    init_db()
+    
+    async def run():
+        try:
+            return await CounterReconciler(chunk_size=args.chunk_size).run()
+        finally:
+            await dispose_async_engine()
+    
+    stats = asyncio.run(run())
+    print(f"{stats['checked']} users in {stats['chunks']} chunks, {stats['fixed']} fixed "
+          f"({stats['seconds']:.2f}s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Background reconciliation of pending crypto invoices.
+
+Pending ``CryptoTransaction`` rows are paged oldest first by
+``(created_at, id)`` and each page is resolved with a single CryptoBot
+``getInvoices`` call. The page's status transitions (paid -> completed,
+expired -> failed, open for longer than ``CRYPTO_INVOICE_TTL`` -> failed)
+commit in one transaction, and credited players are notified afterwards.
+
+Usage (one pass right now, outside the bot):
+    python -m jobs.crypto_reconciler --batch-size 100
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from database import get_async_session, dispose_async_engine
+from payment import CryptoBotAPI
+from payment.crypto_handler import notify_crypto_payment
+from services import AsyncCryptoService
+from .state import save_job_state
+import config
+
+logger = logging.getLogger(__name__)
+
+class CryptoReconciler:
+    def __init__(self, name: str = 'crypto_reconciler',
+                 batch_size: int = config.CRYPTO_RECONCILE_BATCH_SIZE,
+                 interval: float = config.CRYPTO_RECONCILE_INTERVAL,
+                 invoice_ttl: float = config.CRYPTO_INVOICE_TTL,
+                 api: CryptoBotAPI = None):
+        self.name = name
+        self.batch_size = batch_size
+        self.interval = interval
+        self.invoice_ttl = timedelta(seconds=invoice_ttl)
+        self.api = api or CryptoBotAPI()
+    
+    async def run(self, bot=None) -> dict:
+        """Reconcile every pending invoice once. Returns run statistics."""
+        expire_before = datetime.utcnow() - self.invoice_ttl
+        stats = {'checked': 0, 'completed': 0, 'expired': 0, 'batches': 0, 'api_calls': 0, 'errors': 0}
+        after = None
+        started = time.perf_counter()
+        
+        while True:
+            async with get_async_session() as session:
+                page = await AsyncCryptoService.get_pending_page(session, self.batch_size, after)
+            if not page:
+                break
+            after = (page[-1].created_at, page[-1].id)
+            
+            result = await self.api.get_invoices([row.invoice_id for row in page])
+            stats['api_calls'] += 1
+            if not result['success']:
+                # Leave the page pending; the next run picks it up again
+                stats['errors'] += 1
+                continue
+            remote_statuses = {invoice['invoice_id']: invoice['status'] for invoice in result['invoices']}
+            
+            # All transitions of the page commit together
+            async with get_async_session() as session:
+                outcome = await AsyncCryptoService.reconcile_batch(session, page, remote_statuses, expire_before)
+            
+            stats['checked'] += len(page)
+            stats['completed'] += len(outcome['credited'])
+            stats['expired'] += outcome['expired']
+            stats['batches'] += 1
+            
+            if bot is not None:
+                for telegram_id, language in outcome['credited']:
+                    await notify_crypto_payment(bot, telegram_id, language, config.CRYPTO_PAYMENT_CRYSTALS)
+        
+        elapsed = time.perf_counter() - started
+        stats['seconds'] = elapsed
+        stats['invoices_per_second'] = stats['checked'] / elapsed if elapsed else 0.0
+        # One getInvoice call per invoice is what polling each row would have cost
+        stats['api_calls_saved'] = max(stats['checked'] - stats['api_calls'], 0)
+        
+        async with get_async_session() as session:
+            await save_job_state(session, self.name, {
+                'finished_at': datetime.utcnow().isoformat(),
+                'last_run': stats
+            })
+        
+        logger.info(f"Crypto reconcile: {stats['checked']} invoices in {stats['batches']} batches, "
+                    f"{stats['completed']} completed, {stats['expired']} expired, "
+                    f"{stats['invoices_per_second']:,.0f} invoices/s, {stats['api_calls_saved']} API calls saved")
+        return stats
+    
+    async def job(self, context):
+        """JobQueue callback: reconcile, then re-arm for the next run"""
+        try:
+            await self.run(context.bot)
+        except Exception as e:
+            logger.error(f"Crypto reconcile failed: {e}")
+        context.job_queue.run_once(self.job, when=self.interval, name=self.name)
+
+def register_crypto_reconciler(application):
+    if not config.CRYPTO_RECONCILE_ENABLED or not config.CRYPTOBOT_API_TOKEN:
+        return None
+    if application.job_queue is None:
+        logger.warning("JobQueue unavailable, crypto reconciliation disabled")
+        return None
+    
+    reconciler = CryptoReconciler()
+    application.job_queue.run_once(reconciler.job, when=30, name=reconciler.name)
+    return reconciler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--batch-size', type=int, default=config.CRYPTO_RECONCILE_BATCH_SIZE)
+    args = parser.parse_args()
+    
+    from database import init_db
+    from payment import close_http_client
+    init_db()
+    
+    async def run():
+        try:
+            return await CryptoReconciler(batch_size=args.batch_size).run()
+        finally:
+            await close_http_client()
+            await dispose_async_engine()
+    
+    stats = asyncio.run(run())
+    print(f"{stats['checked']} invoices in {stats['batches']} batches, {stats['completed']} completed, "
+          f"{stats['expired']} expired, {stats['invoices_per_second']:,.0f} invoices/s, "
+          f"{stats['api_calls_saved']} API calls saved")
+
+if __name__ == '__main__':
+    main()
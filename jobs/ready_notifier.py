@@ -0,0 +1,166 @@
+"""
+Push a notification when eggs finish hatching or plants become ready.
+
+Deadlines live in a min-heap fed by one indexed range query over
+``eggs.hatches_at`` / ``plants.ready_at`` covering the next ``horizon``
+seconds, refilled every ``refill_interval``. The job wakes up exactly at the
+next deadline, sends one message per player for everything that became
+ready at once, and stores the last delivered deadline as a watermark.
+After a restart the same range query (watermark, now + horizon] reloads
+every pending deadline, including the ones that passed while the bot was down.
+"""
+
+import heapq
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import Forbidden, TelegramError
+from database import get_async_session
+from database.models import Egg, Plant, User
+from localization import t
+from core import outbound_lane, NOTIFICATION
+from .state import load_job_state, save_job_state
+import config
+
+logger = logging.getLogger(__name__)
+
+class ReadyNotifier:
+    def __init__(self, name: str = 'ready_notifier',
+                 horizon: float = config.READY_NOTIFY_HORIZON,
+                 refill_interval: float = config.READY_NOTIFY_REFILL_INTERVAL):
+        self.name = name
+        self.horizon = timedelta(seconds=horizon)
+        self.refill_interval = timedelta(seconds=refill_interval)
+        self.heap = []  # (deadline, kind, row_id, user_id)
+        self.scheduled = set()  # (kind, row_id) already in the heap
+        self.watermark = None
+        self.next_refill = None
+        self.notifications_sent = 0
+    
+    async def load(self, now: datetime):
+        """Restore the watermark; on first run start from now instead of announcing old rows"""
+        async with get_async_session() as session:
+            state = await load_job_state(session, self.name)
+        
+        watermark = state.get('watermark')
+        self.watermark = datetime.fromisoformat(watermark) if watermark else now
+        self.next_refill = None
+    
+    async def refill(self, now: datetime):
+        """Load every pending deadline in (watermark, now + horizon] into the heap"""
+        until = now + self.horizon
+        egg_query = select(Egg.id, Egg.user_id, Egg.hatches_at).where(
+            Egg.hatches_at > self.watermark,
+            Egg.hatches_at <= until,
+            Egg.is_hatched == False
+        )
+        plant_query = select(Plant.id, Plant.user_id, Plant.ready_at).where(
+            Plant.ready_at > self.watermark,
+            Plant.ready_at <= until,
+            Plant.is_harvested == False
+        )
+        
+        added = 0
+        async with get_async_session() as session:
+            for kind, query in (('egg', egg_query), ('plant', plant_query)):
+                for row_id, user_id, deadline in await session.execute(query):
+                    if (kind, row_id) in self.scheduled:
+                        continue
+                    self.scheduled.add((kind, row_id))
+                    heapq.heappush(self.heap, (deadline, kind, row_id, user_id))
+                    added += 1
+        
+        self.next_refill = now + self.refill_interval
+        if added:
+            logger.debug(f"Scheduled {added} ready notifications until {until}")
+        return added
+    
+    def pop_due(self, now: datetime) -> dict:
+        """Pop everything due by now, grouped as {user_id: Counter(egg=n, plant=m)}"""
+        due = {}
+        while self.heap and self.heap[0][0] <= now:
+            deadline, kind, row_id, user_id = heapq.heappop(self.heap)
+            self.scheduled.discard((kind, row_id))
+            due.setdefault(user_id, Counter())[kind] += 1
+            self.watermark = max(self.watermark, deadline)
+        return due
+    
+    @staticmethod
+    def render(lang: str, counts: Counter):
+        text = t(lang, 'notify_ready_title')
+        buttons = []
+        if counts['egg']:
+            text += t(lang, 'notify_eggs_ready', count=counts['egg']) + "\n"
+            buttons.append([InlineKeyboardButton(t(lang, 'nav_eggs'), callback_data="check_eggs")])
+        if counts['plant']:
+            text += t(lang, 'notify_plants_ready', count=counts['plant']) + "\n"
+            buttons.append([InlineKeyboardButton(t(lang, 'nav_garden'), callback_data="harvest_menu")])
+        return text, InlineKeyboardMarkup(buttons)
+    
+    async def notify(self, bot, due: dict) -> int:
+        """Send one batched message per user"""
+        if not due:
+            return 0
+        
+        async with get_async_session() as session:
+            users = (await session.execute(
+                select(User.id, User.telegram_id, User.language).where(User.id.in_(due))
+            )).all()
+        
+        sent = 0
+        # Queued behind payments and replies to players when the outbound limit is reached
+        with outbound_lane(NOTIFICATION):
+            for user_id, telegram_id, lang in users:
+                text, reply_markup = self.render(lang, due[user_id])
+                try:
+                    await bot.send_message(chat_id=telegram_id, text=text,
+                                           reply_markup=reply_markup, parse_mode='Markdown')
+                    sent += 1
+                except Forbidden:
+                    logger.debug(f"User {telegram_id} blocked the bot, skipping notification")
+                except TelegramError as e:
+                    logger.warning(f"Failed to notify user {telegram_id}: {e}")
+        
+        self.notifications_sent += sent
+        return sent
+    
+    async def run_once(self, bot, now: datetime = None) -> float:
+        """Deliver everything due. Returns seconds until the next wake-up."""
+        now = now or datetime.utcnow()
+        if self.watermark is None:
+            await self.load(now)
+        if self.next_refill is None or now >= self.next_refill:
+            await self.refill(now)
+        
+        due = self.pop_due(now)
+        if due:
+            await self.notify(bot, due)
+            async with get_async_session() as session:
+                await save_job_state(session, self.name, {'watermark': self.watermark.isoformat()})
+        
+        wake_at = self.next_refill
+        if self.heap:
+            wake_at = min(wake_at, self.heap[0][0])
+        return max((wake_at - datetime.utcnow()).total_seconds(), 0.0)
+    
+    async def job(self, context):
+        """JobQueue callback: run, then re-arm for the next deadline"""
+        try:
+            delay = await self.run_once(context.bot)
+        except Exception as e:
+            logger.error(f"Ready notifier failed: {e}")
+            delay = self.refill_interval.total_seconds()
+        context.job_queue.run_once(self.job, when=delay, name=self.name)
+
+def register_ready_notifier(application):
+    if not config.READY_NOTIFICATIONS:
+        return None
+    if application.job_queue is None:
+        logger.warning("JobQueue unavailable, ready notifications disabled")
+        return None
+    
+    notifier = ReadyNotifier()
+    application.job_queue.run_once(notifier.job, when=1, name=notifier.name)
+    return notifier
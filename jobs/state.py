@@ -0,0 +1,18 @@
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models import JobState
+
+async def load_job_state(session: AsyncSession, name: str) -> dict:
+    """Return the saved state of a job ({} if it never ran)"""
+    job_state = await session.get(JobState, name)
+    return dict(job_state.state or {}) if job_state else {}
+
+async def save_job_state(session: AsyncSession, name: str, state: dict):
+    job_state = await session.get(JobState, name)
+    if job_state is None:
+        session.add(JobState(name=name, state=state))
+    else:
+        # Assign a new dict so the JSON column is detected as changed
+        job_state.state = dict(state)
+        job_state.updated_at = datetime.utcnow()
+    await session.flush()
@@ -1,24 +1,35 @@
-from .ru import MESSAGES as RU_MESSAGES
-from .en import MESSAGES as EN_MESSAGES
+import importlib
+from . import ru, en
+from .catalog import Catalog
 
-MESSAGES = {
-    'ru': RU_MESSAGES,
-    'en': EN_MESSAGES
+_MODULES = {
+    'ru': ru,
+    'en': en
 }
 
+MESSAGES = {lang: module.MESSAGES for lang, module in _MODULES.items()}
+
 DEFAULT_LANGUAGE = 'ru'
 
+CATALOG = Catalog(MESSAGES, DEFAULT_LANGUAGE)
+_TEMPLATES = CATALOG.templates
+_FORMATTERS = CATALOG.formatters
+_DEFAULT_TEMPLATES = _TEMPLATES[DEFAULT_LANGUAGE]
+_DEFAULT_FORMATTERS = _FORMATTERS[DEFAULT_LANGUAGE]
+
 def get_message(lang: str, key: str, **kwargs):
     """Get a localized message with variable substitution"""
-    if lang not in MESSAGES:
-        lang = DEFAULT_LANGUAGE
-    
-    template = MESSAGES[lang].get(key, MESSAGES[DEFAULT_LANGUAGE].get(key, key))
-    
     if kwargs:
-        return template.format(**kwargs)
-    return template
+        formatter = _FORMATTERS.get(lang, _DEFAULT_FORMATTERS).get(key)
+        if formatter is not None:
+            return formatter(**kwargs)
+    return _TEMPLATES.get(lang, _DEFAULT_TEMPLATES).get(key, key)
+
+def reload_catalog() -> int:
+    """Re-read the message modules and recompile CATALOG in place; returns its new version"""
+    messages = {lang: importlib.reload(module).MESSAGES for lang, module in _MODULES.items()}
+    MESSAGES.update(messages)
+    return CATALOG.compile(MESSAGES)
 
-def t(lang: str, key: str, **kwargs):
-    """Shorthand for get_message"""
-    return get_message(lang, key, **kwargs)
+# Shorthand for get_message (an alias rather than a wrapper: one call less per message)
+t = get_message
@@ -0,0 +1,89 @@
+"""
+Message catalog compiled once at import.
+
+Every language gets one flat dict with the default language already merged
+in underneath it, so a lookup is a single ``dict.get``. Templates with
+placeholders are stored next to their bound ``str.format``; a hand-built
+formatter in Python measured slower than the C implementation, so the bound
+method is the compiled form (``benchmarks/localization_benchmark.py``).
+"""
+
+import logging
+from string import Formatter
+
+logger = logging.getLogger(__name__)
+
+def template_fields(template: str) -> frozenset:
+    """Names of the placeholders used by a template"""
+    return frozenset(field for _, field, _, _ in Formatter().parse(template) if field)
+
+class Catalog:
+    def __init__(self, sources: dict, default_language: str):
+        self.default_language = default_language
+        # lang -> key -> template, default language merged underneath
+        self.templates = {}
+        # lang -> key -> bound str.format, only for templates with placeholders
+        self.formatters = {}
+        # Bumped on every compile, so caches of rendered text can key on it
+        self.version = 0
+        self._listeners = []
+        self.compile(sources)
+    
+    def on_compile(self, callback):
+        """Register callback(version) to run after each recompile (usable as a decorator)"""
+        self._listeners.append(callback)
+        return callback
+    
+    def compile(self, sources: dict) -> int:
+        """Rebuild the lookup tables in place (references to them stay valid); returns the new version"""
+        fallback = sources[self.default_language]
+        templates = {lang: {**fallback, **messages} for lang, messages in sources.items()}
+        formatters = {
+            lang: {key: template.format for key, template in compiled.items() if '{' in template}
+            for lang, compiled in templates.items()
+        }
+        
+        for table, compiled in ((self.templates, templates), (self.formatters, formatters)):
+            for lang in table.keys() - compiled.keys():
+                del table[lang]
+            for lang, entries in compiled.items():
+                current = table.setdefault(lang, {})
+                current.clear()
+                current.update(entries)
+        
+        self.sources = sources
+        self.version += 1
+        for callback in self._listeners:
+            callback(self.version)
+        return self.version
+    
+    def missing_keys(self) -> dict:
+        """{lang: keys some other language defines but this one does not}"""
+        all_keys = set().union(*self.sources.values())
+        return {
+            lang: sorted(all_keys - set(messages))
+            for lang, messages in self.sources.items()
+            if all_keys - set(messages)
+        }
+    
+    def mismatched_fields(self) -> dict:
+        """{key: {lang: fields}} for keys whose translations use different placeholders"""
+        mismatched = {}
+        for key in set().union(*self.sources.values()):
+            fields = {lang: template_fields(messages[key])
+                      for lang, messages in self.sources.items() if key in messages}
+            if len(set(fields.values())) > 1:
+                mismatched[key] = fields
+        return mismatched
+    
+    def warn_if_incomplete(self) -> bool:
+        """Log missing keys and placeholder mismatches. Returns True if the catalog is complete."""
+        missing = self.missing_keys()
+        for lang, keys in missing.items():
+            logger.warning(f"Localization '{lang}' is missing {len(keys)} key(s), "
+                           f"falling back to '{self.default_language}': {', '.join(keys)}")
+        mismatched = self.mismatched_fields()
+        for key, fields in sorted(mismatched.items()):
+            described = ', '.join(f"{lang}={sorted(names)}" for lang, names in sorted(fields.items()))
+            logger.warning(f"Localization key '{key}' uses different placeholders: {described}")
+        return not missing and not mismatched
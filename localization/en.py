@@ -41,6 +41,7 @@ MESSAGES = {
     'dragon_level_up': '🎉 **Level Up!**\n\n{emoji} **{name}** reached Level {level}!\n\n**New Stats:**\n💪 Strength: {strength}\n⚡ Agility: {agility}\n🧠 Intelligence: {intelligence}\n\n❤️ Hunger: {hunger}%\n😊 Happiness: {happiness}%',
     'dragon_feed_cooldown': '⏰ You can feed this dragon again in {hours:.1f} hours!',
     'dragon_not_found': '❌ Dragon not found!',
+    'dragons_limit_reached': '🐉 You have {count}/{max} dragons, the limit of your VIP level. Upgrade VIP to hatch more!',
     'dragon_feed_button': '🍖 Feed',
     'dragon_view_stats': '📊 View Stats',
     
@@ -68,14 +69,7 @@ MESSAGES = {
     'daily_egg_claimed': '✅ You got a {emoji} **{type}** egg!\n\nHatching time: {hours} hours\n\nGood luck!',
     
     # Shop - Eggs
-    'shop_eggs_title': '🥚 **Egg Shop**\n\nChoose an egg to purchase:\n\n',
-    'shop_eggs_regular': '🥚 **Regular Egg**\n💰 {gold} Gold\n⏰ Hatching: 48 hours\n📊 Rare chance: 30%',
-    'shop_eggs_rare': '🔵 **Rare Egg**\n💰 {gold} Gold\n⏰ Hatching: 72 hours\n📊 Epic chance: 20%',
-    'shop_eggs_premium': '💎 **Premium Egg**\n💎 {crystals} Crystals\n⏰ Hatching: 96 hours\n📊 Legendary chance: 18%',
-    'shop_eggs_legendary': '🌟 **Legendary Egg**\n💎 {crystals} Crystals\n⏰ Hatching: 7 days\n📊 Mythic chance: 5%',
-    'shop_not_enough_gold': '❌ Not enough gold!',
     'shop_not_enough_crystals': '❌ Not enough crystals!',
-    'shop_purchase_success': '✅ You bought a {emoji} **{type}** egg!\n\nCheck the "Eggs" tab.',
     'shop_buy_button': '🛒 Buy',
     
     # Garden
@@ -187,6 +181,11 @@ MESSAGES = {
     'shop_battlepass_category': '🎖️ Battlepass',
     'shop_crypto_category': '🪙 Crypto',
     
+    # Notifications
+    'notify_ready_title': '🔔 **Good news!**\n\n',
+    'notify_eggs_ready': '🥚 Eggs ready to hatch: {count}',
+    'notify_plants_ready': '🌾 Plants ready to harvest: {count}',
+    
     # Error messages
     'error_general': '❌ An error occurred. Please try again later.',
     'error_not_found': '❌ Not found',
@@ -41,6 +41,7 @@ MESSAGES = {
     'dragon_level_up': '🎉 **Новый уровень!**\n\n{emoji} **{name}** достиг уровня {level}!\n\n**Новые характеристики:**\n💪 Сила: {strength}\n⚡ Ловкость: {agility}\n🧠 Интеллект: {intelligence}\n\n❤️ Сытость: {hunger}%\n😊 Счастье: {happiness}%',
     'dragon_feed_cooldown': '⏰ Вы можете покормить этого дракона через {hours:.1f} часов!',
     'dragon_not_found': '❌ Дракон не найден!',
+    'dragons_limit_reached': '🐉 У вас {count}/{max} драконов - это лимит вашего VIP уровня. Повысьте VIP, чтобы вывести больше!',
     'dragon_feed_button': '🍖 Покормить',
     'dragon_view_stats': '📊 Характеристики',
     
@@ -68,14 +69,7 @@ MESSAGES = {
     'daily_egg_claimed': '✅ Вы получили {emoji} **{type}** яйцо!\n\nВремя вылупления: {hours} часов\n\nХорошей удачи!',
     
     # Shop - Eggs
-    'shop_eggs_title': '🥚 **Магазин Яиц**\n\nВыберите яйцо для покупки:\n\n',
-    'shop_eggs_regular': '🥚 **Обычное Яйцо**\n💰 {gold} Золота\n⏰ Вылупление: 48 часов\n📊 Шанс редкого: 30%',
-    'shop_eggs_rare': '🔵 **Редкое Яйцо**\n💰 {gold} Золота\n⏰ Вылупление: 72 часа\n📊 Шанс эпического: 20%',
-    'shop_eggs_premium': '💎 **Премиум Яйцо**\n💎 {crystals} Кристаллов\n⏰ Вылупление: 96 часов\n📊 Шанс легендарного: 18%',
-    'shop_eggs_legendary': '🌟 **Легендарное Яйцо**\n💎 {crystals} Кристаллов\n⏰ Вылупление: 7 дней\n📊 Шанс мифического: 5%',
-    'shop_not_enough_gold': '❌ Недостаточно золота!',
     'shop_not_enough_crystals': '❌ Недостаточно кристаллов!',
-    'shop_purchase_success': '✅ Вы купили {emoji} **{type}** яйцо!\n\nПроверьте вкладку "Яйца".',
     'shop_buy_button': '🛒 Купить',
     
     # Garden
@@ -187,6 +181,11 @@ MESSAGES = {
     'shop_battlepass_category': '🎖️ Боевой пропуск',
     'shop_crypto_category': '🪙 Криптовалюта',
     
+    # Notifications
+    'notify_ready_title': '🔔 **Хорошие новости!**\n\n',
+    'notify_eggs_ready': '🥚 Яиц готово к вылуплению: {count}',
+    'notify_plants_ready': '🌾 Растений готово к сбору: {count}',
+    
     # Error messages
     'error_general': '❌ Произошла ошибка. Пожалуйста, попробуйте позже.',
     'error_not_found': '❌ Не найдено',
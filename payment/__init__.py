@@ -1 +1 @@
-from .cryptobot_api import CryptoBotAPI
+from .cryptobot_api import CryptoBotAPI, get_http_client, close_http_client
@@ -1,12 +1,15 @@
 from telegram import Update
-from telegram.ext import ContextTypes, CallbackQueryHandler, MessageHandler, filters
-from database import get_session
+from telegram.error import TelegramError
+from telegram.ext import ContextTypes
+from database import get_async_session
 from database.models import CryptoTransaction, User
-from services import UserService
+from services import AsyncUserService, AsyncCryptoService
 from payment import CryptoBotAPI
 from localization import t
+from core import get_router, outbound_lane, PAYMENT
 import logging
 import uuid
+import config
 
 logger = logging.getLogger(__name__)
 
@@ -15,10 +18,7 @@ async def show_crypto_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
     
-    user_id = update.effective_user.id
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
-        lang = user.language
+    lang = (await AsyncUserService.get_snapshot(update.effective_user)).language
     
     text = t(lang, 'crypto_title')
     
@@ -42,9 +42,8 @@ async def handle_crypto_selection(update: Update, context: ContextTypes.DEFAULT_
     """Handle cryptocurrency selection"""
     message_text = update.message.text
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
-        lang = user.language
+    user = await AsyncUserService.get_snapshot(update.effective_user)
+    lang = user.language
     
     # Map text to currency
     currency_map = {
@@ -86,13 +85,13 @@ async def handle_crypto_selection(update: Update, context: ContextTypes.DEFAULT_
     # Save transaction
     tx = CryptoTransaction(
         user_id=user.id,
-        invoice_id=result['invoice_id'],
+        invoice_id=str(result['invoice_id']),
         currency=currency,
         amount=amounts[currency],
         status='pending'
     )
     
-    with get_session() as session:
+    async with get_async_session() as session:
         session.add(tx)
     
     # Send payment link
@@ -131,70 +130,79 @@ async def check_crypto_payment(update: Update, context: ContextTypes.DEFAULT_TYP
     
     invoice_id = parts[-1].strip()
     
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
+    async with get_async_session() as session:
+        user = await AsyncUserService.get_or_create_user(session, update.effective_user)
         lang = user.language
         
         # Get transaction
-        tx = session.query(CryptoTransaction).filter_by(invoice_id=invoice_id).first()
-        if not tx:
-            await update.message.reply_text(t(lang, 'error_not_found'))
-            return
-        
-        if tx.status == 'completed':
-            await update.message.reply_text(
-                t(lang, 'crypto_completed', crystals=100),
-                parse_mode='Markdown'
-            )
-            return
-        
-        # Check with CryptoBot
-        cryptobot = CryptoBotAPI()
-        result = await cryptobot.get_invoice(invoice_id)
-        
-        if not result['success']:
-            await update.message.reply_text(t(lang, 'error_general'))
-            return
-        
-        status = result['status']
-        
-        if status == 'completed':
-            # Payment successful
-            from services import UserService
-            tx.status = 'completed'
-            tx.completed_at = __import__('datetime').datetime.utcnow()
-            
-            # Give crystals (simplified: 100 crystals per transaction)
-            UserService.add_crystals(session, user, 100)
-            
-            await update.message.reply_text(
-                t(lang, 'crypto_completed', crystals=100),
+        tx = await AsyncCryptoService.get_transaction(session, invoice_id, user.id)
+    
+    if not tx:
+        await update.message.reply_text(t(lang, 'error_not_found'))
+        return
+    
+    if tx.status == 'completed':
+        await update.message.reply_text(
+            t(lang, 'crypto_completed', crystals=config.CRYPTO_PAYMENT_CRYSTALS),
+            parse_mode='Markdown'
+        )
+        return
+    
+    if tx.status == 'failed':
+        await update.message.reply_text(t(lang, 'crypto_failed'))
+        return
+    
+    if webhook_receiver_active():
+        # The invoice_paid webhook credits and notifies - no API call on the update path
+        await update.message.reply_text(t(lang, 'crypto_pending'))
+        return
+    
+    # No webhook receiver: ask CryptoBot directly (outside the transaction)
+    cryptobot = CryptoBotAPI()
+    result = await cryptobot.get_invoice(invoice_id)
+    
+    if not result['success']:
+        await update.message.reply_text(t(lang, 'error_general'))
+        return
+    
+    status = result['status']
+    
+    if status == 'completed':
+        async with get_async_session() as session:
+            await AsyncCryptoService.complete_transaction(session, invoice_id)
+        await update.message.reply_text(
+            t(lang, 'crypto_completed', crystals=config.CRYPTO_PAYMENT_CRYSTALS),
+            parse_mode='Markdown'
+        )
+    
+    elif status == 'failed':
+        async with get_async_session() as session:
+            await AsyncCryptoService.fail_transaction(session, invoice_id)
+        await update.message.reply_text(t(lang, 'crypto_failed'))
+    
+    else:
+        await update.message.reply_text(t(lang, 'crypto_pending'))
+
+def webhook_receiver_active() -> bool:
+    """invoice_paid webhooks are received only by the embedded web server"""
+    return config.CRYPTOBOT_WEBHOOK_ENABLED and config.BOT_MODE == 'webhook'
+
+async def notify_crypto_payment(bot, telegram_id: int, lang: str, crystals: int):
+    """Tell the player their invoice was paid (runs outside the webhook request)"""
+    try:
+        with outbound_lane(PAYMENT):
+            await bot.send_message(
+                chat_id=telegram_id,
+                text=t(lang, 'crypto_completed', crystals=crystals),
                 parse_mode='Markdown'
             )
-        
-        elif status == 'failed':
-            tx.status = 'failed'
-            await update.message.reply_text(t(lang, 'crypto_failed'))
-        
-        else:
-            await update.message.reply_text(t(lang, 'crypto_pending'))
+    except TelegramError as e:
+        logger.warning(f"Failed to notify user {telegram_id} about crypto payment: {e}")
 
 def register_crypto_handlers(application):
     """Register crypto payment handlers"""
-    # Register crypto payment handlers
-    from telegram.ext import MessageHandler, filters
-    application.add_handler(MessageHandler(
-        filters.TEXT & (
-            filters.Regex('₿') | 
-            filters.Regex('⟠') | 
-            filters.Regex('USDT') | 
-            filters.Regex('TON')
-        ),
-        handle_crypto_selection
-    ))
-    
-    # Register check payment handler
-    application.add_handler(MessageHandler(
-        filters.TEXT & filters.Regex('🔍'),
-        check_crypto_payment
-    ))
+    router = get_router(application)
+    router.add_button(handle_crypto_selection, 'crypto_btc', 'crypto_eth', 'crypto_usdt', 'crypto_ton')
+    
+    # Check buttons carry the invoice id: "🔍 Check Payment:<invoice_id>"
+    router.add_text_prefix(check_crypto_payment, "🔍")
@@ -1,13 +1,85 @@
+import asyncio
+import random
 import httpx
 import hashlib
 import hmac
 import config
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Per-endpoint timeouts: invoice creation waits on the payment backend,
+# reads of static data should fail fast
+ENDPOINT_TIMEOUTS = {
+    'createInvoice': httpx.Timeout(15.0, connect=5.0),
+    'getInvoice': httpx.Timeout(10.0, connect=5.0),
+    'getInvoices': httpx.Timeout(15.0, connect=5.0),
+    'getCurrencies': httpx.Timeout(5.0, connect=3.0),
+    'getBalance': httpx.Timeout(5.0, connect=3.0),
+}
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+# Responses worth another try for idempotent calls
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# CryptoBot invoice statuses -> CryptoTransaction statuses
+INVOICE_STATUS_MAP = {
+    'active': 'pending',
+    'paid': 'completed',
+    'expired': 'failed',
+    'failed': 'failed'
+}
+
+# Upper bound of invoice_ids per getInvoices request
+MAX_INVOICES_PER_REQUEST = 1000
+
+_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    """The process-wide CryptoBot client (keep-alive pool, HTTP/2 when available)"""
+    global _client
+    if _client is None or _client.is_closed:
+        http2 = config.CRYPTOBOT_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("h2 is not installed, CryptoBot client falls back to HTTP/1.1")
+                http2 = False
+        
+        _client = httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=config.CRYPTOBOT_MAX_CONNECTIONS,
+                max_keepalive_connections=config.CRYPTOBOT_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=config.CRYPTOBOT_KEEPALIVE_EXPIRY
+            ),
+            timeout=DEFAULT_TIMEOUT
+        )
+    return _client
+
+async def close_http_client():
+    """Close pooled connections (called on application shutdown)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter: uniform(0, min(max, base * 2^attempt))"""
+    return random.uniform(0, min(config.CRYPTOBOT_BACKOFF_MAX, config.CRYPTOBOT_BACKOFF_BASE * 2 ** attempt))
+
+def _normalize_invoice(invoice: Dict) -> Dict:
+    return {
+        'invoice_id': str(invoice['invoice_id']),
+        'status': INVOICE_STATUS_MAP.get(invoice['status'], invoice['status']),
+        'amount': float(invoice['amount']),
+        'currency': invoice['asset'],
+        'pay_url': invoice.get('pay_url')
+    }
+
 class CryptoBotAPI:
     """Wrapper for CryptoBot API"""
     
@@ -15,6 +87,53 @@ class CryptoBotAPI:
         self.api_token = api_token or config.CRYPTOBOT_API_TOKEN
         self.base_url = config.CRYPTOBOT_API_URL
     
+    def verify_webhook_signature(self, body: bytes, signature: str) -> bool:
+        """Check crypto-pay-api-signature: HMAC-SHA256 of the raw body keyed with SHA256(api token)"""
+        if not self.api_token or not signature:
+            return False
+        secret = hashlib.sha256(self.api_token.encode()).digest()
+        expected = hmac.new(secret, body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature)
+    
+    async def _request(self, method: str, endpoint: str, idempotent: bool, **kwargs) -> Dict:
+        """
+        Call an API endpoint and return the decoded JSON body.
+        
+        Idempotent calls are retried on transport errors and 429/5xx responses.
+        Non-idempotent calls are only retried when the connection could not be
+        established, i.e. the request never reached CryptoBot.
+        """
+        client = get_http_client()
+        attempts = config.CRYPTOBOT_MAX_RETRIES + 1
+        
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            try:
+                response = await client.request(
+                    method,
+                    f"{self.base_url}/{endpoint}",
+                    headers={"Crypto-Pay-API-Token": self.api_token},
+                    timeout=ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT),
+                    **kwargs
+                )
+                if idempotent and response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                    raise httpx.HTTPStatusError(
+                        f"Retryable status {response.status_code}", request=response.request, response=response
+                    )
+                response.raise_for_status()
+                return response.json()
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                never_sent = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+                retryable = never_sent or (idempotent and (
+                    isinstance(e, httpx.TransportError) or e.response.status_code in RETRY_STATUS_CODES
+                ))
+                if not retryable or last_attempt:
+                    raise
+                
+                delay = backoff_delay(attempt)
+                logger.warning(f"CryptoBot {endpoint} failed ({e!r}), retry {attempt + 1} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+    
     async def create_invoice(
         self,
         amount: float,
@@ -24,36 +143,29 @@ class CryptoBotAPI:
     ) -> Dict:
         """Create a payment invoice"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    f"{self.base_url}/createInvoice",
-                    headers={
-                        "Crypto-Pay-API-Token": self.api_token
-                    },
-                    json={
-                        "asset": currency,
-                        "amount": str(amount),
-                        "description": description,
-                        "payload": payload or ""
-                    },
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                if data.get('ok'):
-                    return {
-                        'success': True,
-                        'invoice_id': data['result']['invoice_id'],
-                        'pay_url': data['result']['pay_url'],
-                        'amount': data['result']['amount'],
-                        'currency': data['result']['asset']
-                    }
-                else:
-                    return {
-                        'success': False,
-                        'error': data.get('error', 'Unknown error')
-                    }
+            data = await self._request(
+                'POST', 'createInvoice', idempotent=False,
+                json={
+                    "asset": currency,
+                    "amount": str(amount),
+                    "description": description,
+                    "payload": payload or ""
+                }
+            )
+            
+            if data.get('ok'):
+                return {
+                    'success': True,
+                    'invoice_id': data['result']['invoice_id'],
+                    'pay_url': data['result']['pay_url'],
+                    'amount': data['result']['amount'],
+                    'currency': data['result']['asset']
+                }
+            else:
+                return {
+                    'success': False,
+                    'error': data.get('error', 'Unknown error')
+                }
         except Exception as e:
             logger.error(f"Error creating CryptoBot invoice: {e}")
             return {'success': False, 'error': str(e)}
@@ -61,69 +173,66 @@ class CryptoBotAPI:
     async def get_invoice(self, invoice_id: str) -> Dict:
         """Get invoice status"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/getInvoice",
-                    headers={
-                        "Crypto-Pay-API-Token": self.api_token
-                    },
-                    params={
-                        "invoice_id": invoice_id
-                    },
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                if data.get('ok'):
-                    invoice = data['result']
-                    status_map = {
-                        'active': 'pending',
-                        'paid': 'completed',
-                        'expired': 'failed',
-                        'failed': 'failed'
-                    }
-                    return {
-                        'success': True,
-                        'invoice_id': invoice['invoice_id'],
-                        'status': status_map.get(invoice['status'], invoice['status']),
-                        'amount': float(invoice['amount']),
-                        'currency': invoice['asset'],
-                        'pay_url': invoice.get('pay_url')
-                    }
-                else:
-                    return {
-                        'success': False,
-                        'error': data.get('error', 'Unknown error')
-                    }
+            data = await self._request(
+                'GET', 'getInvoice', idempotent=True,
+                params={
+                    "invoice_id": invoice_id
+                }
+            )
+            
+            if data.get('ok'):
+                return {'success': True, **_normalize_invoice(data['result'])}
+            else:
+                return {
+                    'success': False,
+                    'error': data.get('error', 'Unknown error')
+                }
         except Exception as e:
             logger.error(f"Error getting CryptoBot invoice: {e}")
             return {'success': False, 'error': str(e)}
     
+    async def get_invoices(self, invoice_ids: List[str]) -> Dict:
+        """Get the status of many invoices in one request (up to MAX_INVOICES_PER_REQUEST)"""
+        if len(invoice_ids) > MAX_INVOICES_PER_REQUEST:
+            raise ValueError(f"At most {MAX_INVOICES_PER_REQUEST} invoice ids per request")
+        try:
+            data = await self._request(
+                'GET', 'getInvoices', idempotent=True,
+                params={
+                    "invoice_ids": ",".join(str(invoice_id) for invoice_id in invoice_ids),
+                    "count": len(invoice_ids)
+                }
+            )
+            
+            if data.get('ok'):
+                return {
+                    'success': True,
+                    'invoices': [_normalize_invoice(invoice) for invoice in data['result'].get('items', [])]
+                }
+            else:
+                return {
+                    'success': False,
+                    'error': data.get('error', 'Unknown error')
+                }
+        except Exception as e:
+            logger.error(f"Error getting CryptoBot invoices: {e}")
+            return {'success': False, 'error': str(e)}
+    
     async def get_currencies(self) -> Dict:
         """Get available currencies"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/getCurrencies",
-                    headers={
-                        "Crypto-Pay-API-Token": self.api_token
-                    },
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                if data.get('ok'):
-                    return {
-                        'success': True,
-                        'currencies': data['result']
-                    }
-                else:
-                    return {
-                        'success': False,
-                        'error': data.get('error', 'Unknown error')
-                    }
+            data = await self._request('GET', 'getCurrencies', idempotent=True)
+            
+            if data.get('ok'):
+                return {
+                    'success': True,
+                    'currencies': data['result']
+                }
+            else:
+                return {
+                    'success': False,
+                    'error': data.get('error', 'Unknown error')
+                }
         except Exception as e:
             logger.error(f"Error getting CryptoBot currencies: {e}")
             return {'success': False, 'error': str(e)}
@@ -131,27 +240,18 @@ class CryptoBotAPI:
     async def get_balance(self) -> Dict:
         """Get wallet balance"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(
-                    f"{self.base_url}/getBalance",
-                    headers={
-                        "Crypto-Pay-API-Token": self.api_token
-                    },
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                data = response.json()
-                
-                if data.get('ok'):
-                    return {
-                        'success': True,
-                        'balance': data['result']
-                    }
-                else:
-                    return {
-                        'success': False,
-                        'error': data.get('error', 'Unknown error')
-                    }
+            data = await self._request('GET', 'getBalance', idempotent=True)
+            
+            if data.get('ok'):
+                return {
+                    'success': True,
+                    'balance': data['result']
+                }
+            else:
+                return {
+                    'success': False,
+                    'error': data.get('error', 'Unknown error')
+                }
         except Exception as e:
             logger.error(f"Error getting CryptoBot balance: {e}")
             return {'success': False, 'error': str(e)}
@@ -1,26 +1,32 @@
 from telegram import Update, LabeledPrice
 from telegram.ext import ContextTypes, PreCheckoutQueryHandler, MessageHandler, filters, CallbackQueryHandler
-from database import get_session
+from database import get_async_session
 from database.models import Purchase, User
-from services import UserService
+from sqlalchemy import select
+from services import AsyncUserService
 from localization import t
+from core import priority_lane, PAYMENT
 import logging
 
 logger = logging.getLogger(__name__)
 
+@priority_lane(PAYMENT)
 async def pre_checkout_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle pre-checkout query to validate purchase"""
     query = update.pre_checkout_query
     await query.answer(ok=True)
 
+@priority_lane(PAYMENT)
 async def successful_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle successful payment"""
     payment = update.message.successful_payment
     user_id = update.effective_user.id
+    lang = None
     
     try:
-        with get_session() as session:
-            user = UserService.get_or_create_user(session, update.effective_user)
+        async with get_async_session() as session:
+            user = await AsyncUserService.get_or_create_user(session, update.effective_user)
+            lang = user.language
             
             # Parse invoice payload: "item_type:amount:details"
             payload = payment.invoice_payload
@@ -29,8 +35,8 @@ async def successful_payment(update: Update, context: ContextTypes.DEFAULT_TYPE)
             
             if item_type == 'crystals':
                 amount = int(parts[1])
-                UserService.add_crystals(session, user, amount)
-                message = t(user.language, 'pay_success', crystals=amount)
+                await AsyncUserService.add_crystals(session, user, amount)
+                message = t(lang, 'pay_success', crystals=amount)
             
             elif item_type == 'vip':
                 vip_level = int(parts[1])
@@ -49,7 +55,7 @@ async def successful_payment(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 from datetime import datetime, timedelta
                 from database.models import Battlepass
                 # Activate battlepass
-                bp = session.query(Battlepass).filter_by(user_id=user.id).first()
+                bp = await session.scalar(select(Battlepass).filter_by(user_id=user.id))
                 if not bp:
                     bp = Battlepass(
                         user_id=user.id,
@@ -82,22 +88,21 @@ async def successful_payment(update: Update, context: ContextTypes.DEFAULT_TYPE)
                 telegram_payment_charge_id=payment.telegram_payment_charge_id
             )
             session.add(purchase)
-            
-            await update.message.reply_text(message)
-            
+    
     except Exception as e:
         logger.error(f"Error processing payment: {e}")
-        await update.message.reply_text(t(user.language, 'pay_failed'))
+        await update.message.reply_text(t(lang, 'pay_failed'))
+        return
+    
+    # Only once the purchase has committed
+    await update.message.reply_text(message)
 
 async def show_payment_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show payment options"""
     query = update.callback_query
     await query.answer()
     
-    user_id = update.effective_user.id
-    with get_session() as session:
-        user = UserService.get_or_create_user(session, update.effective_user)
-        lang = user.language
+    lang = (await AsyncUserService.get_snapshot(update.effective_user)).language
     
     text = t(lang, 'pay_title')
     
@@ -112,6 +117,7 @@ async def show_payment_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     await query.edit_message_text(text=text, reply_markup=reply_markup)
 
+@priority_lane(PAYMENT)
 async def send_stars_invoice(update: Update, context: ContextTypes.DEFAULT_TYPE, item_type: str, amount: int, price_stars: int):
     """Send a Stars payment invoice"""
     user_id = update.effective_user.id
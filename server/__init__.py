@@ -0,0 +1,3 @@
+from .app import create_web_app
+
+__all__ = ['create_web_app']
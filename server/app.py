@@ -0,0 +1,82 @@
+import hmac
+import json
+import logging
+from aiohttp import web
+from sqlalchemy import text
+from telegram import Update
+from telegram.ext import Application
+from database.db import get_async_engine
+import config
+
+logger = logging.getLogger(__name__)
+
+BOT_APPLICATION = web.AppKey('bot_application', Application)
+
+def create_web_app(application: Application) -> web.Application:
+    """Build the aiohttp app serving the Telegram (and CryptoBot) webhooks and health probes"""
+    app = web.Application()
+    app[BOT_APPLICATION] = application
+    app.router.add_post(config.WEBHOOK_PATH, telegram_webhook)
+    app.router.add_get('/healthz', health)
+    app.router.add_get('/readyz', readiness)
+    app.router.add_get('/metrics', metrics)
+    if config.CRYPTOBOT_WEBHOOK_ENABLED:
+        from .cryptobot_webhook import cryptobot_webhook
+        app.router.add_post(config.CRYPTOBOT_WEBHOOK_PATH, cryptobot_webhook)
+    return app
+
+async def telegram_webhook(request: web.Request) -> web.Response:
+    """Accept an update from Telegram and queue it for the application"""
+    secret = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+    if not hmac.compare_digest(secret, config.WEBHOOK_SECRET_TOKEN or ''):
+        logger.warning("Rejected webhook request with invalid secret token")
+        return web.Response(status=403)
+    
+    try:
+        data = await request.json()
+    except json.JSONDecodeError:
+        return web.Response(status=400)
+    
+    application = request.app[BOT_APPLICATION]
+    try:
+        update = Update.de_json(data, application.bot) if isinstance(data, dict) else None
+    except Exception as e:
+        logger.warning(f"Rejected malformed webhook update: {e}")
+        update = None
+    if update is None:
+        # Not an update object; 400 rather than 500 so Telegram doesn't redeliver it
+        return web.Response(status=400)
+    
+    await application.update_queue.put(update)
+    
+    # Answer right away - the update is processed asynchronously
+    return web.Response()
+
+async def health(request: web.Request) -> web.Response:
+    """Liveness: the process is up and serving HTTP"""
+    return web.json_response({'status': 'ok'})
+
+async def readiness(request: web.Request) -> web.Response:
+    """Readiness: the application is running and the database answers"""
+    application = request.app[BOT_APPLICATION]
+    checks = {'application': application.running}
+    
+    try:
+        async with get_async_engine().connect() as connection:
+            await connection.execute(text('SELECT 1'))
+        checks['database'] = True
+    except Exception as e:
+        logger.error(f"Readiness database check failed: {e}")
+        checks['database'] = False
+    
+    status = 200 if all(checks.values()) else 503
+    return web.json_response({'ready': status == 200, 'checks': checks}, status=status)
+
+async def metrics(request: web.Request) -> web.Response:
+    """Update-processing and outbound queue counters (queue depth, wait times) as JSON"""
+    application = request.app[BOT_APPLICATION]
+    processor = application.update_processor
+    data = processor.stats() if hasattr(processor, 'stats') else {}
+    limiter = application.bot.rate_limiter
+    outbound = limiter.stats() if hasattr(limiter, 'stats') else {}
+    return web.json_response({'update_processor': data, 'outbound': outbound})
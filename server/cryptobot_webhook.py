@@ -0,0 +1,51 @@
+import json
+import logging
+from aiohttp import web
+from database import get_async_session
+from database.models import User
+from payment import CryptoBotAPI
+from payment.crypto_handler import notify_crypto_payment
+from services import AsyncCryptoService
+from .app import BOT_APPLICATION
+import config
+
+logger = logging.getLogger(__name__)
+
+async def cryptobot_webhook(request: web.Request) -> web.Response:
+    """
+    Receive CryptoBot updates. invoice_paid credits the matching transaction
+    once (retries and duplicates are no-ops) and notifies the player in the
+    background, so CryptoBot gets its 200 without waiting on Telegram.
+    """
+    body = await request.read()
+    signature = request.headers.get('crypto-pay-api-signature', '')
+    if not CryptoBotAPI().verify_webhook_signature(body, signature):
+        logger.warning("Rejected CryptoBot webhook with invalid signature")
+        return web.Response(status=401)
+    
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return web.Response(status=400)
+    if not isinstance(data, dict):
+        return web.Response(status=400)
+    
+    if data.get('update_type') != 'invoice_paid':
+        return web.json_response({'ok': True})
+    
+    invoice_id = str((data.get('payload') or {}).get('invoice_id', ''))
+    async with get_async_session() as session:
+        tx, credited = await AsyncCryptoService.complete_transaction(session, invoice_id)
+        user = await session.get(User, tx.user_id) if credited else None
+    
+    if tx is None:
+        logger.warning(f"CryptoBot webhook for unknown invoice {invoice_id}")
+    elif credited:
+        # Committed above; the message goes out without holding up the response
+        application = request.app[BOT_APPLICATION]
+        application.create_task(notify_crypto_payment(
+            application.bot, user.telegram_id, user.language, config.CRYPTO_PAYMENT_CRYSTALS
+        ))
+        logger.info(f"Invoice {invoice_id} paid, credited user {user.telegram_id}")
+    
+    return web.json_response({'ok': True})
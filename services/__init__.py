@@ -4,5 +4,20 @@ from .egg_service import EggService
 from .garden_service import GardenService
 from .vip_service import VIPService
 from .battlepass_service import BattlepassService
+from .crypto_service import CryptoService
+from .async_services import (
+    AsyncUserService,
+    AsyncDragonService,
+    AsyncEggService,
+    AsyncGardenService,
+    AsyncVIPService,
+    AsyncBattlepassService,
+    AsyncCryptoService
+)
 
-__all__ = ['UserService', 'DragonService', 'EggService', 'GardenService', 'VIPService', 'BattlepassService']
+__all__ = [
+    'UserService', 'DragonService', 'EggService', 'GardenService', 'VIPService', 'BattlepassService',
+    'CryptoService',
+    'AsyncUserService', 'AsyncDragonService', 'AsyncEggService', 'AsyncGardenService',
+    'AsyncVIPService', 'AsyncBattlepassService', 'AsyncCryptoService'
+]
@@ -0,0 +1,70 @@
+"""
+Async variants of the game services.
+
+Every service method that takes a ``session`` as its first argument is
+exposed here as a coroutine that accepts an ``AsyncSession`` instead.
+The call runs the original synchronous method through
+``AsyncSession.run_sync``, so the business logic lives in exactly one
+place and the event loop is free while the database round trips happen.
+
+Methods that don't touch the session (e.g. ``VIPService.get_vip_level``)
+are passed through unchanged, except those that open their own session
+(``UserService.get_snapshot``), which get a hand-written async version.
+Relationship attributes must be loaded
+inside the awaited call - lazy loading outside of it is not supported by
+the async engine.
+"""
+
+import functools
+import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_session
+from .user_service import UserService, UserSnapshot, user_snapshot_cache
+from .dragon_service import DragonService
+from .egg_service import EggService
+from .garden_service import GardenService
+from .vip_service import VIPService
+from .battlepass_service import BattlepassService
+from .crypto_service import CryptoService
+
+def _to_async(func):
+    @functools.wraps(func)
+    async def wrapper(session: AsyncSession, *args, **kwargs):
+        return await session.run_sync(func, *args, **kwargs)
+    return wrapper
+
+def make_async_service(service_cls, **overrides):
+    """Build an Async<Service> class mirroring service_cls's static methods"""
+    namespace = {'__doc__': f"Async variant of {service_cls.__name__}"}
+    
+    for name, member in vars(service_cls).items():
+        if not isinstance(member, staticmethod):
+            continue
+        
+        if name in overrides:
+            namespace[name] = staticmethod(overrides[name])
+            continue
+        
+        params = list(inspect.signature(member.__func__).parameters)
+        if params and params[0] == 'session':
+            namespace[name] = staticmethod(_to_async(member.__func__))
+        else:
+            namespace[name] = member
+    
+    return type(f"Async{service_cls.__name__}", (), namespace)
+
+async def _get_snapshot(telegram_user) -> UserSnapshot:
+    snapshot = user_snapshot_cache.get(telegram_user.id)
+    if snapshot is None:
+        async with get_async_session() as session:
+            user = await AsyncUserService.get_or_create_user(session, telegram_user)
+        snapshot = user_snapshot_cache.get(user.telegram_id) or UserService.build_snapshot(user)
+    return snapshot
+
+AsyncUserService = make_async_service(UserService, get_snapshot=_get_snapshot)
+AsyncDragonService = make_async_service(DragonService)
+AsyncEggService = make_async_service(EggService)
+AsyncGardenService = make_async_service(GardenService)
+AsyncVIPService = make_async_service(VIPService)
+AsyncBattlepassService = make_async_service(BattlepassService)
+AsyncCryptoService = make_async_service(CryptoService)
@@ -18,19 +18,13 @@ class BattlepassService:
                 rewards_claimed={}
             )
             session.add(bp)
-            session.flush()
         
         return bp
     
     @staticmethod
-    def is_battlepass_active(user: User) -> bool:
+    def is_battlepass_active(bp: Battlepass) -> bool:
         """Check if battlepass is currently active"""
-        if not hasattr(user, 'battlepass') or not user.battlepass:
-            return False
-        
-        bp = user.battlepass
-        
-        if not bp.is_active:
+        if not bp or not bp.is_active:
             return False
         
         if bp.expiration_date and bp.expiration_date < datetime.utcnow():
@@ -53,7 +47,6 @@ class BattlepassService:
         bp.current_progress = 0
         bp.rewards_claimed = {}
         
-        session.flush()
         return bp
     
     @staticmethod
@@ -61,7 +54,7 @@ class BattlepassService:
         """Record daily login and increase progress"""
         bp = BattlepassService.get_or_create_battlepass(session, user)
         
-        if not BattlepassService.is_battlepass_active(user):
+        if not BattlepassService.is_battlepass_active(bp):
             return False
         
         # Check if already logged in today
@@ -100,7 +93,7 @@ class BattlepassService:
         
         # Apply rewards
         from services import UserService
-        user = bp.user
+        user = session.get(User, bp.user_id)
         
         if 'gold' in rewards:
             UserService.add_gold(session, user, rewards['gold'])
@@ -0,0 +1,92 @@
+from datetime import datetime
+from database.models import CryptoTransaction, User
+from sqlalchemy import and_, or_, update
+from sqlalchemy.orm import Session
+from .user_service import UserService
+import config
+
+class CryptoService:
+    @staticmethod
+    def get_transaction(session: Session, invoice_id: str, user_id: int = None):
+        query = session.query(CryptoTransaction).filter_by(invoice_id=str(invoice_id))
+        if user_id is not None:
+            query = query.filter_by(user_id=user_id)
+        return query.first()
+    
+    @staticmethod
+    def complete_transaction(session: Session, invoice_id: str, crystals: int = None):
+        """
+        Mark an invoice paid and credit the crystals exactly once. The status
+        flip is a conditional UPDATE, so concurrent or repeated confirmations
+        (webhook retries, the check button) cannot credit twice.
+        Returns (transaction or None, credited).
+        """
+        now = datetime.utcnow()
+        result = session.execute(
+            update(CryptoTransaction)
+            .where(CryptoTransaction.invoice_id == str(invoice_id), CryptoTransaction.status != 'completed')
+            .values(status='completed', completed_at=now, confirmed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        tx = (
+            session.query(CryptoTransaction)
+            .filter_by(invoice_id=str(invoice_id))
+            .populate_existing()
+            .first()
+        )
+        if tx is None or not result.rowcount:
+            return tx, False
+        
+        user = session.get(User, tx.user_id)
+        UserService.add_crystals(session, user, crystals or config.CRYPTO_PAYMENT_CRYSTALS)
+        return tx, True
+    
+    @staticmethod
+    def fail_transaction(session: Session, invoice_id: str):
+        """Mark a still-pending invoice failed. Returns True if it was pending."""
+        result = session.execute(
+            update(CryptoTransaction)
+            .where(CryptoTransaction.invoice_id == str(invoice_id), CryptoTransaction.status == 'pending')
+            .values(status='failed')
+            .execution_options(synchronize_session=False)
+        )
+        return bool(result.rowcount)
+    
+    @staticmethod
+    def get_pending_page(session: Session, limit: int, after: tuple = None):
+        """
+        Next page of pending invoices ordered by (created_at, id), starting
+        after the (created_at, id) key of the previous page.
+        Returns (id, invoice_id, created_at) rows.
+        """
+        query = (
+            session.query(CryptoTransaction.id, CryptoTransaction.invoice_id, CryptoTransaction.created_at)
+            .filter(CryptoTransaction.status == 'pending')
+        )
+        if after is not None:
+            created_at, last_id = after
+            query = query.filter(or_(
+                CryptoTransaction.created_at > created_at,
+                and_(CryptoTransaction.created_at == created_at, CryptoTransaction.id > last_id)
+            ))
+        return query.order_by(CryptoTransaction.created_at, CryptoTransaction.id).limit(limit).all()
+    
+    @staticmethod
+    def reconcile_batch(session: Session, pending, remote_statuses: dict, expire_before: datetime):
+        """
+        Apply CryptoBot statuses to a page of pending invoices: paid ones are
+        completed, failed/expired ones and those still open past expire_before
+        are failed. Returns {'credited': [(telegram_id, language)], 'expired': n}.
+        """
+        credited, expired = [], 0
+        for row in pending:
+            status = remote_statuses.get(row.invoice_id)
+            if status == 'completed':
+                tx, was_credited = CryptoService.complete_transaction(session, row.invoice_id)
+                if was_credited:
+                    user = session.get(User, tx.user_id)
+                    credited.append((user.telegram_id, user.language))
+            elif status == 'failed' or row.created_at < expire_before:
+                if CryptoService.fail_transaction(session, row.invoice_id):
+                    expired += 1
+        return {'credited': credited, 'expired': expired}
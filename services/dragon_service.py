@@ -1,38 +1,71 @@
 from datetime import datetime, timedelta
 from database.models import Dragon, User
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from utils import clock
+from .user_service import UserService
 from utils.helpers import get_random_dragon
 from utils.constants import RARITIES
 
 class DragonService:
     @staticmethod
-    def create_dragon(session: Session, user: User, rarity: str, custom_name: str = None):
+    def dragon_values(user: User, rarity: str, custom_name: str = None) -> dict:
+        """Column values of a freshly hatched dragon of the given rarity"""
         dragon_data = get_random_dragon(rarity)
         base_stats = RARITIES[rarity]['base_stats']
         
-        dragon_name = custom_name if custom_name else dragon_data['name']
-        
-        dragon = Dragon(
-            user_id=user.id,
-            dragon_type=dragon_data['name'],
-            name=dragon_name,
-            rarity=rarity,
-            level=1,
-            experience=0,
-            hunger=100,
-            happiness=100,
-            strength=base_stats,
-            agility=base_stats,
-            intelligence=base_stats
-        )
+        return {
+            'user_id': user.id,
+            'dragon_type': dragon_data['name'],
+            'name': custom_name if custom_name else dragon_data['name'],
+            'rarity': rarity,
+            'level': 1,
+            'experience': 0,
+            'hunger_base': 100,
+            'happiness_base': 100,
+            'strength': base_stats,
+            'agility': base_stats,
+            'intelligence': base_stats
+        }
+    
+    @staticmethod
+    def create_dragon(session: Session, user: User, rarity: str, custom_name: str = None):
+        dragon = Dragon(**DragonService.dragon_values(user, rarity, custom_name))
         
         session.add(dragon)
-        session.flush()
+        UserService.increment(session, user, dragon_count=1)
         return dragon
     
     @staticmethod
-    def feed_dragon(session: Session, dragon: Dragon):
+    def create_dragons(session: Session, user: User, rarities: list):
+        """Create one dragon per rarity with a single multi-row INSERT"""
+        dragons = DragonService.insert_dragons(session, user, rarities)
+        UserService.increment(session, user, dragon_count=len(dragons))
+        return dragons
+    
+    @staticmethod
+    def insert_dragons(session: Session, user: User, rarities: list):
+        """create_dragons without touching user.dragon_count, for callers that update it themselves"""
+        if not rarities:
+            return []
+        
         now = datetime.utcnow()
+        rows = [dict(DragonService.dragon_values(user, rarity), hatched_at=now, baseline_at=now)
+                for rarity in rarities]
+        
+        if session.get_bind().dialect.insert_executemany_returning:
+            # INSERT INTO dragons (...) VALUES (...), (...), ... RETURNING *
+            return list(session.scalars(insert(Dragon).returning(Dragon), rows))
+        
+        # Dialects without multi-row RETURNING: let the unit of work batch the INSERT
+        dragons = [Dragon(**row) for row in rows]
+        session.add_all(dragons)
+        session.flush()
+        return dragons
+    
+    @staticmethod
+    def feed_dragon(session: Session, dragon: Dragon):
+        now = clock.now()
         
         if dragon.last_fed:
             time_since_fed = now - dragon.last_fed
@@ -40,8 +73,10 @@ class DragonService:
                 hours_remaining = 24 - (time_since_fed.total_seconds() / 3600)
                 return False, hours_remaining
         
-        dragon.hunger = min(100, dragon.hunger + 50)
-        dragon.happiness = min(100, dragon.happiness + 20)
+        # Re-anchor the decay: store the fed values as the new baseline
+        dragon.hunger_base = min(100, dragon.hunger + 50)
+        dragon.happiness_base = min(100, dragon.happiness + 20)
+        dragon.baseline_at = now
         dragon.experience += 10
         dragon.last_fed = now
         
@@ -50,10 +85,8 @@ class DragonService:
             dragon.strength += 5
             dragon.agility += 5
             dragon.intelligence += 5
-            session.flush()
             return True, "level_up"
         
-        session.flush()
         return True, "fed"
     
     @staticmethod
@@ -67,13 +100,4 @@ class DragonService:
     @staticmethod
     def rename_dragon(session: Session, dragon: Dragon, new_name: str):
         dragon.name = new_name
-        session.flush()
         return dragon
-    
-    @staticmethod
-    def decrease_dragon_hunger(session: Session):
-        dragons = session.query(Dragon).all()
-        for dragon in dragons:
-            dragon.hunger = max(0, dragon.hunger - 10)
-            dragon.happiness = max(0, dragon.happiness - 5)
-        session.flush()
@@ -1,27 +1,40 @@
 from datetime import datetime, timedelta
 from database.models import Egg, User
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
-from utils.helpers import calculate_hatching_time, determine_egg_rarity
+from utils.helpers import calculate_hatching_time
+from utils.rarity import roll_many
 from utils.constants import EGG_TYPES
+from .dragon_service import DragonService
+from .user_service import UserService
+from .vip_service import VIPService
 
 class EggService:
     @staticmethod
     def create_egg(session: Session, user: User, egg_type: str):
+        return EggService.create_eggs(session, user, egg_type, 1)[0]
+    
+    @staticmethod
+    def create_eggs(session: Session, user: User, egg_type: str, count: int):
+        """Create count eggs in one flush, rolling all rarities in a single batch"""
         hatching_hours = calculate_hatching_time(egg_type)
-        rarity = determine_egg_rarity(egg_type)
+        now = datetime.utcnow()
         
-        egg = Egg(
-            user_id=user.id,
-            egg_type=egg_type,
-            rarity=rarity,
-            hatching_time=hatching_hours,
-            started_hatching_at=datetime.utcnow(),
-            hatches_at=datetime.utcnow() + timedelta(hours=hatching_hours)
-        )
+        eggs = [
+            Egg(
+                user_id=user.id,
+                egg_type=egg_type,
+                rarity=rarity,
+                hatching_time=hatching_hours,
+                started_hatching_at=now,
+                hatches_at=now + timedelta(hours=hatching_hours)
+            )
+            for rarity in roll_many(egg_type, count)
+        ]
         
-        session.add(egg)
-        session.flush()
-        return egg
+        session.add_all(eggs)
+        UserService.increment(session, user, active_egg_count=len(eggs))
+        return eggs
     
     @staticmethod
     def get_user_eggs(session: Session, user: User, include_hatched: bool = False):
@@ -36,34 +49,82 @@ class EggService:
     
     @staticmethod
     def check_ready_eggs(session: Session, user: User):
-        now = datetime.utcnow()
-        eggs = session.query(Egg).filter_by(user_id=user.id, is_hatched=False).all()
-        ready_eggs = [egg for egg in eggs if egg.hatches_at <= now and not egg.is_ready]
-        
-        for egg in ready_eggs:
-            egg.is_ready = True
-        
-        session.flush()
-        return ready_eggs
+        return (
+            session.query(Egg)
+            .filter(Egg.user_id == user.id, Egg.is_hatched == False, Egg.is_ready)
+            .order_by(Egg.hatches_at)
+            .all()
+        )
     
     @staticmethod
     def hatch_egg(session: Session, egg: Egg):
-        if not egg.is_ready and egg.hatches_at > datetime.utcnow():
+        if egg.is_hatched or not egg.is_ready:
             return None
         
         egg.is_hatched = True
-        egg.is_ready = True
-        session.flush()
+        UserService.increment(session, session.get(User, egg.user_id), active_egg_count=-1)
         return egg
     
     @staticmethod
-    def can_purchase_egg(user: User, egg_type: str):
+    def hatch_all_ready(session: Session, user: User, egg_ids: list = None):
+        """
+        Hatch the user's ready eggs (only those in egg_ids, if given) in one
+        go: one indexed SELECT, one UPDATE of the user's counters, one
+        UPDATE of the eggs and one multi-row INSERT of dragons. Eggs hatch
+        oldest first, only as many as fit under the user's dragon limit
+        (VIPService.get_max_dragons); the counter UPDATE enforces the limit,
+        so concurrent hatches can't overshoot it.
+        Returns (dragons, number of ready eggs left unhatched); no dragons
+        with eggs left means the user is at the limit.
+        """
+        query = (
+            select(Egg.id, Egg.rarity)
+            .where(Egg.user_id == user.id, Egg.is_hatched == False, Egg.is_ready)
+            .order_by(Egg.hatches_at)
+        )
+        if egg_ids is not None:
+            query = query.where(Egg.id.in_(egg_ids))
+        ready = session.execute(query).all()
+        
+        limit = VIPService.get_max_dragons(user)
+        batch = ready[:max(0, limit - user.dragon_count)]
+        # user.dragon_count may be stale (another device, a job): if the capped UPDATE is refused, retry with fewer eggs
+        while batch and UserService.increment(session, user, within={'dragon_count': limit},
+                                              dragon_count=len(batch), active_egg_count=-len(batch)) is None:
+            dragon_count = session.execute(select(User.dragon_count).where(User.id == user.id)).scalar_one()
+            batch = batch[:max(0, limit - dragon_count)]
+        if not batch:
+            return [], len(ready)
+        
+        stmt = (
+            update(Egg)
+            .where(Egg.id.in_([egg_id for egg_id, _ in batch]), Egg.is_hatched == False)
+            .values(is_hatched=True)
+            .execution_options(synchronize_session=False)
+        )
+        if session.get_bind().dialect.update_returning:
+            # Only eggs this UPDATE flipped hatch, not ones a concurrent request got first
+            rarities = list(session.execute(stmt.returning(Egg.rarity)).scalars())
+        else:
+            session.execute(stmt)
+            rarities = [rarity for _, rarity in batch]
+        
+        taken = len(batch) - len(rarities)
+        if taken:
+            # Hand back the slots of eggs that hatched elsewhere (and were already uncounted there)
+            UserService.increment(session, user, dragon_count=-taken, active_egg_count=taken)
+        
+        dragons = DragonService.insert_dragons(session, user, [rarity or 'Common' for rarity in rarities])
+        return dragons, len(ready) - len(batch)
+    
+    @staticmethod
+    def can_purchase_egg(user: User, egg_type: str, count: int = 1):
         egg_data = EGG_TYPES.get(egg_type)
         if not egg_data:
             return False, "Invalid egg type"
         
-        cost_gold = egg_data['cost_gold']
-        cost_crystals = egg_data['cost_crystals']
+        cost_gold = egg_data['cost_gold'] * count
+        cost_crystals = egg_data['cost_crystals'] * count
         
         if cost_gold > 0 and user.gold < cost_gold:
             return False, f"Not enough gold! Need {cost_gold} gold."
@@ -1,7 +1,28 @@
+from collections import Counter
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from database.models import Plant, User, Garden
+from sqlalchemy import func, select, update
 from sqlalchemy.orm import Session
 from utils.constants import PLANTS
+from .user_service import UserService
+from .vip_service import VIPService
+
+@dataclass(frozen=True)
+class HarvestSummary:
+    """Outcome of GardenService.harvest_all, enough to render the result screen"""
+    counts: dict  # plant_type -> plants harvested
+    base_gold: int
+    bonus_gold: int
+    balance: int
+    
+    @property
+    def plants(self) -> int:
+        return sum(self.counts.values())
+    
+    @property
+    def total_gold(self) -> int:
+        return self.base_gold + self.bonus_gold
 
 class GardenService:
     @staticmethod
@@ -11,11 +32,9 @@ class GardenService:
             return None, "Invalid plant type"
         
         cost = plant_data['cost_gold']
-        if user.gold < cost:
+        if UserService.remove_gold(session, user, cost) is None:
             return None, f"Not enough gold! Need {cost} gold."
         
-        user.gold -= cost
-        
         growth_hours = plant_data['growth_hours']
         plant = Plant(
             user_id=user.id,
@@ -25,7 +44,7 @@ class GardenService:
         )
         
         session.add(plant)
-        session.flush()
+        UserService.increment(session, user, growing_plant_count=1)
         return plant, "OK"
     
     @staticmethod
@@ -41,19 +60,16 @@ class GardenService:
     
     @staticmethod
     def check_ready_plants(session: Session, user: User):
-        now = datetime.utcnow()
-        plants = session.query(Plant).filter_by(user_id=user.id, is_harvested=False).all()
-        ready_plants = [plant for plant in plants if plant.ready_at <= now and not plant.is_ready]
-        
-        for plant in ready_plants:
-            plant.is_ready = True
-        
-        session.flush()
-        return ready_plants
+        return (
+            session.query(Plant)
+            .filter(Plant.user_id == user.id, Plant.is_harvested == False, Plant.is_ready)
+            .order_by(Plant.ready_at)
+            .all()
+        )
     
     @staticmethod
     def harvest_plant(session: Session, user: User, plant: Plant):
-        if not plant.is_ready and plant.ready_at > datetime.utcnow():
+        if plant.is_harvested or not plant.is_ready:
             return None
         
         plant_data = PLANTS.get(plant.plant_type)
@@ -61,13 +77,52 @@ class GardenService:
             return None
         
         reward = plant_data['reward_gold']
-        user.gold += reward
+        reward += int(reward * VIPService.get_gold_bonus(user))
         plant.is_harvested = True
-        plant.is_ready = True
-        
-        session.flush()
+        UserService.increment(session, user, gold=reward, growing_plant_count=-1)
         return reward
     
+    @staticmethod
+    def harvest_all(session: Session, user: User):
+        """
+        Harvest every ripe plant of the user with one UPDATE and credit the
+        rewards (plus the VIP gold bonus) together with the plant counter in
+        one UPDATE of the user.
+        Returns a HarvestSummary, or None if nothing was ripe.
+        """
+        ripe = (
+            Plant.user_id == user.id,
+            Plant.is_harvested == False,
+            Plant.is_ready,
+            Plant.plant_type.in_(PLANTS)
+        )
+        stmt = (
+            update(Plant)
+            .where(*ripe)
+            .values(is_harvested=True)
+            .execution_options(synchronize_session=False)
+        )
+        
+        if session.get_bind().dialect.update_returning:
+            # UPDATE plants SET is_harvested = 1 WHERE ... RETURNING plant_type
+            counts = Counter(session.execute(stmt.returning(Plant.plant_type)).scalars())
+        else:
+            # Without RETURNING: aggregate first, then flip the same rows in this transaction
+            counts = Counter(dict(session.execute(
+                select(Plant.plant_type, func.count()).where(*ripe).group_by(Plant.plant_type)
+            ).all()))
+            session.execute(stmt)
+        
+        if not counts:
+            return None
+        
+        base_gold = sum(PLANTS[plant_type]['reward_gold'] * count for plant_type, count in counts.items())
+        bonus_gold = int(base_gold * VIPService.get_gold_bonus(user))
+        balance = UserService.increment(
+            session, user, gold=base_gold + bonus_gold, growing_plant_count=-sum(counts.values())
+        )['gold']
+        return HarvestSummary(counts=dict(counts), base_gold=base_gold, bonus_gold=bonus_gold, balance=balance)
+    
     @staticmethod
     def get_user_garden(session: Session, user: User):
         return session.query(Garden).filter_by(user_id=user.id).first()
@@ -81,5 +136,4 @@ class GardenService:
         if theme:
             garden.theme = theme
         
-        session.flush()
         return garden
@@ -1,11 +1,48 @@
+import itertools
+from dataclasses import dataclass, fields
 from datetime import datetime
-from database.models import User, Garden
+from database import get_session
+from database.models import User, Garden, Dragon, Egg, Plant
+from sqlalchemy import bindparam, event, func, inspect, select, update
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from utils.cache import TTLCache
+import config
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Lightweight read-only copy of the user fields most screens need"""
+    id: int
+    telegram_id: int
+    language: str
+    vip_level: int
+    gold: int
+    crystals: int
+    version: int
+
+# Snapshots keyed by telegram_id. Writes in this process invalidate entries;
+# the TTL bounds staleness for writes made by other bot instances.
+user_snapshot_cache = TTLCache(maxsize=config.USER_CACHE_SIZE, ttl=config.USER_CACHE_TTL)
+
+# Increases every time a snapshot is rebuilt, so consumers can detect changes cheaply
+_snapshot_versions = itertools.count(1)
+
+# session.info key: users loaded in the current transaction, cached once it commits
+_PENDING_SNAPSHOTS = 'pending_user_snapshots'
+_SNAPSHOT_FIELDS = frozenset(field.name for field in fields(UserSnapshot)) - {'version'}
+
+# Denormalized counter column -> (model, WHERE criteria) of the rows it counts
+COUNTERS = {
+    'dragon_count': (Dragon, ()),
+    'active_egg_count': (Egg, (Egg.is_hatched == False,)),
+    'growing_plant_count': (Plant, (Plant.is_harvested == False,)),
+}
 
 class UserService:
     @staticmethod
-    def get_or_create_user(session: Session, telegram_user):
-        user = session.query(User).filter_by(telegram_id=telegram_user.id).first()
+    def get_or_create_user(session: Session, telegram_user, *options):
+        """Load the user with the screen's loader options (e.g. joinedload(User.battlepass)), creating it if new"""
+        user = session.query(User).options(*options).filter_by(telegram_id=telegram_user.id).first()
         
         if not user:
             user = User(
@@ -20,45 +57,227 @@ class UserService:
             
             garden = Garden(user_id=user.id)
             session.add(garden)
-            session.flush()
+            # Known without a query: the garden just created and no battlepass yet
+            set_committed_value(user, 'garden', garden)
+            set_committed_value(user, 'battlepass', None)
         
+        session.info.setdefault(_PENDING_SNAPSHOTS, {})[user.telegram_id] = user
         return user
     
     @staticmethod
-    def add_gold(session: Session, user: User, amount: int):
-        user.gold += amount
+    def get_snapshot(telegram_user) -> UserSnapshot:
+        """Get the cached user snapshot, loading (or creating) the user on a miss"""
+        snapshot = user_snapshot_cache.get(telegram_user.id)
+        if snapshot is None:
+            with get_session() as session:
+                user = UserService.get_or_create_user(session, telegram_user)
+            # Cached by the commit; inside an enclosing transaction there is no commit yet
+            snapshot = user_snapshot_cache.get(user.telegram_id) or UserService.build_snapshot(user)
+        return snapshot
+    
+    @staticmethod
+    def refresh_snapshot(user: User) -> UserSnapshot:
+        snapshot = UserService.build_snapshot(user)
+        user_snapshot_cache.set(user.telegram_id, snapshot)
+        return snapshot
+    
+    @staticmethod
+    def build_snapshot(user: User) -> UserSnapshot:
+        return UserSnapshot(
+            id=user.id,
+            telegram_id=user.telegram_id,
+            language=user.language,
+            vip_level=user.vip_level,
+            gold=user.gold,
+            crystals=user.crystals,
+            version=next(_snapshot_versions)
+        )
+    
+    @staticmethod
+    def invalidate_snapshot(telegram_id: int):
+        user_snapshot_cache.invalidate(telegram_id)
+    
+    @staticmethod
+    def snapshot_cache_stats() -> dict:
+        return user_snapshot_cache.stats()
+    
+    @staticmethod
+    def set_language(session: Session, user: User, language: str):
+        user.language = language
         user.updated_at = datetime.utcnow()
-        session.flush()
+        UserService.invalidate_snapshot(user.telegram_id)
         return user
     
+    @staticmethod
+    def change_balance(session: Session, user: User, currency: str, delta: int):
+        """
+        Atomically add delta to the user's 'gold' or 'crystals' in a single
+        conditional UPDATE. A debit only applies if the balance covers it.
+        Returns the new balance, or None if the debit was refused.
+        """
+        column = getattr(User, currency)
+        now = datetime.utcnow()
+        
+        stmt = (
+            update(User)
+            .where(User.id == user.id)
+            .values({currency: column + delta, 'updated_at': now})
+            .execution_options(synchronize_session=False)
+        )
+        if delta < 0:
+            stmt = stmt.where(column >= -delta)
+        
+        if session.get_bind().dialect.update_returning:
+            # UPDATE users SET gold = gold - :n WHERE id = :id AND gold >= :n RETURNING gold
+            balance = session.execute(stmt.returning(column)).scalar_one_or_none()
+        else:
+            # Older SQLite without RETURNING: same UPDATE, then read back inside the transaction
+            result = session.execute(stmt)
+            balance = None
+            if result.rowcount:
+                balance = session.execute(select(column).where(User.id == user.id)).scalar_one()
+        
+        if balance is None:
+            return None
+        
+        # Keep the loaded object in sync without marking it dirty (no second write on flush)
+        set_committed_value(user, currency, balance)
+        set_committed_value(user, 'updated_at', now)
+        UserService.invalidate_snapshot(user.telegram_id)
+        return balance
+    
+    @staticmethod
+    def add_gold(session: Session, user: User, amount: int):
+        return UserService.change_balance(session, user, 'gold', amount)
+    
     @staticmethod
     def remove_gold(session: Session, user: User, amount: int):
-        if user.gold >= amount:
-            user.gold -= amount
-            user.updated_at = datetime.utcnow()
-            session.flush()
-            return True
-        return False
+        return UserService.change_balance(session, user, 'gold', -amount)
     
     @staticmethod
     def add_crystals(session: Session, user: User, amount: int):
-        user.crystals += amount
-        user.updated_at = datetime.utcnow()
-        session.flush()
-        return user
+        return UserService.change_balance(session, user, 'crystals', amount)
     
     @staticmethod
     def remove_crystals(session: Session, user: User, amount: int):
-        if user.crystals >= amount:
-            user.crystals -= amount
-            user.updated_at = datetime.utcnow()
-            session.flush()
-            return True
-        return False
+        return UserService.change_balance(session, user, 'crystals', -amount)
+    
+    @staticmethod
+    def increment(session: Session, user: User, within: dict = None, **deltas):
+        """
+        Atomically add deltas to integer columns of the user in one UPDATE,
+        e.g. increment(session, user, dragon_count=3, active_egg_count=-3).
+        Nothing is guarded unless within caps columns, e.g.
+        within={'dragon_count': 5}: the UPDATE then only applies if each
+        capped column ends up at or under its cap, and None is returned if
+        it did not. Returns {column: new value}.
+        """
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if not deltas:
+            return {}
+        columns = [getattr(User, name) for name in deltas]
+        now = datetime.utcnow()
+        
+        stmt = (
+            update(User)
+            .where(User.id == user.id)
+            .values({**{name: getattr(User, name) + delta for name, delta in deltas.items()}, 'updated_at': now})
+            .execution_options(synchronize_session=False)
+        )
+        for name, cap in (within or {}).items():
+            # UPDATE users SET dragon_count = dragon_count + :n ... WHERE id = :id AND dragon_count + :n <= :cap
+            stmt = stmt.where(getattr(User, name) + deltas.get(name, 0) <= cap)
+        
+        if session.get_bind().dialect.update_returning:
+            values = session.execute(stmt.returning(*columns)).one_or_none()
+        else:
+            result = session.execute(stmt)
+            values = session.execute(select(*columns).where(User.id == user.id)).one() if result.rowcount else None
+        if values is None:
+            return None
+        
+        for name, value in zip(deltas, values):
+            set_committed_value(user, name, value)
+        set_committed_value(user, 'updated_at', now)
+        if 'gold' in deltas or 'crystals' in deltas:
+            UserService.invalidate_snapshot(user.telegram_id)
+        return dict(zip(deltas, values))
+    
+    @staticmethod
+    def reconcile_counters(session: Session, after_id: int = 0, limit: int = 1000) -> dict:
+        """
+        Recompute the counter columns of the next `limit` users (by id) with
+        one GROUP BY per counted table and write back the ones that drifted.
+        Each fix is a compare-and-set on the values read, so a counter bumped
+        concurrently is left for the next pass instead of being overwritten.
+        Returns {'last_id', 'checked', 'fixed'}; last_id is None past the end.
+        """
+        users = session.execute(
+            select(User.id, *(getattr(User, name) for name in COUNTERS))
+            .where(User.id > after_id)
+            .order_by(User.id)
+            .limit(limit)
+        ).all()
+        if not users:
+            return {'last_id': None, 'checked': 0, 'fixed': 0}
+        first_id, last_id = users[0].id, users[-1].id
+        
+        actual = {}
+        for name, (model, criteria) in COUNTERS.items():
+            # SELECT user_id, count(*) FROM <table> WHERE user_id BETWEEN ... GROUP BY user_id
+            actual[name] = dict(session.execute(
+                select(model.user_id, func.count())
+                .where(model.user_id.between(first_id, last_id), *criteria)
+                .group_by(model.user_id)
+            ).all())
+        
+        fixes = []
+        for row in users:
+            stored = row._mapping
+            counted = {name: actual[name].get(row.id, 0) for name in COUNTERS}
+            if any(stored[name] != counted[name] for name in COUNTERS):
+                fixes.append({
+                    'user_id': row.id,
+                    **{f'old_{name}': stored[name] for name in COUNTERS},
+                    **{f'new_{name}': counted[name] for name in COUNTERS}
+                })
+        
+        fixed = 0
+        if fixes:
+            table = User.__table__
+            stmt = (
+                update(table)
+                .where(table.c.id == bindparam('user_id'),
+                       *(table.c[name] == bindparam(f'old_{name}') for name in COUNTERS))
+                .values({name: bindparam(f'new_{name}') for name in COUNTERS})
+            )
+            result = session.connection().execute(stmt, fixes)
+            fixed = result.rowcount if session.get_bind().dialect.supports_sane_multi_rowcount else len(fixes)
+        
+        return {'last_id': last_id, 'checked': len(users), 'fixed': fixed}
     
     @staticmethod
     def update_daily_egg_time(session: Session, user: User):
         user.last_daily_egg = datetime.utcnow()
         user.updated_at = datetime.utcnow()
-        session.flush()
         return user
+
+@event.listens_for(Session, 'after_commit')
+def _cache_committed_snapshots(session):
+    """Snapshot the users get_or_create_user loaded, now that what they show is committed"""
+    for user in session.info.pop(_PENDING_SNAPSHOTS, {}).values():
+        state = inspect(user)
+        # No SQL can run here: users deleted or expired in the transaction are reloaded on the next miss
+        if not state.was_deleted and not state.unloaded & _SNAPSHOT_FIELDS:
+            UserService.refresh_snapshot(user)
+
+@event.listens_for(Session, 'after_rollback')
+def _drop_pending_snapshots(session):
+    session.info.pop(_PENDING_SNAPSHOTS, None)
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_flushed_users(session, flush_context):
+    """Drop snapshots of users changed outside UserService (VIP activation, garden gold, ...)"""
+    for obj in itertools.chain(session.dirty, session.deleted):
+        if isinstance(obj, User):
+            user_snapshot_cache.invalidate(obj.telegram_id)
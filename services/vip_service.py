@@ -100,7 +100,6 @@ class VIPService:
             # New VIP
             user.vip_expiration = datetime.utcnow() + timedelta(days=days)
         
-        session.flush()
         return user
     
     @staticmethod
@@ -3,9 +3,14 @@
 Simple test script to verify game mechanics without running the full bot
 """
 
+import os
 import sys
 from datetime import datetime, timedelta
 
+# Unplanned lazy loads and handlers over their SQL budget fail loudly in tests
+os.environ.setdefault('DB_RELATIONSHIP_LAZY', 'raise')
+os.environ.setdefault('SQL_BUDGET_STRICT', 'true')
+
 def test_imports():
     print("Testing imports...")
     try:
@@ -77,7 +82,7 @@ def test_user_creation():
     print("\nTesting user creation...")
     try:
         from database import get_session
-        from services import UserService
+        from services import UserService, GardenService
         
         class MockTelegramUser:
             def __init__(self):
@@ -94,8 +99,9 @@ def test_user_creation():
             print(f"   Crystals: {user.crystals}")
             print(f"   VIP Level: {user.vip_level}")
             
-            if user.garden:
-                print(f"✅ Garden created: {user.garden.name}")
+            garden = GardenService.get_user_garden(session, user)
+            if garden:
+                print(f"✅ Garden created: {garden.name}")
         
         return True
     except Exception as e:
@@ -200,6 +206,1784 @@ def test_plant_creation():
         traceback.print_exc()
         return False
 
+def test_async_services():
+    print("\nTesting async services...")
+    try:
+        import asyncio
+        from database import get_async_session, dispose_async_engine
+        from services import AsyncUserService, AsyncEggService
+        
+        class MockTelegramUser:
+            def __init__(self):
+                self.id = 12345682
+                self.username = "async_tester"
+                self.first_name = "Async Tester"
+        
+        async def run():
+            async with get_async_session() as session:
+                user = await AsyncUserService.get_or_create_user(session, MockTelegramUser())
+                egg = await AsyncEggService.create_egg(session, user, 'Regular')
+                eggs = await AsyncEggService.get_user_eggs(session, user)
+            await dispose_async_engine()
+            return user, egg, eggs
+        
+        user, egg, eggs = asyncio.run(run())
+        
+        print(f"✅ Async user loaded: {user.first_name}")
+        print(f"✅ Async egg created: {egg.egg_type} ({egg.rarity})")
+        print(f"   Unhatched eggs: {len(eggs)}")
+        
+        return egg.id in [e.id for e in eggs]
+    except Exception as e:
+        print(f"❌ Async services error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_index_audit():
+    print("\nTesting index audit...")
+    try:
+        from database.audit import audit_service_queries
+        
+        results = audit_service_queries()
+        flagged = [r['name'] for r in results if r['seq_scan']]
+        
+        print(f"✅ {len(results)} service queries explained")
+        if flagged:
+            print(f"❌ Sequential scans: {', '.join(flagged)}")
+            return False
+        
+        print("✅ No sequential scans")
+        return True
+    except Exception as e:
+        print(f"❌ Index audit error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_user_snapshot_cache():
+    print("\nTesting user snapshot cache...")
+    try:
+        from database import get_session
+        from services import UserService
+        from services.user_service import user_snapshot_cache
+        
+        class MockTelegramUser:
+            def __init__(self):
+                self.id = 12345683
+                self.username = "cache_tester"
+                self.first_name = "Cache Tester"
+        
+        mock_user = MockTelegramUser()
+        UserService.invalidate_snapshot(mock_user.id)
+        
+        first = UserService.get_snapshot(mock_user)
+        misses = user_snapshot_cache.misses
+        second = UserService.get_snapshot(mock_user)
+        
+        if user_snapshot_cache.misses != misses or second is not first:
+            print("❌ Second lookup did not hit the cache")
+            return False
+        print(f"✅ Snapshot cached: {first.language}, {first.gold} gold")
+        
+        with get_session() as session:
+            user = UserService.get_or_create_user(session, mock_user)
+            UserService.set_language(session, user, 'en')
+        
+        updated = UserService.get_snapshot(mock_user)
+        if updated.language != 'en' or updated.version <= first.version:
+            print("❌ Snapshot was not refreshed after a write")
+            return False
+        
+        print(f"✅ Snapshot refreshed after write (version {first.version} -> {updated.version})")
+        
+        UserService.invalidate_snapshot(mock_user.id)
+        try:
+            with get_session() as session:
+                user = UserService.get_or_create_user(session, mock_user)
+                UserService.set_language(session, user, 'ru')
+                if mock_user.id in user_snapshot_cache:
+                    print("❌ Snapshot cached before the transaction committed")
+                    return False
+                raise RuntimeError("rolled back")
+        except RuntimeError:
+            pass
+        if mock_user.id in user_snapshot_cache or UserService.get_snapshot(mock_user).language != 'en':
+            print("❌ Rolled-back language change reached the snapshot cache")
+            return False
+        print("✅ Snapshots cached after commit only, rolled-back writes never cached")
+        print(f"   Stats: {UserService.snapshot_cache_stats()}")
+        return True
+    except Exception as e:
+        print(f"❌ User snapshot cache error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_atomic_balance():
+    print("\nTesting atomic balance updates...")
+    try:
+        from database import get_session
+        from services import UserService
+        
+        class MockTelegramUser:
+            def __init__(self):
+                self.id = 12345684
+                self.username = "balance_tester"
+                self.first_name = "Balance Tester"
+        
+        with get_session() as session:
+            user = UserService.get_or_create_user(session, MockTelegramUser())
+            start_gold = user.gold
+            spend = start_gold // 2 + 1
+        
+        # Two taps that both loaded the same balance - only one may be charged
+        with get_session() as first, get_session() as second:
+            user_a = UserService.get_or_create_user(first, MockTelegramUser())
+            user_b = UserService.get_or_create_user(second, MockTelegramUser())
+            
+            balance_a = UserService.remove_gold(first, user_a, spend)
+            first.commit()
+            balance_b = UserService.remove_gold(second, user_b, spend)
+        
+        if balance_a != start_gold - spend or balance_b is not None:
+            print(f"❌ Unexpected balances: {balance_a}, {balance_b}")
+            return False
+        print(f"✅ Second debit refused: {start_gold} -> {balance_a}")
+        
+        with get_session() as session:
+            user = UserService.get_or_create_user(session, MockTelegramUser())
+            balance = UserService.add_gold(session, user, spend)
+            if balance != start_gold or user.gold != balance:
+                print(f"❌ Credit returned {balance}, object has {user.gold}")
+                return False
+        
+        print(f"✅ Credit returned new balance: {balance}")
+        return True
+    except Exception as e:
+        print(f"❌ Atomic balance error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_update_processor():
+    print("\nTesting per-user update processor...")
+    try:
+        import asyncio
+        from datetime import datetime
+        from telegram import Update, Message, Chat, User as TelegramUser
+        from core import PerUserUpdateProcessor
+        
+        def make_update(update_id, user_id):
+            user = TelegramUser(user_id, False, f"Player{user_id}")
+            message = Message(update_id, datetime.now(), Chat(user_id, 'private'), from_user=user)
+            return Update(update_id, message=message)
+        
+        async def scenario():
+            processor = PerUserUpdateProcessor(max_concurrent_updates=4)
+            log = []
+            active = set()
+            overlap = []
+            
+            async def handle(update_id, user_id):
+                if active:
+                    overlap.append(user_id)
+                active.add(user_id)
+                await asyncio.sleep(0.01)
+                log.append((user_id, update_id))
+                active.discard(user_id)
+            
+            # Spammer 1 sends five updates, player 2 sends one in between
+            updates = [(i, 1) for i in range(1, 4)] + [(4, 2)] + [(i, 1) for i in range(5, 7)]
+            await asyncio.gather(*(
+                processor.process_update(make_update(i, uid), handle(i, uid)) for i, uid in updates
+            ))
+            return processor, log, overlap
+        
+        processor, log, overlap = asyncio.run(scenario())
+        
+        spammer_order = [update_id for user_id, update_id in log if user_id == 1]
+        if spammer_order != [1, 2, 3, 5, 6]:
+            print(f"❌ Same-user updates out of order: {spammer_order}")
+            return False
+        print(f"✅ Same-user updates ran in order: {spammer_order}")
+        
+        if log.index((2, 4)) > 1 or 2 not in overlap:
+            print(f"❌ Other user was blocked behind the spammer: {log}")
+            return False
+        print("✅ Different users processed in parallel")
+        
+        stats = processor.stats()
+        if stats['processed'] != 6 or stats['queue_depth'] != 0 or stats['users_queued'] != 0:
+            print(f"❌ Unexpected stats: {stats}")
+            return False
+        print(f"✅ Stats: processed={stats['processed']}, wait max={stats['wait_max_ms']:.1f}ms")
+        return True
+    except Exception as e:
+        print(f"❌ Update processor error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_router():
+    print("\nTesting button/callback router...")
+    try:
+        from datetime import datetime
+        from telegram import Update, Message, Chat, CallbackQuery, User as TelegramUser
+        from localization import MESSAGES
+        from telegram.ext import ApplicationBuilder
+        from core import get_router
+        from handlers import garden, egg, register_start_handlers, register_egg_handlers, register_garden_handlers
+        from handlers.start import set_language
+        from payment.crypto_handler import check_crypto_payment, register_crypto_handlers
+        
+        application = ApplicationBuilder().token("123456:TEST").build()
+        router = get_router(application)
+        register_start_handlers(application)
+        register_egg_handlers(application)
+        register_garden_handlers(application)
+        register_crypto_handlers(application)
+        register_egg_handlers(application)  # registering twice is harmless
+        
+        user = TelegramUser(1, False, "Router Tester")
+        chat = Chat(1, 'private')
+        
+        def text_update(text):
+            return Update(1, message=Message(1, datetime.now(), chat, from_user=user, text=text))
+        
+        def callback_update(data):
+            return Update(2, callback_query=CallbackQuery('1', user, 'instance', data=data))
+        
+        # Every registered menu button resolves in every language
+        for lang, messages in MESSAGES.items():
+            for key in ('nav_eggs', 'nav_garden', 'nav_language', 'nav_help', 'nav_back', 'crypto_ton'):
+                if router.resolve(text_update(messages[key])) is None:
+                    print(f"❌ Button {key} ({lang}) is not routed")
+                    return False
+        print(f"✅ {len(router.texts)} button texts routed across {len(MESSAGES)} languages")
+        
+        checks = [
+            (text_update(MESSAGES['en']['language_english']), set_language),
+            (text_update("🔍 Check Payment:12345"), check_crypto_payment),
+            (callback_update('plant_menu'), garden.plant_menu),
+            (callback_update('plant_Carrot'), garden.plant_crop),
+            (callback_update('hatch_egg_7'), egg.hatch_egg),
+            (callback_update('unknown_button'), None),
+            (text_update("free text"), None),
+        ]
+        for update, expected in checks:
+            resolved = router.resolve(update)
+            if resolved is not expected:
+                print(f"❌ {update.to_dict()} resolved to {resolved}")
+                return False
+        print("✅ Exact, prefix and unknown lookups resolve correctly")
+        
+        try:
+            router.add_callback(egg.eggs_menu, 'plant_menu')
+            print("❌ Conflicting registration was accepted")
+            return False
+        except ValueError:
+            pass
+        print("✅ Conflicting registrations are rejected")
+        return True
+    except Exception as e:
+        print(f"❌ Router error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_ready_notifier():
+    print("\nTesting ready notifications...")
+    try:
+        import asyncio
+        from datetime import datetime, timedelta
+        from database import get_session, get_async_session, dispose_async_engine, Egg, Plant
+        from database.models import JobState
+        from services import UserService
+        from jobs import ReadyNotifier
+        
+        class MockTelegramUser:
+            def __init__(self, id):
+                self.id = id
+                self.username = f"notify_{id}"
+                self.first_name = "Notify Tester"
+        
+        class FakeBot:
+            def __init__(self):
+                self.sent = []
+            
+            async def send_message(self, chat_id, text, **kwargs):
+                self.sent.append((chat_id, text))
+        
+        base = datetime(2001, 1, 1)
+        with get_session() as session:
+            session.query(JobState).filter_by(name='test_ready_notifier').delete()
+            player = UserService.get_or_create_user(session, MockTelegramUser(12345690))
+            other = UserService.get_or_create_user(session, MockTelegramUser(12345691))
+            rows = [
+                Egg(user_id=player.id, egg_type='Regular', hatching_time=1, hatches_at=base + timedelta(minutes=1)),
+                Egg(user_id=player.id, egg_type='Regular', hatching_time=1, hatches_at=base + timedelta(minutes=2)),
+                Plant(user_id=player.id, plant_type='Carrot', ready_at=base + timedelta(minutes=3)),
+                Egg(user_id=other.id, egg_type='Regular', hatching_time=1, hatches_at=base + timedelta(minutes=5)),
+            ]
+            session.add_all(rows)
+            session.flush()
+            row_keys = [(type(row), row.id) for row in rows]
+        
+        async def run():
+            bot = FakeBot()
+            notifier = ReadyNotifier(name='test_ready_notifier')
+            notifier.watermark = base
+            await notifier.run_once(bot, now=base + timedelta(minutes=4))
+            first = list(bot.sent)
+            
+            # Restart: a fresh notifier resumes from the saved watermark
+            bot.sent.clear()
+            restarted = ReadyNotifier(name='test_ready_notifier')
+            await restarted.load(datetime.utcnow())
+            await restarted.run_once(bot, now=base + timedelta(minutes=10))
+            second = list(bot.sent)
+            await dispose_async_engine()
+            return first, second
+        
+        try:
+            first, second = asyncio.run(run())
+        finally:
+            with get_session() as session:
+                for model, row_id in row_keys:
+                    session.delete(session.get(model, row_id))
+        
+        if len(first) != 1 or first[0][0] != 12345690 or ': 2' not in first[0][1] or ': 1' not in first[0][1]:
+            print(f"❌ Expected one batched message for the player, got {first}")
+            return False
+        print("✅ One batched notification for 2 eggs + 1 plant")
+        
+        if [chat_id for chat_id, text in second] != [12345691]:
+            print(f"❌ After restart expected only the other player's egg, got {second}")
+            return False
+        print("✅ Restart resumed from the watermark without repeats")
+        return True
+    except Exception as e:
+        print(f"❌ Ready notifier error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_lazy_dragon_needs():
+    print("\nTesting lazily decayed hunger and happiness...")
+    try:
+        from datetime import timedelta
+        from sqlalchemy import event
+        from database import get_session
+        from database.db import engine
+        from database.models import Dragon
+        from services import UserService, DragonService
+        from utils.clock import request_time
+        
+        class MockTelegramUser:
+            def __init__(self):
+                self.id = 12345699
+                self.username = "dragon_feeder"
+                self.first_name = "Dragon Feeder"
+        
+        statements = []
+        
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split(None, 1)[0].upper())
+        
+        with get_session() as session:
+            user = UserService.get_or_create_user(session, MockTelegramUser())
+            dragon = DragonService.create_dragon(session, user, 'Common')
+            hatched = dragon.baseline_at
+            
+            def sql_needs():
+                return tuple(session.query(Dragon.hunger, Dragon.happiness).filter_by(id=dragon.id).one())
+            
+            with request_time(hatched + timedelta(days=3, seconds=1)):
+                python_needs = (dragon.hunger, dragon.happiness)
+                if python_needs != (70, 85) or sql_needs() != python_needs:
+                    print(f"❌ After 3 days: Python {python_needs}, SQL {sql_needs()}")
+                    return False
+                print(f"✅ After 3 days hunger/happiness read {python_needs} in Python and SQL")
+                
+                event.listen(engine, 'before_cursor_execute', count)
+                try:
+                    fed, _ = DragonService.feed_dragon(session, dragon)
+                    session.flush()  # Feeding leaves the write to the unit of work
+                finally:
+                    event.remove(engine, 'before_cursor_execute', count)
+                if not fed or statements != ['UPDATE'] or (dragon.hunger, dragon.happiness) != (100, 100):
+                    print(f"❌ Feeding: {fed}, {statements}, {dragon.hunger}/{dragon.happiness}")
+                    return False
+                print("✅ Feeding rewrites only this dragon's baseline (one UPDATE)")
+            
+            with request_time(hatched + timedelta(days=14, seconds=1)):
+                starving = session.query(Dragon.id).filter(Dragon.id == dragon.id, Dragon.hunger == 0).all()
+                if (dragon.hunger, dragon.happiness) != (0, 45) or not starving:
+                    print(f"❌ After 11 more days: {dragon.hunger}/{dragon.happiness}, SQL match {starving}")
+                    return False
+                
+                # Rows from before the baseline columns were filled in
+                dragon.baseline_at = None
+                session.flush()
+                python_needs = (dragon.hunger, dragon.happiness)
+                if python_needs != (100, 100) or sql_needs() != python_needs:
+                    print(f"❌ NULL baseline: Python {python_needs}, SQL {sql_needs()}")
+                    return False
+                if not session.query(Dragon.id).filter(Dragon.id == dragon.id, Dragon.hunger > 50).all():
+                    print("❌ NULL baseline dropped by a SQL filter")
+                    return False
+        print("✅ Hunger floors at 0 and is filterable in SQL, NULL baselines read the base value on both sides")
+        return True
+    except Exception as e:
+        print(f"❌ Lazy needs error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_cryptobot_client():
+    print("\nTesting CryptoBot client retries...")
+    try:
+        import asyncio
+        import httpx
+        import config
+        from payment import CryptoBotAPI, cryptobot_api, close_http_client
+        
+        calls = []
+        
+        def handler(request):
+            calls.append(request.url.path.rsplit('/', 1)[-1])
+            if len(calls) <= 2:
+                return httpx.Response(503, json={'ok': False})
+            return httpx.Response(200, json={'ok': True, 'result': [{'code': 'USDT'}]})
+        
+        async def run():
+            base, config.CRYPTOBOT_BACKOFF_BASE = config.CRYPTOBOT_BACKOFF_BASE, 0.001
+            cryptobot_api._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            shared = cryptobot_api.get_http_client()
+            try:
+                api = CryptoBotAPI(api_token='test')
+                currencies = await api.get_currencies()
+                reused = cryptobot_api.get_http_client() is shared
+                
+                # Invoice creation is not idempotent - a 503 must not be replayed
+                calls.clear()
+                invoice = await api.create_invoice(10, 'USDT', 'test')
+                return currencies, reused, invoice, list(calls)
+            finally:
+                config.CRYPTOBOT_BACKOFF_BASE = base
+                await close_http_client()
+        
+        currencies, reused, invoice, invoice_calls = asyncio.run(run())
+        
+        if not currencies['success'] or not reused:
+            print(f"❌ Idempotent call not retried on the shared client: {currencies}")
+            return False
+        print("✅ getCurrencies succeeded after two 503s on the shared client")
+        
+        if invoice['success'] or invoice_calls != ['createInvoice']:
+            print(f"❌ createInvoice was retried: {invoice_calls}")
+            return False
+        print("✅ createInvoice not retried after a 503")
+        return True
+    except Exception as e:
+        print(f"❌ CryptoBot client error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_telegram_webhook():
+    print("\nTesting Telegram webhook endpoint and health probes...")
+    try:
+        import asyncio
+        import json
+        import config
+        from aiohttp.test_utils import TestClient, TestServer
+        from telegram.ext import ApplicationBuilder
+        from database import dispose_async_engine
+        from server import create_web_app
+        
+        secret = 'telegram-test-secret'
+        update = {
+            'update_id': 1,
+            'message': {'message_id': 1, 'date': 0, 'chat': {'id': 12345711, 'type': 'private'}, 'text': '/start'}
+        }
+        
+        async def run():
+            saved = config.WEBHOOK_SECRET_TOKEN
+            config.WEBHOOK_SECRET_TOKEN = secret
+            try:
+                application = ApplicationBuilder().token("123456:TEST").updater(None).build()
+                async with TestClient(TestServer(create_web_app(application))) as client:
+                    async def post(body, token=secret):
+                        response = await client.post(config.WEBHOOK_PATH, data=body,
+                                                     headers={'X-Telegram-Bot-Api-Secret-Token': token})
+                        return response.status
+                    
+                    statuses = {
+                        'wrong secret': await post(json.dumps(update), token='wrong'),
+                        'not json': await post('{'),
+                        'array': await post('[]'),
+                        'string': await post('"x"'),
+                        'empty object': await post('{}'),
+                        'update': await post(json.dumps(update))
+                    }
+                    health = await client.get('/healthz')
+                    ready = await client.get('/readyz')
+                    probes = (health.status, await health.json(), ready.status, await ready.json())
+                await dispose_async_engine()
+                return statuses, application.update_queue.qsize(), probes
+            finally:
+                config.WEBHOOK_SECRET_TOKEN = saved
+        
+        statuses, queued, (health_status, health, ready_status, ready) = asyncio.run(run())
+        
+        expected = {'wrong secret': 403, 'not json': 400, 'array': 400, 'string': 400, 'empty object': 400, 'update': 200}
+        if statuses != expected or queued != 1:
+            print(f"❌ Unexpected responses {statuses}, {queued} update(s) queued")
+            return False
+        print("✅ Wrong secret gets 403, malformed bodies 400, only the real update is queued")
+        
+        if health_status != 200 or health != {'status': 'ok'}:
+            print(f"❌ /healthz answered {health_status} {health}")
+            return False
+        # The application was never started, but the database answers
+        if ready_status != 503 or ready['checks'] != {'application': False, 'database': True}:
+            print(f"❌ /readyz answered {ready_status} {ready}")
+            return False
+        print("✅ /healthz is up, /readyz reports the stopped application and a reachable database")
+        return True
+    except Exception as e:
+        print(f"❌ Telegram webhook error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_cryptobot_webhook():
+    print("\nTesting CryptoBot webhook receiver...")
+    try:
+        import asyncio
+        import hashlib
+        import hmac
+        import json
+        import uuid
+        import config
+        from aiohttp.test_utils import TestClient, TestServer
+        from telegram.ext import ApplicationBuilder
+        from database import get_session, dispose_async_engine, User
+        from database.models import CryptoTransaction
+        from services import UserService
+        from server import create_web_app
+        from server import cryptobot_webhook
+        
+        class MockTelegramUser:
+            def __init__(self):
+                self.id = 12345693
+                self.username = "crypto_tester"
+                self.first_name = "Crypto Tester"
+        
+        invoice_id = f"test-{uuid.uuid4().hex[:12]}"
+        with get_session() as session:
+            user = UserService.get_or_create_user(session, MockTelegramUser())
+            session.add(CryptoTransaction(user_id=user.id, invoice_id=invoice_id, currency='USDT',
+                                          amount=10.0, status='pending'))
+            user_id, start_crystals = user.id, user.crystals
+        
+        # Signed payload as CryptoBot sends it
+        fixture = json.dumps({
+            'update_id': 1,
+            'update_type': 'invoice_paid',
+            'request_date': '2026-01-01T00:00:00.000Z',
+            'payload': {'invoice_id': invoice_id, 'status': 'paid', 'asset': 'USDT', 'amount': '10'}
+        }).encode()
+        token = 'webhook-test-token'
+        signature = hmac.new(hashlib.sha256(token.encode()).digest(), fixture, hashlib.sha256).hexdigest()
+        
+        notified = []
+        
+        async def fake_notify(bot, telegram_id, lang, crystals):
+            notified.append((telegram_id, crystals))
+        
+        async def run():
+            saved = (config.CRYPTOBOT_API_TOKEN, config.CRYPTOBOT_WEBHOOK_ENABLED, cryptobot_webhook.notify_crypto_payment)
+            config.CRYPTOBOT_API_TOKEN, config.CRYPTOBOT_WEBHOOK_ENABLED = token, True
+            cryptobot_webhook.notify_crypto_payment = fake_notify
+            try:
+                application = ApplicationBuilder().token("123456:TEST").updater(None).build()
+                async with TestClient(TestServer(create_web_app(application))) as client:
+                    forged = await client.post(config.CRYPTOBOT_WEBHOOK_PATH, data=fixture,
+                                               headers={'crypto-pay-api-signature': '0' * 64})
+                    statuses = [forged.status]
+                    not_object = b'[]'
+                    response = await client.post(config.CRYPTOBOT_WEBHOOK_PATH, data=not_object, headers={
+                        'crypto-pay-api-signature': hmac.new(hashlib.sha256(token.encode()).digest(),
+                                                             not_object, hashlib.sha256).hexdigest()
+                    })
+                    statuses.append(response.status)
+                    for _ in range(2):  # CryptoBot retries must not credit twice
+                        response = await client.post(config.CRYPTOBOT_WEBHOOK_PATH, data=fixture,
+                                                     headers={'crypto-pay-api-signature': signature})
+                        statuses.append(response.status)
+                    await asyncio.sleep(0.05)
+                await dispose_async_engine()
+                return statuses
+            finally:
+                config.CRYPTOBOT_API_TOKEN, config.CRYPTOBOT_WEBHOOK_ENABLED, cryptobot_webhook.notify_crypto_payment = saved
+        
+        statuses = asyncio.run(run())
+        
+        with get_session() as session:
+            crystals = session.get(User, user_id).crystals
+            status = session.query(CryptoTransaction).filter_by(invoice_id=invoice_id).one().status
+        
+        if statuses != [401, 400, 200, 200]:
+            print(f"❌ Unexpected responses: {statuses}")
+            return False
+        print("✅ Forged signature rejected, signed non-object rejected, signed payload accepted")
+        
+        if status != 'completed' or crystals != start_crystals + config.CRYPTO_PAYMENT_CRYSTALS:
+            print(f"❌ Expected one credit, status={status}, crystals {start_crystals} -> {crystals}")
+            return False
+        print(f"✅ Credited once despite a duplicate delivery: {start_crystals} -> {crystals} 💎")
+        
+        if notified != [(12345693, config.CRYPTO_PAYMENT_CRYSTALS)]:
+            print(f"❌ Unexpected notifications: {notified}")
+            return False
+        print("✅ Player notified once in the background")
+        return True
+    except Exception as e:
+        print(f"❌ CryptoBot webhook error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_crypto_reconciler():
+    print("\nTesting batched crypto invoice reconciliation...")
+    try:
+        import asyncio
+        import uuid
+        import httpx
+        from datetime import datetime, timedelta
+        import config
+        from database import get_session, dispose_async_engine, User
+        from database.models import CryptoTransaction
+        from services import UserService
+        from payment import CryptoBotAPI, cryptobot_api, close_http_client
+        from jobs import CryptoReconciler
+        
+        class MockTelegramUser:
+            def __init__(self):
+                self.id = 12345694
+                self.username = "reconcile_tester"
+                self.first_name = "Reconcile Tester"
+        
+        prefix = uuid.uuid4().hex[:8]
+        remote = {f"{prefix}-paid": 'paid', f"{prefix}-expired": 'expired',
+                  f"{prefix}-stale": 'active', f"{prefix}-open": 'active'}
+        now = datetime.utcnow()
+        with get_session() as session:
+            # Earlier tests may have left pending invoices behind
+            session.query(CryptoTransaction).filter_by(status='pending').update({'status': 'failed'})
+            user = UserService.get_or_create_user(session, MockTelegramUser())
+            for offset, invoice_id in enumerate(remote):
+                age = timedelta(days=2) if invoice_id.endswith('stale') else timedelta(minutes=10 - offset)
+                session.add(CryptoTransaction(user_id=user.id, invoice_id=invoice_id, currency='USDT',
+                                              amount=10.0, status='pending', created_at=now - age))
+            user_id, start_crystals = user.id, user.crystals
+        
+        requests = []
+        
+        def handler(request):
+            ids = request.url.params['invoice_ids'].split(',')
+            requests.append(ids)
+            items = [{'invoice_id': i, 'status': remote[i], 'asset': 'USDT', 'amount': '10'} for i in ids]
+            return httpx.Response(200, json={'ok': True, 'result': {'items': items}})
+        
+        async def run():
+            cryptobot_api._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            try:
+                reconciler = CryptoReconciler(batch_size=2, api=CryptoBotAPI(api_token='test'))
+                return await reconciler.run(), await reconciler.run()
+            finally:
+                await close_http_client()
+                await dispose_async_engine()
+        
+        first, second = asyncio.run(run())
+        
+        with get_session() as session:
+            statuses = {tx.invoice_id: tx.status for tx in
+                        session.query(CryptoTransaction).filter(CryptoTransaction.invoice_id.in_(remote))}
+            crystals = session.get(User, user_id).crystals
+        
+        expected = {f"{prefix}-paid": 'completed', f"{prefix}-expired": 'failed',
+                    f"{prefix}-stale": 'failed', f"{prefix}-open": 'pending'}
+        if statuses != expected:
+            print(f"❌ Unexpected statuses: {statuses}")
+            return False
+        print("✅ Paid completed, expired and stale invoices failed, open invoice kept")
+        
+        if first['api_calls'] != 2 or first['checked'] != 4 or first['api_calls_saved'] != 2:
+            print(f"❌ Expected 4 invoices in 2 getInvoices calls: {first}")
+            return False
+        print(f"✅ {first['checked']} invoices checked with {first['api_calls']} API calls")
+        
+        if crystals != start_crystals + config.CRYPTO_PAYMENT_CRYSTALS or second['checked'] != 1:
+            print(f"❌ Second run re-processed invoices: crystals {crystals}, {second}")
+            return False
+        print("✅ Second run only re-checks the open invoice, crystals credited once")
+        return True
+    except Exception as e:
+        print(f"❌ Crypto reconciler error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_rarity_rolls():
+    print("\nTesting alias-table rarity rolls...")
+    try:
+        from collections import Counter
+        from database import get_session
+        from services import UserService, EggService
+        from utils.constants import EGG_TYPES
+        from utils.rarity import AliasTable, RarityRoller
+        
+        # Chi-square critical values at p = 0.001 by degrees of freedom
+        critical = {1: 10.83, 2: 13.82, 3: 16.27, 4: 18.47}
+        rolls = 200_000
+        roller = RarityRoller(seed=2024)
+        for egg_type, data in EGG_TYPES.items():
+            weights = {rarity: chance for rarity, chance in data['rarities'].items() if chance > 0}
+            total = sum(weights.values())
+            counts = Counter(roller.roll_many(egg_type, rolls))
+            
+            if set(counts) - set(weights):
+                print(f"❌ {egg_type}: zero-weight rarity rolled: {counts}")
+                return False
+            chi2 = sum((counts[r] - rolls * w / total) ** 2 / (rolls * w / total) for r, w in weights.items())
+            if chi2 > critical[len(weights) - 1]:
+                print(f"❌ {egg_type}: chi-square {chi2:.2f} exceeds {critical[len(weights) - 1]}")
+                return False
+        print(f"✅ Rarity distributions match EGG_TYPES (chi-square, {rolls:,} rolls per egg type)")
+        
+        fractional = Counter(RarityRoller(seed=1, egg_types={'Test': {'rarities': {'Mythic': 0.5, 'Common': 99.5}}})
+                             .roll_many('Test', rolls))
+        if not 0.003 < fractional['Mythic'] / rolls < 0.007:
+            print(f"❌ Fractional weight 0.5% rolled {fractional['Mythic'] / rolls:.4f}")
+            return False
+        print("✅ Non-integer percentages supported")
+        
+        first, second = RarityRoller(seed=7), RarityRoller(seed=7)
+        first.roll_many('Regular', 50)  # Other egg types' streams are unaffected
+        if first.roll_many('Premium', 100) != [second.roll('Premium') for _ in range(100)]:
+            print("❌ Seeded rollers diverged")
+            return False
+        print("✅ Seeded streams are reproducible per egg type")
+        
+        try:
+            AliasTable({'Common': 0})
+            print("❌ Empty table accepted")
+            return False
+        except ValueError:
+            pass
+        
+        class MockTelegramUser:
+            def __init__(self):
+                self.id = 12345695
+                self.username = "bulk_buyer"
+                self.first_name = "Bulk Buyer"
+        
+        with get_session() as session:
+            user = UserService.get_or_create_user(session, MockTelegramUser())
+            eggs = EggService.create_eggs(session, user, 'Rare', 10)
+            if len(eggs) != 10 or any(egg.id is None or egg.rarity not in ('Common', 'Rare', 'Epic', 'Legendary')
+                                      for egg in eggs):
+                print(f"❌ Bulk egg creation failed: {[(egg.id, egg.rarity) for egg in eggs]}")
+                return False
+            rolled = dict(Counter(egg.rarity for egg in eggs))
+        print(f"✅ Bulk purchase created 10 eggs: {rolled}")
+        return True
+    except Exception as e:
+        print(f"❌ Rarity roll error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_hatch_all_ready():
+    print("\nTesting bulk hatching of ready eggs...")
+    try:
+        from datetime import datetime, timedelta
+        from sqlalchemy import event, select, update
+        from database import get_session
+        from database.db import engine
+        from database.models import Dragon, Egg, User
+        from services import UserService, EggService
+        
+        class MockTelegramUser:
+            def __init__(self):
+                self.id = 12345696
+                self.username = "bulk_hatcher"
+                self.first_name = "Bulk Hatcher"
+        
+        statements = []
+        
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split(None, 1)[0].upper())
+        
+        with get_session() as session:
+            user = UserService.get_or_create_user(session, MockTelegramUser())
+            # Start from an empty collection so the dragon limit is the same on every run
+            session.query(Dragon).filter_by(user_id=user.id).delete()
+            session.query(Egg).filter_by(user_id=user.id).delete()
+            user.dragon_count = user.active_egg_count = 0
+            user.vip_level, user.vip_expiration = 3, None  # VIP Gold: up to 5 dragons
+            for egg in EggService.create_eggs(session, user, 'Rare', 7):
+                egg.hatches_at = datetime.utcnow() - timedelta(minutes=1)
+            EggService.create_egg(session, user, 'Regular')  # Not ready
+            session.flush()
+            
+            event.listen(engine, 'before_cursor_execute', count)
+            try:
+                dragons, remaining = EggService.hatch_all_ready(session, user)
+            finally:
+                event.remove(engine, 'before_cursor_execute', count)
+            
+            if len(dragons) != 5 or remaining != 2:
+                print(f"❌ Expected 5 dragons and 2 eggs left, got {len(dragons)} and {remaining}")
+                return False
+            print(f"✅ Hatched {len(dragons)} eggs (VIP dragon limit), {remaining} left")
+            
+            if statements != ['SELECT', 'UPDATE', 'UPDATE', 'INSERT']:
+                print(f"❌ Expected SELECT, UPDATE, UPDATE, INSERT - got {statements}")
+                return False
+            print("✅ One SELECT, one capped counter UPDATE, one UPDATE of the eggs, one multi-row INSERT")
+            
+            dragons, remaining = EggService.hatch_all_ready(session, user)
+            if dragons or remaining != 2 or user.dragon_count != 5:
+                print(f"❌ Tapping again at the limit hatched {len(dragons)} egg(s)")
+                return False
+            print("✅ Another tap at the dragon limit hatches nothing")
+            
+            user.vip_level = 4  # VIP Platinum: up to 10 dragons
+            # Another device hatched 4 dragons since user was loaded, so user.dragon_count (5) is stale
+            session.execute(update(User).where(User.id == user.id).values(dragon_count=User.dragon_count + 4)
+                            .execution_options(synchronize_session=False))
+            dragons, remaining = EggService.hatch_all_ready(session, user)
+            stored = session.execute(select(User.dragon_count).where(User.id == user.id)).scalar_one()
+            if len(dragons) != 1 or remaining != 1 or stored != 10 or user.dragon_count != 10:
+                print(f"❌ Stale count: hatched {len(dragons)}, {remaining} left, dragon_count {stored} (limit 10)")
+                return False
+            print("✅ The capped UPDATE refused the stale room, hatched 1 egg and stopped at the limit")
+            
+            UserService.increment(session, user, dragon_count=-4)  # Drop the simulated dragons again
+            dragons, remaining = EggService.hatch_all_ready(session, user)
+            again, _ = EggService.hatch_all_ready(session, user)
+            hatched = session.query(Egg).filter_by(user_id=user.id, is_hatched=True).count()
+            total = session.query(Dragon).filter_by(user_id=user.id).count()
+            if len(dragons) != 1 or remaining or again or hatched != 7 or total != 7 or user.active_egg_count != 1:
+                print(f"❌ Follow-up hatching wrong: {len(dragons)}, {remaining}, {len(again)}, {hatched}, {total}")
+                return False
+        print("✅ Remaining eggs hatched once after the limit was raised, unready egg untouched")
+        return True
+    except Exception as e:
+        print(f"❌ Bulk hatching error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_harvest_all():
+    print("\nTesting single-statement harvest...")
+    try:
+        from datetime import datetime, timedelta
+        from sqlalchemy import event
+        from database import get_session, User
+        from database.db import engine
+        from database.models import Plant
+        from services import UserService, GardenService
+        from utils.constants import PLANTS
+        
+        class MockTelegramUser:
+            def __init__(self):
+                self.id = 12345697
+                self.username = "harvester"
+                self.first_name = "Harvester"
+        
+        statements = []
+        
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split(None, 1)[0].upper())
+        
+        with get_session() as session:
+            user = UserService.get_or_create_user(session, MockTelegramUser())
+            user.vip_level, user.vip_expiration = 1, None  # VIP Bronze: +20% gold
+            session.query(Plant).filter_by(user_id=user.id, is_harvested=False).delete()
+            past, future = datetime.utcnow() - timedelta(minutes=1), datetime.utcnow() + timedelta(hours=1)
+            for plant_type, ready_at in [('Sunflower', past), ('Sunflower', past), ('Rose', past), ('Rose', future)]:
+                session.add(Plant(user_id=user.id, plant_type=plant_type, ready_at=ready_at))
+            session.flush()
+            gold_before = user.gold
+            
+            event.listen(engine, 'before_cursor_execute', count)
+            try:
+                summary = GardenService.harvest_all(session, user)
+            finally:
+                event.remove(engine, 'before_cursor_execute', count)
+            
+            base = 2 * PLANTS['Sunflower']['reward_gold'] + PLANTS['Rose']['reward_gold']
+            if summary.counts != {'Sunflower': 2, 'Rose': 1} or summary.base_gold != base:
+                print(f"❌ Wrong harvest: {summary}")
+                return False
+            print(f"✅ Harvested {summary.plants} ripe plants, unripe Rose left growing")
+            
+            if summary.bonus_gold != int(base * 0.2) or summary.balance != gold_before + summary.total_gold:
+                print(f"❌ VIP bonus or balance wrong: {summary}, started with {gold_before}")
+                return False
+            print(f"✅ {summary.base_gold} + {summary.bonus_gold} VIP bonus gold credited")
+            
+            if statements != ['UPDATE', 'UPDATE']:
+                print(f"❌ Expected one plants UPDATE and one balance UPDATE, got {statements}")
+                return False
+            print("✅ Two statements: plants UPDATE ... RETURNING and one balance update")
+            
+            if GardenService.harvest_all(session, user) is not None:
+                print("❌ Plants harvested twice")
+                return False
+            stored = session.query(User.gold).filter_by(id=user.id).scalar()
+            if stored != summary.balance:
+                print(f"❌ Stored balance {stored} != {summary.balance}")
+                return False
+        print("✅ Second harvest finds nothing")
+        return True
+    except Exception as e:
+        print(f"❌ Harvest error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_derived_readiness():
+    print("\nTesting readiness derived from timestamps...")
+    try:
+        from datetime import datetime, timedelta
+        from sqlalchemy import event
+        from database import get_session
+        from database.db import engine
+        from database.migrations import run_migrations
+        from database.models import Egg, Plant
+        from services import UserService, EggService, GardenService
+        from utils.clock import now, request_time
+        
+        class MockTelegramUser:
+            def __init__(self):
+                self.id = 12345698
+                self.username = "clock_watcher"
+                self.first_name = "Clock Watcher"
+        
+        statements = []
+        
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement.split(None, 1)[0].upper())
+        
+        start = datetime.utcnow()
+        with get_session() as session:
+            user = UserService.get_or_create_user(session, MockTelegramUser())
+            egg = EggService.create_egg(session, user, 'Regular')
+            plant = Plant(user_id=user.id, plant_type='Rose', ready_at=egg.hatches_at)
+            session.add(plant)
+            session.flush()
+            
+            if egg.is_ready or plant.is_ready:
+                print("❌ Fresh egg/plant reported ready")
+                return False
+            
+            # Jump to just after the hatch time for the whole "request"
+            with request_time(egg.hatches_at + timedelta(seconds=1)):
+                frozen = now()
+                event.listen(engine, 'before_cursor_execute', count)
+                try:
+                    ready_eggs = EggService.check_ready_eggs(session, user)
+                    ready_plants = GardenService.check_ready_plants(session, user)
+                finally:
+                    event.remove(engine, 'before_cursor_execute', count)
+                consistent = now() == frozen and egg.is_ready and plant.is_ready
+            
+            if egg not in ready_eggs or plant not in ready_plants or not consistent:
+                print(f"❌ Readiness not derived from the request time: {ready_eggs}, {ready_plants}")
+                return False
+            print("✅ Egg and plant ready once the request's now passes their timestamps")
+            
+            if statements != ['SELECT', 'SELECT']:
+                print(f"❌ Checking readiness wrote to the database: {statements}")
+                return False
+            print("✅ Ready checks are pure reads (no is_ready writes)")
+            
+            if now() < start or egg.is_ready:
+                print("❌ Clock still frozen after the request")
+                return False
+        
+        if run_migrations(engine):
+            print("❌ Migrations re-applied on an up-to-date database")
+            return False
+        print("✅ Migrations are idempotent")
+        return True
+    except Exception as e:
+        print(f"❌ Derived readiness error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_user_counters():
+    print("\nTesting denormalized user counters...")
+    try:
+        import asyncio
+        from datetime import datetime, timedelta
+        from sqlalchemy import event, update
+        from database import get_session, dispose_async_engine, User
+        from database.db import engine
+        from database.models import Dragon, Egg, Plant
+        from services import UserService, DragonService, EggService, GardenService
+        from utils.helpers import format_user_profile
+        from jobs import CounterReconciler
+        
+        class MockTelegramUser:
+            def __init__(self):
+                self.id = 12345700
+                self.username = "counter_tester"
+                self.first_name = "Counter Tester"
+        
+        def actual(session, user_id):
+            return (
+                session.query(Dragon).filter_by(user_id=user_id).count(),
+                session.query(Egg).filter_by(user_id=user_id, is_hatched=False).count(),
+                session.query(Plant).filter_by(user_id=user_id, is_harvested=False).count()
+            )
+        
+        def stored(user):
+            return (user.dragon_count, user.active_egg_count, user.growing_plant_count)
+        
+        with get_session() as session:
+            user = UserService.get_or_create_user(session, MockTelegramUser())
+            user.gold = 10000
+            user.vip_level, user.vip_expiration = 4, None  # Room to hatch under the dragon limit
+            session.flush()
+            EggService.create_eggs(session, user, 'Regular', 3)
+            DragonService.create_dragon(session, user, 'Common')
+            GardenService.plant_crop(session, user, 'Sunflower')
+            egg = EggService.get_user_eggs(session, user)[0]
+            egg.hatches_at = datetime.utcnow() - timedelta(minutes=1)
+            session.flush()
+            EggService.hatch_all_ready(session, user)
+            if stored(user) != actual(session, user.id):
+                print(f"❌ Counters {stored(user)} != counted rows {actual(session, user.id)}")
+                return False
+            user_id = user.id
+        print("✅ Services keep dragon, egg and plant counters in step with the rows")
+        
+        statements = []
+        
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        with get_session() as session:
+            event.listen(engine, 'before_cursor_execute', count)
+            try:
+                user = UserService.get_or_create_user(session, MockTelegramUser())
+                format_user_profile(user)
+            finally:
+                event.remove(engine, 'before_cursor_execute', count)
+        if len(statements) != 1:
+            print(f"❌ Profile needed {len(statements)} statements, expected only the user row")
+            return False
+        print("✅ Profile renders from the user row alone")
+        
+        with get_session() as session:
+            session.execute(update(User).where(User.id == user_id).values(dragon_count=999, active_egg_count=-4))
+        
+        async def run():
+            try:
+                reconciler = CounterReconciler(chunk_size=2)
+                return await reconciler.run(), await reconciler.run()
+            finally:
+                await dispose_async_engine()
+        
+        first, second = asyncio.run(run())
+        with get_session() as session:
+            user = session.get(User, user_id)
+            if stored(user) != actual(session, user_id):
+                print(f"❌ Drift not repaired: {stored(user)} != {actual(session, user_id)}")
+                return False
+        if first['fixed'] < 1 or second['fixed'] != 0 or first['chunks'] < 1:
+            print(f"❌ Unexpected reconcile stats: {first}, {second}")
+            return False
+        print(f"✅ Reconcile fixed {first['fixed']} drifted user(s) over {first['chunks']} chunks, second pass clean")
+        return True
+    except Exception as e:
+        print(f"❌ User counters error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_query_budget():
+    print("\nTesting loader strategies and SQL statement budgets...")
+    try:
+        import asyncio
+        from types import SimpleNamespace
+        from sqlalchemy import event
+        from sqlalchemy.exc import InvalidRequestError
+        from database import get_session, dispose_async_engine, User
+        from database.db import engine
+        from database.budget import statement_budget, sql_budget, StatementBudgetExceeded
+        from services import UserService, DragonService, BattlepassService
+        from handlers.start import start_command
+        from handlers.profile import profile_menu
+        
+        telegram_user = SimpleNamespace(id=12345701, username="budget_tester", first_name="Budget Tester")
+        replies = []
+        
+        async def reply_text(text, **kwargs):
+            replies.append(text)
+        
+        update = SimpleNamespace(
+            callback_query=None,
+            effective_user=telegram_user,
+            message=SimpleNamespace(reply_text=reply_text)
+        )
+        
+        sync_statements = []
+        
+        def on_sync_execute(conn, cursor, statement, parameters, context, executemany):
+            sync_statements.append(statement)
+        
+        async def render(handler):
+            try:
+                with statement_budget('test', 100, strict=False) as budget:
+                    await handler(update, None)
+                return budget.count
+            finally:
+                await dispose_async_engine()
+        
+        # First render creates the user, later ones only read it
+        event.listen(engine, 'before_cursor_execute', on_sync_execute)
+        try:
+            counts = [asyncio.run(render(start_command))]
+        finally:
+            event.remove(engine, 'before_cursor_execute', on_sync_execute)
+        with get_session() as session:
+            user = UserService.get_or_create_user(session, telegram_user)
+            DragonService.create_dragon(session, user, 'Rare')
+            BattlepassService.activate_battlepass(session, user)
+        counts += [asyncio.run(render(start_command)), asyncio.run(render(profile_menu))]
+        
+        if counts[1:] != [1, 2] or 'Активен' not in replies[-1]:
+            print(f"❌ Unexpected statement counts {counts} or profile text")
+            return False
+        print(f"✅ Main menu in {counts[1]} statement, profile with battlepass in {counts[2]}")
+        
+        if sync_statements:
+            print(f"❌ Handler ran {len(sync_statements)} statement(s) on the blocking engine")
+            return False
+        print("✅ Handler queries went through the async engine")
+        
+        with get_session() as session:
+            user = session.query(User).filter_by(telegram_id=telegram_user.id).one()
+            try:
+                user.dragons
+                print("❌ Lazy load of User.dragons was allowed")
+                return False
+            except InvalidRequestError:
+                pass
+        print("✅ Unplanned lazy loads raise")
+        
+        @sql_budget(1)
+        async def chatty_handler():
+            with get_session() as session:
+                session.query(User).count()
+                session.query(User).count()
+        
+        try:
+            asyncio.run(chatty_handler())
+            print("❌ Handler over its budget was not stopped")
+            return False
+        except StatementBudgetExceeded:
+            pass
+        
+        with statement_budget('lenient', 1, strict=False) as budget:
+            asyncio.run(chatty_handler.__wrapped__())
+        if not budget.exceeded or budget.count != 2:
+            print(f"❌ Lenient budget counted {budget.count}")
+            return False
+        print("✅ Over-budget handlers raise in strict mode, are counted otherwise")
+        return True
+    except Exception as e:
+        print(f"❌ Query budget error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_unit_of_work():
+    print("\nTesting request-scoped unit of work...")
+    try:
+        import asyncio
+        import uuid
+        from types import SimpleNamespace
+        from sqlalchemy import event
+        from sqlalchemy.orm import Session
+        from database import get_session, unit_of_work, dispose_async_engine
+        from services import UserService, DragonService, VIPService, BattlepassService
+        from handlers.start import set_language
+        
+        telegram_user = SimpleNamespace(id=12345702, username="uow_tester", first_name="UoW Tester")
+        with get_session() as session:
+            user = UserService.get_or_create_user(session, telegram_user)
+            dragon = DragonService.create_dragon(session, user, 'Common')
+            dragon_id = dragon.id
+        
+        flushes, sessions = [], set()
+        
+        def on_flush(session, flush_context):
+            flushes.append(session)
+        
+        def on_begin(session, transaction, connection):
+            sessions.add(id(session))
+        
+        event.listen(Session, 'after_flush', on_flush)
+        event.listen(Session, 'after_begin', on_begin)
+        try:
+            with get_session() as session:
+                user = UserService.get_or_create_user(session, telegram_user)
+                dragon = DragonService.get_dragon_by_id(session, dragon_id, user.id)
+                BattlepassService.activate_battlepass(session, user)
+                UserService.set_language(session, user, 'en')
+                UserService.update_daily_egg_time(session, user)
+                VIPService.activate_vip(session, user, 1, days=1)
+                DragonService.rename_dragon(session, dragon, 'Batched')
+                with get_session() as nested:
+                    if nested is not session:
+                        print("❌ Nested get_session opened a second session")
+                        return False
+            if len(flushes) != 1:
+                print(f"❌ Expected the commit to be the only flush, got {len(flushes)}")
+                return False
+            print("✅ Five service writes flushed once at commit, nested scope joined the session")
+            
+            replies = []
+            
+            async def reply_text(text, **kwargs):
+                replies.append(text)
+            
+            update = SimpleNamespace(
+                callback_query=None,
+                effective_user=telegram_user,
+                message=SimpleNamespace(text='🇷🇺 Русский', reply_text=reply_text)
+            )
+            
+            async def handle_update():
+                try:
+                    with unit_of_work():
+                        await set_language(update, None)
+                        # A task spawned by the handler must not share its session
+                        return await asyncio.create_task(background())
+                finally:
+                    await dispose_async_engine()
+            
+            async def background():
+                with get_session() as session:
+                    return id(session)
+            
+            sessions.clear()
+            background_session = asyncio.run(handle_update())
+            sessions.discard(background_session)
+        finally:
+            event.remove(Session, 'after_flush', on_flush)
+            event.remove(Session, 'after_begin', on_begin)
+        
+        if len(replies) != 2 or len(sessions) != 1:
+            print(f"❌ set_language -> start_command used {len(sessions)} sessions")
+            return False
+        print("✅ set_language and the main menu it renders share one session, background task gets its own")
+        
+        from database.db import SessionLocal
+        from database.models import Purchase
+        from payment.stars_handler import successful_payment
+        
+        charge_id = f"test-{uuid.uuid4().hex[:12]}"
+        committed = []
+        
+        async def payment_reply(text, **kwargs):
+            # A separate connection only sees the purchase once it has committed
+            with SessionLocal() as other:
+                committed.append(other.query(Purchase).filter_by(telegram_payment_charge_id=charge_id).count())
+        
+        payment = SimpleNamespace(invoice_payload='crystals:50', total_amount=100, telegram_payment_charge_id=charge_id)
+        update = SimpleNamespace(
+            effective_user=telegram_user,
+            message=SimpleNamespace(successful_payment=payment, reply_text=payment_reply)
+        )
+        
+        async def pay():
+            try:
+                with unit_of_work():
+                    await successful_payment(update, None)
+            finally:
+                await dispose_async_engine()
+        
+        asyncio.run(pay())
+        if committed != [1]:
+            print(f"❌ Payment confirmed before the purchase committed: {committed}")
+            return False
+        print("✅ Stars payment confirmed only after the purchase committed")
+        
+        from database.models import Egg
+        from handlers.egg import buy_egg
+        
+        with get_session() as session:
+            user = UserService.get_or_create_user(session, telegram_user)
+            user.gold = 10000
+            user_id = user.id
+        eggs_seen = []
+        
+        async def answer(text=None, **kwargs):
+            with SessionLocal() as other:
+                eggs_seen.append(other.query(Egg).filter_by(user_id=user_id).count())
+        
+        async def edit_message_text(**kwargs):
+            pass
+        
+        update = SimpleNamespace(
+            effective_user=telegram_user,
+            callback_query=SimpleNamespace(data='buy_egg_Regular', answer=answer, edit_message_text=edit_message_text)
+        )
+        
+        async def buy():
+            try:
+                with unit_of_work():
+                    await buy_egg(update, None)
+            finally:
+                await dispose_async_engine()
+        
+        with SessionLocal() as other:
+            eggs_before = other.query(Egg).filter_by(user_id=user_id).count()
+        asyncio.run(buy())
+        if eggs_seen != [eggs_before + 1]:
+            print(f"❌ Egg purchase answered before it committed: {eggs_before} -> {eggs_seen}")
+            return False
+        print("✅ Egg purchase answered only after the transaction committed")
+        return True
+    except Exception as e:
+        print(f"❌ Unit of work error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_localization_catalog():
+    print("\nTesting precompiled localization catalog...")
+    try:
+        from localization import MESSAGES, DEFAULT_LANGUAGE, CATALOG, t
+        from localization.catalog import Catalog
+        
+        for lang, messages in MESSAGES.items():
+            for key, template in messages.items():
+                if t(lang, key) != template:
+                    print(f"❌ t({lang!r}, {key!r}) differs from the source template")
+                    return False
+        if (t('de', 'nav_help') != MESSAGES[DEFAULT_LANGUAGE]['nav_help'] or t('en', 'no_such_key') != 'no_such_key'
+                or t('en', 'no_such_key', x=1) != 'no_such_key'):
+            print("❌ Unknown language/key fallback changed")
+            return False
+        welcome = t('en', 'start_welcome_back', first_name='Ann', gold=12345, crystals=5, dragons=2, eggs=1)
+        if '12,345' not in welcome or 'Ann' not in welcome:
+            print(f"❌ Templated message not formatted: {welcome!r}")
+            return False
+        print(f"✅ Catalog matches the sources for {sum(map(len, MESSAGES.values()))} messages")
+        
+        if not CATALOG.warn_if_incomplete():
+            print(f"❌ Shipped catalog is incomplete: {CATALOG.missing_keys()} {CATALOG.mismatched_fields()}")
+            return False
+        
+        partial = Catalog({'ru': {'greet': 'Привет, {name}', 'bye': 'Пока'}, 'en': {'greet': 'Hi, {nick}'}}, 'ru')
+        if (partial.templates['en']['bye'] != 'Пока' or partial.missing_keys() != {'en': ['bye']}
+                or set(partial.mismatched_fields()) != {'greet'} or partial.warn_if_incomplete()):
+            print("❌ Fallback merge or incompleteness warnings wrong")
+            return False
+        print("✅ Fallbacks merged at build time, missing keys and placeholder mismatches reported")
+        return True
+    except Exception as e:
+        print(f"❌ Localization catalog error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_screen_cache():
+    print("\nTesting rendered-screen cache...")
+    try:
+        from core import screen_cache
+        from localization import CATALOG, MESSAGES, reload_catalog, t
+        from handlers.egg import egg_shop_screen
+        from handlers.garden import plant_shop_screen
+        from shop.shop_handler import shop_menu_screen
+        from utils.balance import balance_version, reload_game_balance
+        from utils.constants import PLANTS, EGG_TYPES
+        from utils.rarity import rarity_roller
+        
+        screen = egg_shop_screen('en')
+        if egg_shop_screen('en') is not screen or shop_menu_screen('en') is shop_menu_screen('ru'):
+            print("❌ Screens not cached per (screen, language)")
+            return False
+        text = screen.render("💰 1,234 Gold\n")
+        if not text.startswith(screen.head + "💰 1,234 Gold\n") or not text.endswith(screen.tail):
+            print(f"❌ Fragment not spliced: {text[:80]!r}")
+            return False
+        print("✅ Cached screen reused, per-user fragment spliced between head and tail")
+        
+        plant_name = next(iter(PLANTS))
+        reward = PLANTS[plant_name]['reward_gold']
+        version, tables = balance_version(), rarity_roller.tables
+        try:
+            overrides = {
+                'PLANTS': {plant_name: {'reward_gold': reward + 1}, 'Test Sprout': dict(PLANTS[plant_name])},
+                'EGG_TYPES': {'Rare': {'cost_gold': 1799}}
+            }
+            if reload_game_balance(overrides) != version + 1:
+                print("❌ Reload did not bump the balance version")
+                return False
+            if egg_shop_screen('en') is screen or f"Reward: {reward + 1} Gold" not in plant_shop_screen('en').tail:
+                print("❌ Screens not rebuilt after a balance reload")
+                return False
+            buttons = [button.text for row in egg_shop_screen('en').reply_markup.inline_keyboard for button in row]
+            if not any('(1799 Gold)' in text for text in buttons):
+                print(f"❌ Egg shop prices not rendered from the balance table: {buttons}")
+                return False
+            if rarity_roller.tables is tables:
+                print("❌ Rarity tables not rebuilt after a balance reload")
+                return False
+            # A second reload starts from the shipped tables, not from the first one's result
+            reload_game_balance({'PLANTS': {plant_name: {'reward_gold': reward + 2}}})
+            if 'Test Sprout' in PLANTS or EGG_TYPES['Rare']['cost_gold'] == 1799 or PLANTS[plant_name]['reward_gold'] != reward + 2:
+                print("❌ Overrides dropped from the file survived the next reload")
+                return False
+        finally:
+            reload_game_balance({})
+        if PLANTS[plant_name]['reward_gold'] != reward:
+            print("❌ Empty reload did not restore the shipped balance")
+            return False
+        try:
+            reload_game_balance({'NO_SUCH_TABLE': {}})
+            print("❌ Unknown balance table accepted")
+            return False
+        except ValueError:
+            pass
+        version, tables, rare = balance_version(), rarity_roller.tables, dict(EGG_TYPES['Rare']['rarities'])
+        for rarities in ({'Common': 0, 'Rare': 0}, {'Common': 'lots'}, {'Common': -5, 'Rare': 10}):
+            try:
+                reload_game_balance({'PLANTS': {plant_name: {'reward_gold': 1}},
+                                     'EGG_TYPES': {'Rare': {'rarities': rarities}}})
+                print(f"❌ Rarity weights {rarities} accepted")
+                return False
+            except ValueError:
+                pass
+        if (balance_version() != version or rarity_roller.tables is not tables
+                or EGG_TYPES['Rare']['rarities'] != rare or PLANTS[plant_name]['reward_gold'] != reward):
+            print("❌ Rejected balance reload left tables or the version half-applied")
+            return False
+        print(f"✅ Balance reload rebuilt screens, prices and rarity tables from the shipped defaults "
+              f"({screen_cache.stats()['hits']} cache hits), invalid rarity weights change nothing")
+        
+        menu, catalog_version = shop_menu_screen('en'), CATALOG.version
+        try:
+            CATALOG.compile({**MESSAGES, 'en': {**MESSAGES['en'], 'shop_main_title': 'Bazaar\n'}})
+            if screen_cache.stats()['size']:
+                print("❌ Screens built from the old catalog kept after a recompile")
+                return False
+            if shop_menu_screen('en') is menu or not shop_menu_screen('en').head.startswith('Bazaar'):
+                print("❌ Screen built from the old catalog served after a text change")
+                return False
+        finally:
+            version = reload_catalog()
+        if version != catalog_version + 2 or t('en', 'shop_main_title') != MESSAGES['en']['shop_main_title']:
+            print(f"❌ Catalog reload wrong: version {version}, title {t('en', 'shop_main_title')!r}")
+            return False
+        print("✅ Catalog version in the screen key, old screens dropped on recompile, texts reloaded in place")
+        return True
+    except Exception as e:
+        print(f"❌ Screen cache error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_edit_fingerprints():
+    print("\nTesting no-op edit skipping...")
+    try:
+        import asyncio
+        from datetime import datetime
+        from unittest.mock import AsyncMock
+        from telegram import Chat, Message, InlineKeyboardButton, InlineKeyboardMarkup
+        from telegram.error import BadRequest
+        from core import edit_fingerprints, edit_message_text
+        
+        chat = Chat(id=12345703, type='private')
+        
+        class FakeQuery:
+            def __init__(self, message):
+                self.message = message
+                self.edit_message_text = AsyncMock(side_effect=self.edit)
+            
+            async def edit(self, text, reply_markup=None, parse_mode=None):
+                # Telegram returns the edited message; the next callback carries it
+                self.message = Message(self.message.message_id, datetime.now(), chat,
+                                       text=text.replace('*', ''), reply_markup=reply_markup)
+                return self.message
+        
+        markup = InlineKeyboardMarkup([[InlineKeyboardButton("« Back", callback_data="eggs_menu")]])
+        query = FakeQuery(Message(900001, datetime.now(), chat, text="🥚 Eggs"))
+        
+        async def scenario():
+            sent = [await edit_message_text(query, "**No eggs**", markup, parse_mode='Markdown') for _ in range(3)]
+            # Another handler edits the message without the store: the same render must be sent again
+            query.message = Message(900001, datetime.now(), chat, text="🥚 Eggs", reply_markup=markup)
+            sent.append(await edit_message_text(query, "**No eggs**", markup, parse_mode='Markdown'))
+            sent.append(await edit_message_text(query, "**1 egg ready**", markup, parse_mode='Markdown'))
+            return sent
+        
+        before = edit_fingerprints.stats()
+        sent = asyncio.run(scenario())
+        after = edit_fingerprints.stats()
+        if sent != [True, False, False, True, True] or query.edit_message_text.await_count != 3:
+            print(f"❌ Unexpected edits: {sent}, {query.edit_message_text.await_count} API calls")
+            return False
+        if after['skipped'] - before['skipped'] != 2:
+            print("❌ Skipped edits not counted")
+            return False
+        print("✅ Identical renders skipped, out-of-band edits and real changes sent")
+        
+        query = FakeQuery(Message(900002, datetime.now(), chat, text="x"))
+        query.edit_message_text = AsyncMock(side_effect=BadRequest("Message is not modified: specified new message content..."))
+        if asyncio.run(edit_message_text(query, "x")) or edit_fingerprints.stats()['not_modified'] != after['not_modified'] + 1:
+            print("❌ 'Message is not modified' not absorbed")
+            return False
+        print("✅ 'Message is not modified' errors absorbed and counted")
+        return True
+    except Exception as e:
+        print(f"❌ Edit fingerprint error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_outbound_rate_limiter():
+    print("\nTesting outbound rate limiter...")
+    try:
+        import asyncio
+        import json
+        import time
+        from telegram.ext import ExtBot
+        from telegram.request import BaseRequest
+        from core import PriorityRateLimiter, outbound_lane, PAYMENT, NOTIFICATION
+        
+        class FakeBotRequest(BaseRequest):
+            """Bot API stand-in: records sendMessage calls, answers 429 once per chat listed in flood"""
+            def __init__(self, flood=()):
+                self.sent = []
+                self.flood = set(flood)
+            
+            async def initialize(self):
+                pass
+            
+            async def shutdown(self):
+                pass
+            
+            async def do_request(self, url, method, request_data=None, **timeouts):
+                params = request_data.parameters if request_data else {}
+                chat_id = params.get('chat_id')
+                if chat_id in self.flood:
+                    self.flood.discard(chat_id)
+                    return 429, json.dumps({'ok': False, 'error_code': 429, 'description': 'Too Many Requests',
+                                            'parameters': {'retry_after': 1}}).encode()
+                self.sent.append((chat_id, params.get('text'), time.monotonic()))
+                result = {'message_id': len(self.sent), 'date': int(time.time()),
+                          'chat': {'id': chat_id, 'type': 'private'}, 'text': params.get('text')}
+                return 200, json.dumps({'ok': True, 'result': result}).encode()
+        
+        async def scenario(limiter, request, sends):
+            bot = ExtBot('123456:TEST', request=request, get_updates_request=request, rate_limiter=limiter)
+            await limiter.initialize()
+            try:
+                return await sends(bot)
+            finally:
+                await limiter.shutdown()
+        
+        # Priority: one global token at a time, notifications queued before a payment confirmation
+        limiter = PriorityRateLimiter(global_rate=20, global_burst=1, chat_rate=100, chat_burst=10)
+        request = FakeBotRequest()
+        
+        async def notify_then_pay(bot):
+            async def notify(chat_id):
+                with outbound_lane(NOTIFICATION):
+                    await bot.send_message(chat_id, 'notification')
+            tasks = [asyncio.create_task(notify(chat_id)) for chat_id in range(12345703, 12345709)]
+            await asyncio.sleep(0.01)
+            await bot.send_message(12345709, 'payment', rate_limit_args={'lane': PAYMENT})
+            await asyncio.gather(*tasks)
+        
+        asyncio.run(scenario(limiter, request, notify_then_pay))
+        order = [text for _, text, _ in request.sent]
+        if order.index('payment') > 1:
+            print(f"❌ Payment confirmation not prioritized: {order}")
+            return False
+        stats = limiter.stats()['lanes']
+        if stats['payment']['sent'] != 1 or stats['notification']['sent'] != 6 or stats['notification']['wait_max_ms'] < 100:
+            print(f"❌ Lane metrics wrong: {stats}")
+            return False
+        print(f"✅ Payment sent {order.index('payment') + 1}/{len(order)} ahead of queued notifications, "
+              f"notification wait max {stats['notification']['wait_max_ms']:.0f} ms")
+        
+        # Crypto confirmations from the webhook and the reconciler run outside any handler
+        from payment.crypto_handler import notify_crypto_payment
+        
+        class LaneRecordingBot:
+            def __init__(self):
+                self.lanes = []
+            
+            async def send_message(self, **kwargs):
+                self.lanes.append(PriorityRateLimiter.resolve_lane('sendMessage', kwargs.get('rate_limit_args')))
+        
+        bot = LaneRecordingBot()
+        with outbound_lane(NOTIFICATION):
+            asyncio.run(notify_crypto_payment(bot, 12345709, 'en', 100))
+        if bot.lanes != [PAYMENT]:
+            print(f"❌ Crypto payment confirmation sent in lane {bot.lanes}")
+            return False
+        print("✅ Crypto payment confirmations go in the payment lane")
+        
+        # Per-chat bucket and RetryAfter: 4 messages to one chat at 20/s, the first answered with 429
+        limiter = PriorityRateLimiter(global_rate=1000, global_burst=1000, chat_rate=20, chat_burst=1)
+        request = FakeBotRequest(flood={12345710})
+        started = time.monotonic()
+        
+        async def burst(bot):
+            await asyncio.gather(*(bot.send_message(12345710, f'msg {i}') for i in range(4)))
+        
+        asyncio.run(scenario(limiter, request, burst))
+        times = [sent_at for _, _, sent_at in request.sent]
+        if len(times) != 4 or limiter.retry_after != 1 or times[-1] - started < 1.0:
+            print(f"❌ RetryAfter not honoured: {len(times)} sent, {limiter.retry_after} retries, "
+                  f"{times[-1] - started:.2f}s")
+            return False
+        if min(later - earlier for earlier, later in zip(times, times[1:])) < 0.04:
+            print("❌ Per-chat rate exceeded")
+            return False
+        print("✅ Per-chat rate kept, 429 paused the chat and the request was retried")
+        return True
+    except Exception as e:
+        print(f"❌ Outbound rate limiter error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+def test_broadcast():
+    print("\nTesting resumable broadcast...")
+    try:
+        import asyncio
+        from datetime import datetime, timedelta
+        from types import SimpleNamespace
+        from telegram.error import BadRequest, Forbidden, RetryAfter
+        from database import get_session, dispose_async_engine
+        from services import UserService
+        from jobs.broadcast import Broadcast
+        from handlers.admin import parse_broadcast
+        
+        # Five players in a language no one else uses: one blocked the bot, one chat is gone
+        ids = list(range(12345711, 12345716))
+        with get_session() as session:
+            for telegram_id in ids:
+                user = UserService.get_or_create_user(
+                    session, SimpleNamespace(id=telegram_id, username=None, first_name="Broadcast Tester"))
+                user.language = 'tt'
+                # ids[0] has an active VIP, ids[3] an expired one
+                user.vip_level = 1 if telegram_id in (ids[0], ids[3]) else 0
+                user.vip_expiration = datetime.utcnow() - timedelta(days=1) if telegram_id == ids[3] else None
+        
+        class FakeBot:
+            def __init__(self, crash_on=None):
+                self.sent = []
+                self.crash_on = crash_on
+            
+            async def send_message(self, chat_id, text, parse_mode=None):
+                if chat_id == self.crash_on:
+                    raise RuntimeError("process killed")
+                if chat_id == ids[1]:
+                    raise Forbidden("Forbidden: bot was blocked by the user")
+                if chat_id == ids[2]:
+                    raise BadRequest("Chat not found")
+                self.sent.append(chat_id)
+        
+        class FloodedBot:
+            """No rate limiter in front: one 429, then Telegram rejects the Markdown"""
+            def __init__(self):
+                self.calls = []
+            
+            async def send_message(self, chat_id, text, parse_mode=None):
+                self.calls.append(parse_mode)
+                if len(self.calls) == 1:
+                    raise RetryAfter(0)
+                if parse_mode:
+                    raise BadRequest("Can't parse entities: can't find end of the entity starting at byte offset 4")
+        
+        async def run():
+            try:
+                broadcast = Broadcast.create("Season 2 is live!", language='tt', page_size=2)
+                crashed = FakeBot(crash_on=ids[4])
+                try:
+                    await broadcast.run(crashed)
+                    return None
+                except RuntimeError:
+                    pass
+                checkpoint = dict(broadcast.state)
+                
+                resumed = Broadcast.from_state(broadcast.name, checkpoint, page_size=2)
+                bot = FakeBot()
+                report = await resumed.run(bot)
+                
+                vip = FakeBot()
+                await Broadcast.create("VIP sale", language='tt', min_vip_level=1).run(vip)
+                
+                flooded = FloodedBot()
+                unthrottled = Broadcast.create("50% *off", language='tt', min_vip_level=1)
+                fallback = await unthrottled.run(flooded)
+                fallback['paced'] = unthrottled.bucket is not None
+                return crashed.sent, checkpoint, bot.sent, report, vip.sent, flooded.calls, fallback
+            finally:
+                await dispose_async_engine()
+        
+        result = asyncio.run(run())
+        if result is None:
+            print("❌ Simulated crash did not interrupt the broadcast")
+            return False
+        crashed_sent, checkpoint, resumed_sent, report, vip_sent, flooded_calls, fallback = result
+        if crashed_sent != [ids[0], ids[3]] or checkpoint['status'] != 'running' or resumed_sent != [ids[4]]:
+            print(f"❌ Resume wrong: before crash {crashed_sent}, after {resumed_sent}, state {checkpoint}")
+            return False
+        if (report['status'], report['delivered'], report['blocked'], report['failed']) != ('finished', 3, 1, 1):
+            print(f"❌ Report wrong: {report}")
+            return False
+        print(f"✅ Crash after 2 pages resumed from the checkpoint: {report['delivered']} delivered, "
+              f"{report['blocked']} blocked, {report['failed']} failed")
+        
+        if vip_sent != [ids[0]]:
+            print(f"❌ Segment filter wrong (expired VIPs must be skipped): {vip_sent}")
+            return False
+        if parse_broadcast("lang=en vip=2 Hello *all*") != ("Hello *all*", 'en', 2) or parse_broadcast("Hi") != ("Hi", None, None):
+            print("❌ /broadcast options not parsed")
+            return False
+        print("✅ Language/VIP segments (expired VIP excluded) and /broadcast options applied")
+        
+        if flooded_calls != ['Markdown', 'Markdown', None] or fallback['delivered'] != 1 or not fallback['paced']:
+            print(f"❌ Fallback pacing/retry wrong: calls {flooded_calls}, report {fallback}")
+            return False
+        print("✅ Without the rate limiter the job paced itself, retried the 429 and resent bad Markdown as plain text")
+        return True
+    except Exception as e:
+        print(f"❌ Broadcast error: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
 def main():
     print("🐉 Dragon Garden - Game Mechanics Test\n")
     print("="*50)
@@ -213,6 +1997,30 @@ def main():
         ("Dragon Creation", test_dragon_creation),
         ("Egg Creation", test_egg_creation),
         ("Plant Creation", test_plant_creation),
+        ("Async Services", test_async_services),
+        ("Index Audit", test_index_audit),
+        ("User Snapshot Cache", test_user_snapshot_cache),
+        ("Atomic Balance", test_atomic_balance),
+        ("Update Processor", test_update_processor),
+        ("Router", test_router),
+        ("Ready Notifier", test_ready_notifier),
+        ("Lazy Dragon Needs", test_lazy_dragon_needs),
+        ("CryptoBot Client", test_cryptobot_client),
+        ("Telegram Webhook", test_telegram_webhook),
+        ("CryptoBot Webhook", test_cryptobot_webhook),
+        ("Crypto Reconciler", test_crypto_reconciler),
+        ("Rarity Rolls", test_rarity_rolls),
+        ("Hatch All Ready", test_hatch_all_ready),
+        ("Harvest All", test_harvest_all),
+        ("Derived Readiness", test_derived_readiness),
+        ("User Counters", test_user_counters),
+        ("Query Budget", test_query_budget),
+        ("Unit of Work", test_unit_of_work),
+        ("Localization Catalog", test_localization_catalog),
+        ("Screen Cache", test_screen_cache),
+        ("Edit Fingerprints", test_edit_fingerprints),
+        ("Outbound Rate Limiter", test_outbound_rate_limiter),
+        ("Broadcast", test_broadcast),
     ]
     
     results = []
@@ -0,0 +1,99 @@
+"""
+Game-balance reloads.
+
+``RARITIES``, ``EGG_TYPES`` and ``PLANTS`` are updated in place, so every
+module that imported them sees the new values. Anything precomputed from
+them (rendered screens, rarity alias tables) registers a callback with
+``on_balance_reload`` and is rebuilt when the balance version changes.
+
+A reload first merges the overrides into new tables and runs the
+``validate_balance`` checks on them; if one raises, nothing is changed.
+
+Overrides are read from ``GAME_BALANCE_FILE`` (JSON) and applied on top of
+the shipped defaults, so an entry or field removed from the file reverts on
+the next reload, e.g.::
+
+    {"PLANTS": {"Rose": {"reward_gold": 500}},
+     "EGG_TYPES": {"Rare": {"cost_gold": 1800}}}
+"""
+
+import copy
+import json
+import logging
+from .constants import RARITIES, EGG_TYPES, PLANTS
+import config
+
+logger = logging.getLogger(__name__)
+
+TABLES = {
+    'RARITIES': RARITIES,
+    'EGG_TYPES': EGG_TYPES,
+    'PLANTS': PLANTS,
+}
+
+# The tables as shipped; every reload starts over from these
+DEFAULTS = copy.deepcopy(TABLES)
+
+_version = 1
+_listeners = []
+_validators = []
+
+def balance_version() -> int:
+    """Increases on every reload; part of the key of anything cached from the balance tables"""
+    return _version
+
+def on_balance_reload(callback):
+    """Register callback(version) to run after each reload (usable as a decorator)"""
+    _listeners.append(callback)
+    return callback
+
+def validate_balance(callback):
+    """Register callback(tables) to vet merged tables before a reload applies them; raise ValueError to reject"""
+    _validators.append(callback)
+    return callback
+
+def load_overrides(path: str = None) -> dict:
+    path = path or config.GAME_BALANCE_FILE
+    if not path:
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def merge_overrides(overrides: dict) -> dict:
+    """New tables: DEFAULTS with {table: {entry: {field: value}}} merged on top"""
+    unknown = set(overrides) - set(TABLES)
+    if unknown:
+        raise ValueError(f"Unknown balance tables: {', '.join(sorted(unknown))}")
+    tables = copy.deepcopy(DEFAULTS)
+    for name, entries in overrides.items():
+        if not isinstance(entries, dict) or not all(isinstance(values, dict) for values in entries.values()):
+            raise ValueError(f"{name} overrides must map entries to {{field: value}} objects")
+        for key, values in entries.items():
+            tables[name].setdefault(key, {}).update(copy.deepcopy(values))
+    return tables
+
+def apply_overrides(overrides: dict):
+    """Reset the balance tables to DEFAULTS and merge overrides on top, in place"""
+    tables = merge_overrides(overrides)
+    for check in _validators:
+        check(tables)
+    
+    # Nothing below can fail, so the tables are never left half-updated
+    for name, table in TABLES.items():
+        merged = tables[name]
+        for key in table.keys() - merged.keys():
+            del table[key]
+        for key, values in merged.items():
+            entry = table.setdefault(key, {})
+            entry.clear()
+            entry.update(values)
+
+def reload_game_balance(overrides: dict = None) -> int:
+    """Apply overrides (GAME_BALANCE_FILE by default), bump the version and notify listeners"""
+    global _version
+    apply_overrides(load_overrides() if overrides is None else overrides)
+    _version += 1
+    for callback in _listeners:
+        callback(_version)
+    logger.info(f"Game balance reloaded (version {_version})")
+    return _version
@@ -0,0 +1,26 @@
+"""
+Request-scoped clock.
+
+While an update is processed, ``now()`` returns the moment processing
+started, so every readiness check, query and timer shown on one screen
+agrees on the time. Outside a request it is plain ``datetime.utcnow()``.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+_request_now: ContextVar = ContextVar('request_now', default=None)
+
+def now() -> datetime:
+    frozen = _request_now.get()
+    return frozen if frozen is not None else datetime.utcnow()
+
+@contextmanager
+def request_time(at: datetime = None):
+    """Freeze now() for the duration of the block (defaults to the current time)"""
+    token = _request_now.set(at or datetime.utcnow())
+    try:
+        yield
+    finally:
+        _request_now.reset(token)
@@ -1,13 +1,15 @@
 import random
 from datetime import datetime, timedelta
 from utils.constants import RARITIES, DRAGONS, EGG_TYPES
+from utils.rarity import rarity_roller
+from utils.clock import now
 
 def format_time_remaining(target_time):
-    now = datetime.utcnow()
-    if target_time <= now:
+    current = now()
+    if target_time <= current:
         return "Ready!"
     
-    delta = target_time - now
+    delta = target_time - current
     hours, remainder = divmod(int(delta.total_seconds()), 3600)
     minutes, seconds = divmod(remainder, 60)
     
@@ -27,20 +29,7 @@ def calculate_hatching_time(egg_type):
     return egg_data['hatching_hours']
 
 def determine_egg_rarity(egg_type):
-    egg_data = EGG_TYPES.get(egg_type)
-    if not egg_data:
-        return 'Common'
-    
-    rarities = egg_data['rarities']
-    rand = random.randint(1, 100)
-    cumulative = 0
-    
-    for rarity, chance in rarities.items():
-        cumulative += chance
-        if rand <= cumulative:
-            return rarity
-    
-    return 'Common'
+    return rarity_roller.roll(egg_type)
 
 def get_random_dragon(rarity):
     dragons = DRAGONS.get(rarity, DRAGONS['Common'])
@@ -65,9 +54,9 @@ def format_user_profile(user):
         f"💰 Gold: {user.gold}\n"
         f"💎 Crystals: {user.crystals}\n"
         f"👑 VIP: {user.vip_level}\n"
-        f"🐉 Dragons: {len(user.dragons)}\n"
-        f"🥚 Eggs: {len([e for e in user.eggs if not e.is_hatched])}\n"
-        f"🌱 Plants: {len([p for p in user.plants if not p.is_harvested])}"
+        f"🐉 Dragons: {user.dragon_count}\n"
+        f"🥚 Eggs: {user.active_egg_count}\n"
+        f"🌱 Plants: {user.growing_plant_count}"
     )
 
 def can_claim_daily_egg(user):
@@ -0,0 +1,127 @@
+"""
+Egg rarity rolls backed by Walker alias tables.
+
+Each egg type's ``rarities`` weights from ``EGG_TYPES`` are turned into an
+alias table once, so a roll is one uniform index plus one coin flip no
+matter how many outcomes there are. Weights may be any non-negative
+numbers (e.g. 0.5 for a 0.5% drop); outcomes with weight 0 never roll.
+Balance reloads are checked by building the new tables before any of the
+old ones are replaced.
+"""
+
+import math
+from numbers import Real
+import numpy as np
+from utils.constants import EGG_TYPES
+from utils.balance import on_balance_reload, validate_balance
+
+class AliasTable:
+    """Walker/Vose alias table over a {outcome: weight} mapping"""
+    
+    def __init__(self, weights: dict):
+        if not isinstance(weights, dict):
+            raise ValueError(f"Weights must be an {{outcome: weight}} mapping, got {weights!r}")
+        outcomes = []
+        for name, weight in weights.items():
+            if isinstance(weight, bool) or not isinstance(weight, Real) or not 0 <= weight < math.inf:
+                raise ValueError(f"Weight of {name} must be a non-negative number, got {weight!r}")
+            if weight > 0:
+                outcomes.append((name, float(weight)))
+        if not outcomes:
+            raise ValueError("At least one outcome needs a positive weight")
+        
+        self.outcomes = np.array([name for name, _ in outcomes], dtype=object)
+        size = len(outcomes)
+        total = sum(weight for _, weight in outcomes)
+        scaled = [weight * size / total for _, weight in outcomes]
+        
+        self.prob = np.ones(size)
+        self.alias = np.arange(size)
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Whatever is left is 1.0 up to rounding error and keeps prob = 1
+    
+        self._prob = self.prob.tolist()
+        self._alias = self.alias.tolist()
+    
+    def sample(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        """
+        Indices into self.outcomes for n independent rolls. One uniform per
+        roll: its integer part picks the column, the fraction the coin flip.
+        """
+        size = len(self.prob)
+        scaled = rng.random(n) * size
+        columns = np.minimum(scaled.astype(np.intp), size - 1)
+        keep = scaled - columns < self.prob[columns]
+        return np.where(keep, columns, self.alias[columns])
+    
+    def sample_one(self, rng: np.random.Generator) -> int:
+        """Same as sample(rng, 1)[0] without the array overhead"""
+        size = len(self._prob)
+        scaled = rng.random() * size
+        column = min(int(scaled), size - 1)
+        return column if scaled - column < self._prob[column] else self._alias[column]
+
+class RarityRoller:
+    """
+    Rolls egg rarities from per-egg-type alias tables.
+    
+    Each egg type draws from its own RNG stream spawned from one seed, so a
+    seeded roller replays the same rarities per egg type regardless of how
+    rolls of different egg types interleave.
+    """
+    
+    def __init__(self, seed=None, egg_types: dict = EGG_TYPES):
+        self.egg_types = egg_types
+        self.tables = self.build_tables(egg_types)
+        self.seed(seed)
+    
+    @staticmethod
+    def build_tables(egg_types: dict) -> dict:
+        """Alias table per egg type; ValueError naming the egg type if its rarity weights are unusable"""
+        tables = {}
+        for name, data in egg_types.items():
+            try:
+                tables[name] = AliasTable(data.get('rarities'))
+            except ValueError as e:
+                raise ValueError(f"{name} egg rarities: {e}") from None
+        return tables
+    
+    def rebuild(self, version: int = None):
+        """Recompute the alias tables from egg_types after a balance reload, keeping the RNG streams"""
+        self.tables = self.build_tables(self.egg_types)
+        for name in self.tables.keys() - self.rngs.keys():
+            # Egg types added by the reload get a fresh stream
+            self.rngs[name] = np.random.default_rng()
+    
+    def seed(self, seed=None):
+        streams = np.random.SeedSequence(seed).spawn(len(self.tables))
+        self.rngs = {name: np.random.default_rng(stream) for name, stream in zip(sorted(self.tables), streams)}
+    
+    def roll_many(self, egg_type: str, n: int) -> list:
+        """Rarities of n eggs of egg_type (all 'Common' for unknown types)"""
+        table = self.tables.get(egg_type)
+        if table is None:
+            return ['Common'] * n
+        return table.outcomes[table.sample(self.rngs[egg_type], n)].tolist()
+    
+    def roll(self, egg_type: str) -> str:
+        table = self.tables.get(egg_type)
+        if table is None:
+            return 'Common'
+        return table.outcomes[table.sample_one(self.rngs[egg_type])]
+
+# Process-wide roller used by the game
+rarity_roller = RarityRoller()
+validate_balance(lambda tables: RarityRoller.build_tables(tables['EGG_TYPES']))
+on_balance_reload(rarity_roller.rebuild)
+
+def roll_many(egg_type: str, n: int) -> list:
+    return rarity_roller.roll_many(egg_type, n)